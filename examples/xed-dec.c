@@ -681,6 +681,7 @@ int main(int argc, char** argv) {
 #if defined(XED_CET)
     unsigned int cet_mode=0;
 #endif
+    xed_example_batch_tests(argc, argv, main);
     xed_tables_init();
     xed_state_zero(&dstate);
 
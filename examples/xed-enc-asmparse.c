@@ -1038,6 +1038,7 @@ int main(int argc, char** argv)
     xed_uint_t mode=0;
     xed_uint_t length = 0;
     
+    xed_example_batch_tests(argc, argv, main);
     setup();
     xed_tables_init();
 
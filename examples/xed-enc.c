@@ -92,6 +92,7 @@ int main(int argc, char** argv) {
     xed_error_enum_t xed_error;
     xed_bool_t encode_okay;
 
+    xed_example_batch_tests(argc, argv, main);
     xed_tables_init();
     areq = parse_args(argc,argv);
     req = parse_encode_request(areq);
@@ -27,6 +27,7 @@ END_LEGAL */
 # include <sys/types.h>
 # include <sys/stat.h>
 # include <fcntl.h>
+# include <sys/wait.h>
 #include <cpuid.h>
 #endif
 #include <ctype.h>
@@ -1693,6 +1694,63 @@ xed_uint_t xed_str_list_size(xed_str_list_t* p) { //count chunks
     return c;
 }
 
+#if defined(XED_MAC) || defined(XED_LINUX) || defined(XED_BSD)
+#define XED_BATCH_LINE_LEN (1024*16)
+void xed_example_batch_tests(int argc, char** argv,
+                             int (*main_fn)(int, char**))
+{
+    static char line[XED_BATCH_LINE_LEN];
+    if (argc != 2 || strcmp(argv[1], "-batch-tests") != 0)
+        return;
+
+    xed_tables_init(); // inherited by the children
+    while (fgets(line, XED_BATCH_LINE_LEN, stdin))
+    {
+        xed_str_list_t* tokens = 0;
+        xed_str_list_t* p = 0;
+        char** args = 0;
+        int nargs = 0;
+        int status = 0;
+        int retcode = 0;
+        pid_t pid;
+
+        line[strcspn(line, "\r\n")] = 0;
+        tokens = xed_tokenize(line, "\t");
+        args = (char**)malloc((xed_str_list_size(tokens) + 2) * sizeof(char*));
+        assert(args != 0);
+        args[nargs++] = argv[0];
+        for (p = tokens; p; p = p->next)
+            args[nargs++] = p->s;
+        args[nargs] = 0;
+
+        fflush(stdout);
+        fflush(stderr);
+        pid = fork();
+        if (pid == -1)
+            xedex_derror("fork failed");
+        if (pid == 0)
+            exit(main_fn(nargs, args));
+
+        if (waitpid(pid, &status, 0) == -1)
+            xedex_derror("waitpid failed");
+        if (WIFEXITED(status))
+            retcode = WEXITSTATUS(status);
+        else if (WIFSIGNALED(status))
+            retcode = -WTERMSIG(status);
+        // the leading newline ends output that lacks one. run-cmd.py
+        // removes it.
+        printf("\n%s %d\n", XED_BATCH_TESTS_END, retcode);
+        fflush(stdout);
+        fprintf(stderr, "\n%s %d\n", XED_BATCH_TESTS_END, retcode);
+        fflush(stderr);
+
+        free(args);
+        xed_free_token_list(tokens);
+    }
+    exit(0);
+}
+#endif
+
 void xed_print_bytes_pseudo_op(const xed_uint8_t* array, unsigned int olen) {
     unsigned int i;
     printf(".byte ");
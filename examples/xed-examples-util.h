@@ -188,5 +188,19 @@ void xed_free_token_list(xed_str_list_t* token_list);
 void xed_print_intel_asm_emit(const xed_uint8_t* array, unsigned int olen);
 void xed_print_bytes_pseudo_op(const xed_uint8_t* array, unsigned int olen);
 
+/// Batch mode for tests/run-cmd.py. If the only argument is
+/// "-batch-tests", read one command per line from stdin (arguments
+/// separated by tabs) and run each in a forked child that calls
+/// main_fn. The XED tables are initialized once, before forking. After
+/// each command, a line with XED_BATCH_TESTS_END and the exit status is
+/// written to stdout and stderr. Does not return in batch mode.
+#define XED_BATCH_TESTS_END "#XED-BATCH-TESTS-END"
+#if defined(XED_MAC) || defined(XED_LINUX) || defined(XED_BSD)
+void xed_example_batch_tests(int argc, char** argv,
+                             int (*main_fn)(int, char**));
+#else
+# define xed_example_batch_tests(argc, argv, main_fn)
+#endif
+
 void get_cpuid(xed_uint32_t leaf, xed_uint32_t subleaf, xed_uint32_t* eax, xed_uint32_t* ebx, xed_uint32_t* ecx, xed_uint32_t* edx);
 #endif // file
@@ -40,8 +40,13 @@ void xed_disas_raw(xed_disas_info_t* fi)
     fi->caller_symbol_data = 0;
     fi->line_number_info_fn = 0;
     xed_disas_test(fi);
-    if (fi->xml_format == 0)
+    if (fi->xml_format == 0) {
         xed_print_decode_stats(fi);
+#if defined(XED_ENCODER)
+        if (fi->decode_only == 0)
+            xed_print_encode_stats(fi);
+#endif
+    }
 }
 
 #endif
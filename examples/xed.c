@@ -237,6 +237,7 @@ static void usage(char* prog) {
       "\t                          (running in filter mode from stdin)",
 #if defined(XED_ENCODER)
       "\t-ide input_file           (decode/encode file)",
+      "\t-irde raw_input_file      (decode/encode a raw unformatted binary file)",
       "\t-e instruction            (encode, must be last)",
       "\t-f                        (encode force, skip encoder chip check)",
       "\t-ie file-to-assemble      (assemble the contents of the file)",
@@ -447,6 +448,7 @@ main(int argc, char** argv)
     format_options.write_mask_curly_k0 = 1;
     format_options.lowercase_hex = 1;    
 
+    xed_example_batch_tests(argc, argv, main);
     xed_example_utils_init();
 
     xed_state_init(&dstate,
@@ -586,6 +588,13 @@ main(int argc, char** argv)
             decode_only = 0;
             i++;
         }
+        else if (strcmp(argv[i],"-irde")==0)        {
+            test_argc(i,argc);
+            input_file_name = argv[i+1];
+            decode_raw = 1;
+            decode_only = 0;
+            i++;
+        }
 #endif
         else if (strcmp(argv[i],"-n") ==0)         {
             test_argc(i,argc);
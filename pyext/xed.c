@@ -27,16 +27,46 @@ typedef unsigned __int32 uint32_t;
 typedef unsigned __int64 uint64_t;
 #endif
 
+/* Copy at most XED_MAX_INSTRUCTION_BYTES from a sequence of integers
+   (the original list-based calling convention). Returns -1 on error. */
+static int get_itext_from_iterable(PyObject* byte_list_obj,
+                                   char* itext)
+{
+    PyObject* it=0;
+    PyObject* next=0;
+    int pos = 0;
+
+    if (!(it = PyObject_GetIter(byte_list_obj)))
+        return -1;
+    while (pos < XED_MAX_INSTRUCTION_BYTES && (next=PyIter_Next(it)))
+    {
+        if (!PyLong_Check(next)) {
+            Py_DECREF(next);
+            Py_DECREF(it);
+            PyErr_SetString(PyExc_TypeError, "expected a sequence of integers");
+            return -1;
+        }
+        itext[pos++] = PyLong_AsUnsignedLong(next);
+        Py_DECREF(next);
+    }
+    Py_DECREF(it);
+    if (PyErr_Occurred())
+        return -1;
+    return pos;
+}
+
 static PyObject *dis(PyObject *self,
                      PyObject *args,
                      xed_machine_mode_enum_t mmode,
                      xed_address_width_enum_t stack_addr_width)
 {
     PyObject* byte_list_obj=0;
-    PyObject* it=0;
-    PyObject* next=0;
-    char itext[XED_MAX_INSTRUCTION_BYTES];
+    Py_buffer view;
+    int have_view = 0;
+    char list_itext[XED_MAX_INSTRUCTION_BYTES];
+    const xed_uint8_t* itext = 0;
     int pos = 0;
+    Py_ssize_t offset = 0;
     xed_error_enum_t xed_error;
     xed_decoded_inst_t xedd;
 #define BUFLEN  1000
@@ -44,22 +74,41 @@ static PyObject *dis(PyObject *self,
     int ok;
     uint64_t runtime_addr=0;
     
-    if (!PyArg_ParseTuple(args, "O|K", &byte_list_obj, &runtime_addr))
-        return NULL;
-    if (!(it = PyObject_GetIter(byte_list_obj)))
+    if (!PyArg_ParseTuple(args, "O|Kn", &byte_list_obj, &runtime_addr, &offset))
         return NULL;
-    while ((next=PyIter_Next(it)) && pos < XED_MAX_INSTRUCTION_BYTES)
-    {
-        if (!PyLong_Check(next))
+
+    if (PyObject_CheckBuffer(byte_list_obj)) {
+        /* bytes, bytearray, memoryview, mmap, array, numpy...: decode in place */
+        if (PyObject_GetBuffer(byte_list_obj, &view, PyBUF_SIMPLE) < 0)
             return NULL;
-        itext[pos++] = PyLong_AsUnsignedLong(next);
+        have_view = 1;
+        if (offset < 0 || offset > view.len) {
+            PyBuffer_Release(&view);
+            PyErr_SetString(PyExc_IndexError, "offset out of range");
+            return NULL;
+        }
+        itext = XED_STATIC_CAST(const xed_uint8_t*, view.buf) + offset;
+        pos = XED_STATIC_CAST(int, view.len - offset < XED_MAX_INSTRUCTION_BYTES
+                                   ? view.len - offset
+                                   : XED_MAX_INSTRUCTION_BYTES);
+    }
+    else {
+        if (offset != 0) {
+            PyErr_SetString(PyExc_TypeError,
+                            "offset requires a buffer-protocol object");
+            return NULL;
+        }
+        pos = get_itext_from_iterable(byte_list_obj, list_itext);
+        if (pos < 0)
+            return NULL;
+        itext = XED_STATIC_CAST(const xed_uint8_t*, list_itext);
     }
 
     xed_decoded_inst_zero(&xedd);
     xed_decoded_inst_set_mode(&xedd, mmode, stack_addr_width);
-    xed_error = xed_decode(&xedd, 
-                           XED_STATIC_CAST(const xed_uint8_t*,itext),
-                           pos);
+    xed_error = xed_decode(&xedd, itext, pos);
+    if (have_view)
+        PyBuffer_Release(&view);
     
     if (xed_error == XED_ERROR_NONE)
     {
@@ -90,7 +139,7 @@ dis32(PyObject *self, PyObject *args)
 }
 
 
-#define HELPSTR  " Arguments are:\n\t(1) a list of integers representing the code to decode/disassemble,\n\t(2) an optional runtime address.\n\tReturns a disassembly string.\n"
+#define HELPSTR  " Arguments are:\n\t(1) the code to decode/disassemble: a bytes-like object (bytes,\n\t    bytearray, memoryview, mmap, ...) decoded in place, or a list of integers,\n\t(2) an optional runtime address,\n\t(3) an optional offset into a bytes-like object.\n\tReturns a disassembly string.\n"
      
 static PyMethodDef xed_methods[] = {
     {"dis64",  dis64, METH_VARARGS, "Disassemble in 64b mode."  HELPSTR },
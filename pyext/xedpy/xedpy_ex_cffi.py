@@ -18,9 +18,12 @@
 #END_LEGAL
 import argparse
 import sys
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
 from cffi import FFI
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterator, Optional, List, Union
 from dataclasses import dataclass, field
 
 # Import strings containing function and type definitions for XED
@@ -29,6 +32,8 @@ import xedpy_types  # Assumed to contain cdef_string for types (TBD autogenerate
 import xedpy_funcs  # Assumed to contain cdef_string for functions (TBD autogenerated)
 
 xedEnum = int   # Python type hint for XED C enumerations
+# Python type hint for code inputs. Any buffer-protocol object (mmap, numpy.ndarray, array...) is accepted
+BytesLike = Union[bytes, bytearray, memoryview]
 
 
 def load_xed_shared_library(lib_path: Path):
@@ -66,6 +71,35 @@ def load_xed_shared_library(lib_path: Path):
     # Initialize XedPy class-level attributes
     XedPy.ffi = ffi
     XedPy.lib = lib
+    XedPy.enum_strs = build_enum_str_tables(ffi, lib)
+
+
+# XED enumerations whose strings are cached by build_enum_str_tables()
+XED_STR_ENUMS = ('iclass', 'iform', 'category', 'extension', 'isa_set', 'chip', 'operand',
+                 'reg', 'operand_visibility', 'operand_action', 'attribute', 'error')
+
+
+def build_enum_str_tables(ffi, lib) -> dict[str, tuple[str, ...]]:
+    """
+    Build the enum-to-string lookup tables for the XED enumerations in XED_STR_ENUMS.
+
+    Each table is indexed by the enumeration value and holds interned Python strings,
+    so converting an enumeration to a string costs a tuple lookup instead of an FFI
+    call, a C string conversion and a decode.
+
+    Returns:
+        dict: Maps an enumeration name (e.g. 'iclass') to its string table.
+    """
+    tables = {}
+    for enum_name in XED_STR_ENUMS:
+        last = getattr(lib, f'xed_{enum_name}_enum_t_last_py')()
+        enum2str = getattr(lib, f'xed_{enum_name}_enum_t2str_py')
+        strings = []
+        for value in range(last):
+            cstr = enum2str(value)
+            strings.append(sys.intern(ffi.string(cstr).decode('utf-8')) if cstr != ffi.NULL else '')
+        tables[enum_name] = tuple(strings)
+    return tables
 
 
 @dataclass(frozen=True)
@@ -116,33 +150,220 @@ class XedInstructionOperand:
             A cdata pointer to a fully initialized xed_encoder_operand_t instance.
         """
         op = ffi.new("xed_encoder_operand_t *")
-        
+        self.set_xed_encoder_operand_t(op[0], lib.str2xed_reg_enum_t_py, lib)
+        return op
+
+    def set_xed_encoder_operand_t(self, op, str2reg, lib) -> None:
+        """
+        Fill an existing xed_encoder_operand_t struct (e.g. an element of a preallocated
+        xed_encoder_instruction_t operands array) from this operand.
+
+        Args:
+            op: The xed_encoder_operand_t cdata struct to populate.
+            str2reg: Callable converting a register name (bytes) to xed_reg_enum_t.
+        """
         assert not (self.is_imm and self.is_mem), 'Operand cannot be both immediate and memory'
         
         if self.is_mem:
-            op[0].type = lib.XED_ENCODER_OPERAND_TYPE_MEM
-            op[0].u.mem.base = lib.str2xed_reg_enum_t_py(self.base_reg.encode())
-            op[0].u.mem.index = lib.str2xed_reg_enum_t_py(self.index_reg.encode())
-            op[0].u.mem.seg = lib.XED_REG_INVALID   # segment is not supported yet
-            op[0].u.mem.scale = self.scale if self.scale is not None else 1
-            op[0].u.mem.disp.displacement = self.displacement if self.displacement is not None else 0
-            op[0].u.mem.disp.displacement_bits = 8 * (self.operand_length if self.operand_length else 0)
+            op.type = lib.XED_ENCODER_OPERAND_TYPE_MEM
+            op.u.mem.base = str2reg(self.base_reg.encode())
+            op.u.mem.index = str2reg(self.index_reg.encode())
+            op.u.mem.seg = lib.XED_REG_INVALID   # segment is not supported yet
+            op.u.mem.scale = self.scale if self.scale is not None else 1
+            op.u.mem.disp.displacement = self.displacement if self.displacement is not None else 0
+            op.u.mem.disp.displacement_bits = 8 * (self.operand_length if self.operand_length else 0)
         elif self.is_imm:
-            op[0].type = lib.XED_ENCODER_OPERAND_TYPE_IMM0
+            op.type = lib.XED_ENCODER_OPERAND_TYPE_IMM0
             assert self.imm_value is not None, 'Immediate value is missing'
-            op[0].u.imm0 = self.imm_value
+            op.u.imm0 = self.imm_value
         else:   # register
-            op[0].type = lib.XED_ENCODER_OPERAND_TYPE_REG
-            op[0].u.reg = lib.str2xed_reg_enum_t_py(self.operand_reg.encode())
+            op.type = lib.XED_ENCODER_OPERAND_TYPE_REG
+            op.u.reg = str2reg(self.operand_reg.encode())
         
-        op[0].width_bits = self.operand_length * 8 if self.operand_length else 0
-        return op
+        op.width_bits = self.operand_length * 8 if self.operand_length else 0
+
+
+class XedOperandView:
+    """
+    A lazy view of one operand of the instruction currently decoded by a XedPy instance.
+
+    Each field is fetched from XED on first access and then cached. A view must not be
+    used after its XedPy instance decodes another instruction (RuntimeError is raised).
+    """
+    __slots__ = ('_xed', '_generation', '_xi', '_operand', 'index',
+                 '_name_id', '_reg_id', '_action_id', '_visibility_id', '_length_bits')
+
+    def __init__(self, xed: 'XedPy', xi: 'ffi.CData', index: int):
+        self._xed = xed
+        self._generation = xed.xedd_generation
+        self._xi = xi
+        self._operand = None
+        self.index = index
+        self._name_id = None
+        self._reg_id = None
+        self._action_id = None
+        self._visibility_id = None
+        self._length_bits = None
+
+    def _check(self) -> None:
+        if self._generation != self._xed.xedd_generation:
+            raise RuntimeError('XedOperandView used after another instruction was decoded')
+
+    def _xed_operand(self) -> 'ffi.CData':
+        if self._operand is None:
+            self._operand = self._xed.lib.xed_inst_operand_py(self._xi, self.index)
+        return self._operand
+
+    @property
+    def name_id(self) -> xedEnum:
+        self._check()
+        if self._name_id is None:
+            self._name_id = self._xed.lib.xed_operand_name_py(self._xed_operand())
+        return self._name_id
+
+    @property
+    def reg_id(self) -> xedEnum:
+        self._check()
+        if self._reg_id is None:
+            name_id = self.name_id
+            self._reg_id = self._xed.lib.xed_decoded_inst_get_reg_py(self._xed.xedd, name_id)
+        return self._reg_id
+
+    @property
+    def action_id(self) -> xedEnum:
+        self._check()
+        if self._action_id is None:
+            self._action_id = self._xed.lib.xed_decoded_inst_operand_action_py(self._xed.xedd, self.index)
+        return self._action_id
+
+    @property
+    def visibility_id(self) -> xedEnum:
+        self._check()
+        if self._visibility_id is None:
+            self._visibility_id = self._xed.lib.xed_operand_operand_visibility_py(self._xed_operand())
+        return self._visibility_id
+
+    @property
+    def length_bits(self) -> int:
+        self._check()
+        if self._length_bits is None:
+            self._length_bits = self._xed.lib.xed_decoded_inst_operand_length_bits_py(self._xed.xedd,
+                                                                                      self.index)
+        return self._length_bits
+
+    @property
+    def name(self) -> str:
+        return self._xed.enum_strs['operand'][self.name_id]
+
+    @property
+    def reg(self) -> str:
+        return self._xed.enum_strs['reg'][self.reg_id]
+
+    @property
+    def action(self) -> str:
+        return self._xed.enum_strs['operand_action'][self.action_id]
+
+    @property
+    def visibility(self) -> str:
+        return self._xed.enum_strs['operand_visibility'][self.visibility_id]
+
+    def __repr__(self):
+        return f'XedOperandView(index={self.index}, name={self.name}, reg={self.reg})'
+
+
+@dataclass
+class XedDecodedBuffer:
+    """
+    Columnar result of XedPy.decode_buffer(), one entry per decoded instruction.
+
+    Each column is an array.array and therefore supports the buffer protocol, so it
+    can be wrapped without copying, e.g. numpy.frombuffer(res.iforms, dtype=numpy.uint16).
+    Bytes that failed to decode get a non-zero xed_error_enum_t in `errors`, a length
+    of 1 and INVALID iclass/iform/category ids.
+    """
+    start_ip: int
+    offsets: array = field(default_factory=lambda: array('Q'))     # byte offset from start_ip
+    lengths: array = field(default_factory=lambda: array('B'))
+    iclasses: array = field(default_factory=lambda: array('H'))    # xed_iclass_enum_t
+    iforms: array = field(default_factory=lambda: array('H'))      # xed_iform_enum_t
+    categories: array = field(default_factory=lambda: array('H'))  # xed_category_enum_t
+    errors: array = field(default_factory=lambda: array('B'))      # xed_error_enum_t
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def ip(self, index: int) -> int:
+        """Return the instruction pointer of the index-th decoded instruction."""
+        return self.start_ip + self.offsets[index]
+
+    def extend(self, other: 'XedDecodedBuffer', start: int = 0, stop: Optional[int] = None) -> None:
+        """Append the records [start, stop) of another result (with the same offset origin)."""
+        if stop is None:
+            stop = len(other)
+        self.offsets.extend(other.offsets[start:stop])
+        self.lengths.extend(other.lengths[start:stop])
+        self.iclasses.extend(other.iclasses[start:stop])
+        self.iforms.extend(other.iforms[start:stop])
+        self.categories.extend(other.categories[start:stop])
+        self.errors.extend(other.errors[start:stop])
+
+
+class XedDecodedRecord:
+    """
+    A lightweight instruction record yielded by XedPy.iter_decode().
+
+    The ids are xed_iclass_enum_t/xed_iform_enum_t/xed_category_enum_t values and `error`
+    is a xed_error_enum_t (non-zero for undecodable bytes). The disassembly text is
+    formatted on first access of `text` and then cached.
+    """
+    __slots__ = ('_xed', '_itext', '_base', '_syntax', '_text',
+                 'ip', 'offset', 'length', 'iclass', 'iform', 'category', 'error')
+
+    def __init__(self, xed: 'XedPy', itext: 'ffi.CData', base: int, syntax: xedEnum,
+                 ip: int, offset: int, length: int,
+                 iclass: xedEnum, iform: xedEnum, category: xedEnum, error: xedEnum):
+        self._xed = xed
+        self._itext = itext     # Keeps the decoded buffer alive for lazy formatting
+        self._base = base       # Offset of the decoded window within itext
+        self._syntax = syntax
+        self._text = None
+        self.ip = ip
+        self.offset = offset
+        self.length = length
+        self.iclass = iclass
+        self.iform = iform
+        self.category = category
+        self.error = error
+
+    @property
+    def iclass_str(self) -> str:
+        return self._xed.enum_strs['iclass'][self.iclass]
+
+    @property
+    def text(self) -> Optional[str]:
+        """The disassembly of the instruction, or None if it failed to decode."""
+        if self._text is None and not self.error:
+            self._text = self._xed._disassemble_at(self._itext + self._base + self.offset,
+                                                   self.length, self._syntax, self.ip)
+        return self._text
+
+    def __repr__(self):
+        return f'XedDecodedRecord(ip={self.ip:#x}, length={self.length}, iclass={self.iclass_str})'
+
 
 class XedPy:
     BUFFER_SIZE = 700  # Constant for string buffer size
     ffi = None
     lib = None
+    enum_strs: dict[str, tuple[str, ...]] = {}  # Enum-to-string tables, see build_enum_str_tables()
+    iclass_cache: dict[str, xedEnum] = {}  # iclass name -> xed_iclass_enum_t
+    reg_cache: dict[bytes, xedEnum] = {}   # register name -> xed_reg_enum_t
+    attribute_cache: dict[int, tuple[int, tuple[str, ...]]] = {}  # xed_inst_t address -> attributes
     MAX_INSTRUCTION_BYTES = 15
+    DECODE_BATCH_SIZE = 1 << 16  # Max records produced by a single native decode_buffer() call
+    ITER_BATCH_SIZE = 4096  # Records decoded per native call by iter_decode()
+    OPERAND_PACKED_FIELDS = 5  # (name, reg, action, visibility, length_bits) ids per packed operand
+    MAX_PACKED_OPERANDS = 32
 
     def __init__(
             self, *,
@@ -158,6 +379,12 @@ class XedPy:
         assert XedPy.lib, f'XedPy.lib should be initialized first, use load_xed_shared_library()'
 
         self.xedd = self.ffi.new('xed_decoded_inst_t*')
+        self.xedd_generation = 0  # Counts the (re)initializations of `xedd`
+
+        # Output array of get_operands_packed(), see xed_decoded_inst_operands_packed_py()
+        self.packed_operands = array('I', [0]) * (self.OPERAND_PACKED_FIELDS * self.MAX_PACKED_OPERANDS)
+        self.c_packed_operands = self.ffi.from_buffer('xed_uint32_t[]', self.packed_operands,
+                                                      require_writable=True)
 
         # Set decoder ISA support by a given chip
         self.xed_chip: xedEnum = None
@@ -169,6 +396,18 @@ class XedPy:
         # Default Intel assembly syntax
         self.disas_syntax_default: xedEnum = self.lib.XED_SYNTAX_INTEL
 
+        # Disassembly output buffer and print info, allocated once and reused by every format.
+        # `disas_xedd` is a scratch decoded object for formatting XedDecodedRecord text.
+        self.disas_buffer = self.ffi.new(f'char[{self.BUFFER_SIZE}]')
+        self.disas_pi = self.ffi.new('xed_print_info_t*')
+        self.disas_xedd = self.ffi.new('xed_decoded_inst_t*')
+
+        # Encoder context, allocated once and reused by every encode request
+        self.enc_inst = self.ffi.new('xed_encoder_instruction_t*')
+        self.enc_req = self.ffi.new('xed_encoder_request_t*')
+        self.enc_itext = self.ffi.new('xed_uint8_t[]', self.MAX_INSTRUCTION_BYTES)
+        self.enc_olen = self.ffi.new('unsigned int*')
+
     def cstr_to_str(self, cstr: 'ffi.CData') -> str:
         """Convert a C char to a Python string."""
         return self.ffi.string(cstr).decode('utf-8')
@@ -191,7 +430,7 @@ class XedPy:
 
     def get_xed_chip(self) -> str:
         """Get the name of the current XED chip."""
-        chip_name: str = self.cstr_to_str(self.lib.xed_chip_enum_t2str_py(self.xed_chip))
+        chip_name: str = self.enum_strs['chip'][self.xed_chip]
         return chip_name
 
     def get_xed_enum_val(self, enum: str) -> xedEnum:
@@ -199,9 +438,25 @@ class XedPy:
         return getattr(self.lib, enum, None)
     
         
+    def get_iclass_enum(self, iclass_name: str) -> xedEnum:
+        """Get the xed_iclass_enum_t of an iclass name, caching the conversion."""
+        iclass = self.iclass_cache.get(iclass_name)
+        if iclass is None:
+            iclass = self.lib.str2xed_iclass_enum_t_py(self.str_to_cstr(iclass_name))
+            self.iclass_cache[iclass_name] = iclass
+        return iclass
+
+    def _str2reg(self, reg_name: bytes) -> xedEnum:
+        """Convert a register name to xed_reg_enum_t, caching the conversion."""
+        reg = self.reg_cache.get(reg_name)
+        if reg is None:
+            reg = self.lib.str2xed_reg_enum_t_py(reg_name)
+            self.reg_cache[reg_name] = reg
+        return reg
+
     def _set_encode_request(self, iclass_name: str, eosz: int, operands: list[XedInstructionOperand]= []):
         """
-        Construct and return a `xed_encoder_instruction_t` structure for encoding.
+        Populate and return the reusable `xed_encoder_instruction_t` structure for encoding.
 
         Parameters:
             iclass_name (str): The instruction class name (e.g., "MOV", "ADD") as a string
@@ -209,84 +464,234 @@ class XedPy:
             operands (list): Optional list of XedInstructionOperand operands instances
 
         Returns:
-            xed_encoder_instruction_t *: A pointer to the populated instruction structure
+            xed_encoder_instruction_t *: A pointer to the populated instruction structure.
+            It is owned by this XedPy instance and overwritten by the next encode request.
         """        
-        inst = self.ffi.new("xed_encoder_instruction_t *")
+        inst = self.enc_inst
 
-        iclass = self.lib.str2xed_iclass_enum_t_py(self.str_to_cstr(iclass_name))
+        iclass = self.get_iclass_enum(iclass_name)
 
         assert iclass, 'Invalid ICLASS'
 
-        c_operands = [op.to_xed_encoder_operand_t(self.ffi, self.lib) for op in operands]
-        
         # populate the instruction fields
         inst[0].mode = self.xed_dstate[0]
         inst[0].iclass = iclass
         inst[0].effective_operand_width = eosz
         inst[0].effective_address_width = 64  # Instead of 0
         inst[0].prefixes.i = 0
-        for i, opnd in enumerate(c_operands):
-            inst[0].operands[i] = opnd[0]
-        inst[0].noperands = len(c_operands)
+        for i, op in enumerate(operands):
+            op.set_xed_encoder_operand_t(inst[0].operands[i], self._str2reg, self.lib)
+        inst[0].noperands = len(operands)
 
         return inst
 
+    def _encode(self, iclass: str, eosz: int, operands: list[XedInstructionOperand]) -> int:
+        """Encode into the reusable output buffer `enc_itext` and return the encoded length."""
+        inst = self._set_encode_request(iclass, eosz, operands)
+
+        enc_req = self.enc_req
+        self.lib.xed_encoder_request_zero_set_mode_py(enc_req, self.ffi.addressof(inst, 'mode'))
+
+        # Convert to encoder request
+        convert_ok = self.lib.xed_convert_to_encoder_request_py(enc_req, inst)
+        if not convert_ok:
+            raise RuntimeError("Failed to convert encoder instruction to encoder request.")
+
+        # Encode
+        err = self.lib.xed_encode_py(enc_req, self.enc_itext, self.MAX_INSTRUCTION_BYTES, self.enc_olen)
+        if err != self.lib.XED_ERROR_NONE:
+            error_str = self.enum_strs['error'][err]
+            raise RuntimeError(f"XED ENCODE ERROR: {error_str}")
+
+        return self.enc_olen[0]
+
     def init_xedd(self) -> None:
         """Initialize the XED decoded instruction object with the current state and chip."""
+        self.xedd_generation += 1  # Invalidates outstanding XedOperandView objects
         self.lib.xed_decoded_inst_zero_set_mode_py(self.xedd, self.xed_dstate)
         self.lib.xed_decoded_inst_set_input_chip_py(self.xedd, self.xed_chip)
 
-    def decode_instruction(self, instruction_bytes: bytes) -> None:
+    def get_itext(self, buffer: BytesLike, offset: int = 0,
+                  length: Optional[int] = None) -> tuple['ffi.CData', int]:
+        """
+        Get a zero-copy C view of a window of a buffer-protocol object.
+
+        Args:
+            buffer (BytesLike): bytes, bytearray, memoryview, mmap, numpy uint8 array, etc.
+            offset (int): Start of the window within the buffer.
+            length (int): Size of the window, defaults to the rest of the buffer.
+
+        Returns:
+            tuple: The `xed_uint8_t[]` view of the whole buffer (which keeps it alive)
+            and the validated window length. The window starts at `view + offset`.
+        """
+        itext = self.ffi.from_buffer('xed_uint8_t[]', buffer)
+        size = len(itext)
+        if not 0 <= offset <= size:
+            raise IndexError(f'Offset {offset} is out of range for a buffer of {size} bytes')
+        if length is None:
+            length = size - offset
+        elif length < 0 or offset + length > size:
+            raise IndexError(f'Window [{offset}, {offset}+{length}) exceeds a buffer of {size} bytes')
+        return itext, length
+
+    def decode_instruction(self, instruction_bytes: BytesLike, offset: int = 0) -> None:
         """
         Decode a given instruction byte sequence using XED. Raise exception in case decode fails
 
+        The bytes are decoded in place (no copy is made), so a large mmap or memoryview
+        can be walked by advancing the offset.
+
         Args:
-            instruction_bytes (bytes): The raw instruction bytes to be decoded.
+            instruction_bytes (BytesLike): The raw instruction bytes to be decoded.
+            offset (int): The offset of the instruction within instruction_bytes.
         """
+        itext, available = self.get_itext(instruction_bytes, offset)
         self.init_xedd()
-        ilen = min(len(instruction_bytes), self.MAX_INSTRUCTION_BYTES)
-        err: xedEnum = self.lib.xed_decode_py(self.xedd, instruction_bytes, ilen)
+        ilen = min(available, self.MAX_INSTRUCTION_BYTES)
+        err: xedEnum = self.lib.xed_decode_py(self.xedd, itext + offset, ilen)
         if err != self.lib.XED_ERROR_NONE:
-            idec_m = f'Failed to decode: {instruction_bytes[:ilen]}'
+            idec_m = f'Failed to decode: {bytes(self.ffi.buffer(itext + offset, ilen))}'
             if err is None:
                 raise RuntimeError(f'XED decode_instruction returned None. {idec_m}')
-            error_string: str = self.cstr_to_str(self.lib.xed_error_enum_t2str_py(err))
+            error_string: str = self.enum_strs['error'][err]
             raise RuntimeError(f'XED ERROR: {error_string}. {idec_m}')
 
-    def encode_instruction(self, iclass: str, eosz: int, operands: list[XedInstructionOperand]= []) -> bytes:
+    def decode_buffer(self, buffer: BytesLike, start_ip: int = 0, offset: int = 0,
+                      length: Optional[int] = None) -> XedDecodedBuffer:
         """
-        Encode a given xed_encoder_instruction_t into machine code.
+        Linear-sweep decode a whole buffer (e.g. a text section) in native code.
+
+        Instructions are decoded by xed_decode_buffer_py() in batches of DECODE_BATCH_SIZE,
+        so the Python<->C transition cost is paid once per batch rather than once per
+        instruction, and no Python object is created per instruction. Undecodable bytes
+        are recorded with their error code and skipped one byte at a time.
+        The input is decoded in place, without copying, and the `xedd` object of this
+        instance is not modified.
+
+        Args:
+            buffer (BytesLike): The raw code bytes; any buffer-protocol object is accepted.
+            start_ip (int): The instruction pointer of the first decoded byte.
+            offset (int): Start of the decoded window within the buffer.
+            length (int): Size of the decoded window, defaults to the rest of the buffer.
 
         Returns:
-            The encoded instruction as bytes.
+            XedDecodedBuffer: Offsets (relative to the window), lengths, iclass/iform/category
+            ids and error codes.
+        """
+        itext, length = self.get_itext(buffer, offset, length)
+        result = XedDecodedBuffer(start_ip)
+        self._decode_buffer_into(result, itext + offset, length, 0)
+        return result
+
+    def _decode_buffer_into(self, result: XedDecodedBuffer, itext: 'ffi.CData',
+                            nbytes: int, base_offset: int) -> None:
+        """Append the decode records of the first nbytes of itext to the result columns."""
+        for n, scratch in self._decode_batches(itext, nbytes, base_offset, self.DECODE_BATCH_SIZE):
+            result.extend(scratch, 0, n)
+
+    def _decode_batches(self, itext: 'ffi.CData', nbytes: int, base_offset: int,
+                        batch_size: int) -> Iterator[tuple[int, XedDecodedBuffer]]:
         """
+        Decode the first nbytes of itext with one native call per batch_size records.
 
-        inst = self._set_encode_request(iclass, eosz, operands)
+        Yields:
+            tuple: (n, scratch) where the first n records of the scratch XedDecodedBuffer
+            are valid until the next batch overwrites them.
+        """
+        batch = max(1, min(batch_size, nbytes))
+        scratch = XedDecodedBuffer(0,
+                                   offsets=array('Q', [0]) * batch,
+                                   lengths=array('B', [0]) * batch,
+                                   iclasses=array('H', [0]) * batch,
+                                   iforms=array('H', [0]) * batch,
+                                   categories=array('H', [0]) * batch,
+                                   errors=array('B', [0]) * batch)
+        consumed = self.ffi.new('xed_uint64_t*')
+
+        from_buffer = self.ffi.from_buffer
+        c_offsets = from_buffer('xed_uint64_t[]', scratch.offsets, require_writable=True)
+        c_lengths = from_buffer('xed_uint8_t[]', scratch.lengths, require_writable=True)
+        c_iclasses = from_buffer('xed_uint16_t[]', scratch.iclasses, require_writable=True)
+        c_iforms = from_buffer('xed_uint16_t[]', scratch.iforms, require_writable=True)
+        c_categories = from_buffer('xed_uint16_t[]', scratch.categories, require_writable=True)
+        c_errors = from_buffer('xed_uint8_t[]', scratch.errors, require_writable=True)
+
+        pos = 0
+        while pos < nbytes:
+            n = self.lib.xed_decode_buffer_py(self.xed_dstate, self.xed_chip,
+                                              itext + pos, nbytes - pos, base_offset + pos,
+                                              batch, c_offsets, c_lengths, c_iclasses,
+                                              c_iforms, c_categories, c_errors, consumed)
+            if n == 0:
+                break
+            yield n, scratch
+            pos += consumed[0]
+
+    def iter_decode(self, buffer: BytesLike, ip: int = 0, syntax: xedEnum = None,
+                    offset: int = 0, length: Optional[int] = None) -> Iterator['XedDecodedRecord']:
+        """
+        Lazily linear-sweep decode a buffer window, yielding one XedDecodedRecord per instruction.
 
-        enc_req = self.ffi.new("xed_encoder_request_t*")
-        self.lib.xed_encoder_request_zero_set_mode_py(enc_req, self.ffi.addressof(inst, 'mode'))
+        Decoding runs natively in batches of ITER_BATCH_SIZE records, so memory use is bounded
+        regardless of the input size. The disassembly text of a record is only produced when
+        its `text` attribute is accessed, using this instance's reusable format buffer.
+        The `xedd` object of this instance is not modified.
 
-        # Convert to encoder request
-        convert_ok = self.lib.xed_convert_to_encoder_request_py(enc_req, inst)
-        if not convert_ok:
-            raise RuntimeError("Failed to convert encoder instruction to encoder request.")
+        Args:
+            buffer (BytesLike): The raw code bytes; any buffer-protocol object is accepted.
+            ip (int): The instruction pointer of the first decoded byte.
+            syntax (xedEnum): The disassembly syntax of the records' text.
+            offset (int): Start of the decoded window within the buffer.
+            length (int): Size of the decoded window, defaults to the rest of the buffer.
+        """
+        itext, length = self.get_itext(buffer, offset, length)
+        if not syntax:
+            syntax = self.disas_syntax_default
+        for n, scratch in self._decode_batches(itext + offset, length, 0, self.ITER_BATCH_SIZE):
+            offsets, lengths, errors = scratch.offsets, scratch.lengths, scratch.errors
+            iclasses, iforms, categories = scratch.iclasses, scratch.iforms, scratch.categories
+            for i in range(n):
+                yield XedDecodedRecord(self, itext, offset, syntax, ip + offsets[i], offsets[i],
+                                       lengths[i], iclasses[i], iforms[i], categories[i], errors[i])
 
-        # Allocate output buffer
-        ilen = self.MAX_INSTRUCTION_BYTES
-        itext = self.ffi.new("xed_uint8_t[]", ilen)
-        olen = self.ffi.new("unsigned int*")
+    def encode_instruction(self, iclass: str, eosz: int, operands: list[XedInstructionOperand]= []) -> bytes:
+        """
+        Encode a given xed_encoder_instruction_t into machine code.
 
-        # Encode
-        err = self.lib.xed_encode_py(enc_req, itext, ilen, olen)
-        if err != self.lib.XED_ERROR_NONE:
-            error_str = self.cstr_to_str(self.lib.xed_error_enum_t2str_py(err))
-            raise RuntimeError(f"XED ENCODE ERROR: {error_str}")
+        Returns:
+            The encoded instruction as bytes.
+        """
+        olen = self._encode(iclass, eosz, operands)
+        return bytes(self.ffi.buffer(self.enc_itext, olen))
 
-        return bytes(self.ffi.buffer(itext, olen[0]))
+    def encode_many(self, requests: list[tuple[str, int, list[XedInstructionOperand]]]
+                    ) -> tuple[bytearray, array]:
+        """
+        Encode a list of instructions into one contiguous buffer.
+
+        Args:
+            requests (list): (iclass, eosz, operands) tuples, as for encode_instruction().
+
+        Returns:
+            tuple: A bytearray holding all the encodings back to back, and an array of
+            len(requests) + 1 offsets; the i-th encoding is out[offsets[i]:offsets[i + 1]].
+        """
+        out = bytearray()
+        offsets = array('Q', [0])
+        buffer = self.ffi.buffer(self.enc_itext)
+        for index, (iclass, eosz, operands) in enumerate(requests):
+            try:
+                olen = self._encode(iclass, eosz, operands)
+            except RuntimeError as e:
+                raise RuntimeError(f'encode_many() request #{index} ({iclass}): {e}') from e
+            out += buffer[:olen]
+            offsets.append(len(out))
+        return out, offsets
 
     def get_iclass(self) -> str:
         iclass: xedEnum = self.lib.xed_decoded_inst_get_iclass_py(self.xedd)
-        return self.cstr_to_str(self.lib.xed_iclass_enum_t2str_py(iclass))
+        return self.enum_strs['iclass'][iclass]
 
     def get_mnemonic(self, syntax: xedEnum = None) -> str:
         """
@@ -314,42 +719,69 @@ class XedPy:
 
     def get_category(self) -> str:
         category: xedEnum = self.lib.xed_decoded_inst_get_category_py(self.xedd)
-        return self.cstr_to_str(self.lib.xed_category_enum_t2str_py(category))
+        return self.enum_strs['category'][category]
 
     def get_extension(self) -> str:
         extension: xedEnum = self.lib.xed_decoded_inst_get_extension_py(self.xedd)
-        return self.cstr_to_str(self.lib.xed_extension_enum_t2str_py(extension))
+        return self.enum_strs['extension'][extension]
 
     def get_iform(self) -> str:
         iform: xedEnum = self.lib.xed_decoded_inst_get_iform_enum_py(self.xedd)
-        return self.cstr_to_str(self.lib.xed_iform_enum_t2str_py(iform))
+        return self.enum_strs['iform'][iform]
 
     def get_isa_set(self) -> str:
         isa_set: xedEnum = self.lib.xed_decoded_inst_get_isa_set_py(self.xedd)
-        return self.cstr_to_str(self.lib.xed_isa_set_enum_t2str_py(isa_set))
+        return self.enum_strs['isa_set'][isa_set]
 
     def get_attributes(self) -> List[str]:
         """
         Get the list of XED attributes set for the currently decoded instruction.
 
-        Iterates over all XED attributes and collects the names of those that are
-        set for the decoded instruction (e.g., 'SCALABLE', 'BYTEOP', 'NOP').
+        Collects the names of the attributes that are set for the decoded
+        instruction (e.g., 'SCALABLE', 'BYTEOP', 'NOP'). See get_attribute_mask().
 
         Returns:
             List[str]: The attribute names that apply to the decoded instruction.
         """
-        attributes: List[str] = []
+        return list(self._get_inst_attributes()[1])
 
-        xi = self.lib.xed_decoded_inst_inst_py(self.xedd)
-        nattributes = self.lib.xed_attribute_max_py()
+    def get_attribute_mask(self) -> int:
+        """
+        Get the XED attributes of the currently decoded instruction as a bitmask.
+
+        Bit N is set when the attribute whose xed_attribute_enum_t value is N applies
+        to the instruction, so masks can be tested or combined without string compares
+        (e.g. `mask & (1 << XedPy.enum_strs['attribute'].index('NOP'))`).
+
+        Returns:
+            int: The attribute bitmask of the decoded instruction.
+        """
+        return self._get_inst_attributes()[0]
 
-        for i in range(nattributes):
+    def _get_inst_attributes(self) -> tuple[int, tuple[str, ...]]:
+        """
+        Return the (bitmask, names) attribute pair of the decoded instruction's xed_inst_t.
+
+        Attributes are a static property of the xed_inst_t table entry, so they are
+        collected with the per-attribute FFI calls only once per entry and then served
+        from XedPy.attribute_cache, keyed by the xed_inst_t address.
+        """
+        xi = self.lib.xed_decoded_inst_inst_py(self.xedd)
+        key = int(self.ffi.cast('uintptr_t', xi))
+        cached = self.attribute_cache.get(key)
+        if cached is not None:
+            return cached
+
+        mask = 0
+        names: List[str] = []
+        for i in range(self.lib.xed_attribute_max_py()):
             attr = self.lib.xed_attribute_py(i)
             if self.lib.xed_inst_get_attribute_py(xi, attr):
-                attr_str = self.cstr_to_str(self.lib.xed_attribute_enum_t2str_py(attr))
-                attributes.append(attr_str)
-
-        return attributes
+                mask |= 1 << attr
+                names.append(self.enum_strs['attribute'][attr])
+        cached = (mask, tuple(names))
+        self.attribute_cache[key] = cached
+        return cached
 
     def get_decoded_inst_length(self) -> int:
         return self.lib.xed_decoded_inst_get_length_py(self.xedd)
@@ -366,30 +798,77 @@ class XedPy:
         print(f'{"ISA_SET":<{PAD}}: {self.get_isa_set()}')
         print(f'{"ATTRIBUTES":<{PAD}}: {", ".join(self.get_attributes())}')
 
-        # Allocate a buffer for the instruction format dump
-        buffer = self.ffi.new(f'char[{self.BUFFER_SIZE}]')
+        # Reuse the disassembly buffer for the instruction format dump
+        buffer = self.disas_buffer
         self.lib.xed_decoded_inst_dump_xed_format_py(self.xedd, buffer, self.BUFFER_SIZE, 0)
         print('\n==== XED Operands: ====')
         print(self.cstr_to_str(buffer), end='\n\n')
 
-    def disassemble(self, syntax: xedEnum = None) -> str:
+    def disassemble(self, syntax: xedEnum = None, runtime_address: int = 0) -> str:
         """Return the assembly string of a decoded xedd instruction."""
-        buffer = self.ffi.new(f'char[{self.BUFFER_SIZE}]')
+        if not syntax:
+            syntax = self.disas_syntax_default
+        return self._format(self.xedd, syntax, runtime_address)
+
+    def _format(self, xedd: 'ffi.CData', syntax: xedEnum, runtime_address: int) -> str:
+        """Format a decoded instruction with the reusable print info and output buffer."""
         # Init the xed_print_info_t struct
-        pi = self.ffi.new('xed_print_info_t*')
+        pi = self.disas_pi
         self.lib.xed_init_print_info_py(pi)
-        pi.p = self.xedd
+        pi.p = xedd
         pi.blen = self.BUFFER_SIZE
-        pi.buf = buffer
-        if not syntax:
-            syntax = self.disas_syntax_default
+        pi.buf = self.disas_buffer
         pi.syntax = syntax
+        pi.runtime_address = runtime_address
 
         ok = self.lib.xed_format_generic_py(pi)  # Disassemble the decoded instruction
         if not ok:
             raise RuntimeError('XED disassemble ERROR')
 
-        return self.cstr_to_str(buffer)
+        return self.cstr_to_str(self.disas_buffer)
+
+    def _disassemble_at(self, itext: 'ffi.CData', length: int, syntax: xedEnum,
+                        runtime_address: int) -> str:
+        """Decode and format an instruction without modifying `xedd` (see XedDecodedRecord)."""
+        xedd = self.disas_xedd
+        self.lib.xed_decoded_inst_zero_set_mode_py(xedd, self.xed_dstate)
+        self.lib.xed_decoded_inst_set_input_chip_py(xedd, self.xed_chip)
+        err: xedEnum = self.lib.xed_decode_py(xedd, itext, length)
+        if err != self.lib.XED_ERROR_NONE:
+            raise RuntimeError(f'XED ERROR: {self.enum_strs["error"][err]}')
+        return self._format(xedd, syntax, runtime_address)
+
+    def get_operand_views(self) -> tuple['XedOperandView', ...]:
+        """
+        Get lazy views of the operands of the currently decoded instruction.
+
+        Unlike get_operands(), no operand field is fetched until it is accessed, so
+        callers that only need e.g. the register of operand 0 pay for one FFI call.
+        The views are valid until the next decode_instruction() on this instance.
+        """
+        xi = self.lib.xed_decoded_inst_inst_py(self.xedd)
+        noperands = self.lib.xed_inst_noperands_py(xi)
+        return tuple(XedOperandView(self, xi, op_num) for op_num in range(noperands))
+
+    def get_operands_packed(self) -> tuple[tuple[int, int, int, int, int], ...]:
+        """
+        Get the operands of the currently decoded instruction as integer enum ids.
+
+        All operands are collected by a single native call. Ids can be turned into
+        names with the XedPy.enum_strs tables ('operand', 'reg', 'operand_action',
+        'operand_visibility').
+
+        Returns:
+            tuple: One (operand, reg, action, visibility, length_bits) tuple per operand.
+        """
+        noperands = self.lib.xed_decoded_inst_operands_packed_py(self.xedd, self.c_packed_operands,
+                                                                 self.MAX_PACKED_OPERANDS)
+        if noperands > self.MAX_PACKED_OPERANDS:
+            raise RuntimeError(f'Instruction has {noperands} operands, '
+                               f'more than MAX_PACKED_OPERANDS={self.MAX_PACKED_OPERANDS}')
+        fields = self.OPERAND_PACKED_FIELDS
+        packed = self.packed_operands
+        return tuple(tuple(packed[i:i + fields]) for i in range(0, noperands * fields, fields))
 
     def get_operands(self) -> List[XedInstructionOperand]:
         instr_operands = []
@@ -397,25 +876,26 @@ class XedPy:
         xi = self.lib.xed_decoded_inst_inst_py(self.xedd)
         noperands = self.lib.xed_inst_noperands_py(xi)
 
+        operand_strs = self.enum_strs['operand']
+        reg_strs = self.enum_strs['reg']
+        visibility_strs = self.enum_strs['operand_visibility']
+        action_strs = self.enum_strs['operand_action']
+
         mem_operand_index = 0
         for op_num in range(noperands):
             xed_operand_t = self.lib.xed_inst_operand_py(xi, op_num)
 
             op_enum = self.lib.xed_operand_name_py(xed_operand_t)
-            op_c_str = self.lib.xed_operand_enum_t2str_py(op_enum)
-            op_str = self.cstr_to_str(op_c_str)
+            op_str = operand_strs[op_enum]
 
             reg_enum = self.lib.xed_decoded_inst_get_reg_py(self.xedd, op_enum)
-            reg_c_str = self.lib.xed_reg_enum_t2str_py(reg_enum)
-            reg_str = self.cstr_to_str(reg_c_str)
+            reg_str = reg_strs[reg_enum]
 
             visibility_enum = self.lib.xed_operand_operand_visibility_py(xed_operand_t)
-            visibility_c_str = self.lib.xed_operand_visibility_enum_t2str_py(visibility_enum)
-            visibility_str = self.cstr_to_str(visibility_c_str)
+            visibility_str = visibility_strs[visibility_enum]
 
             action_enum = self.lib.xed_decoded_inst_operand_action_py(self.xedd, op_num)
-            action_c_str = self.lib.xed_operand_action_enum_t2str_py(action_enum)
-            action_str = self.cstr_to_str(action_c_str)
+            action_str = action_strs[action_enum]
 
             operand_length = self.lib.xed_decoded_inst_operand_length_bits_py(self.xedd, op_num)
             is_mem = op_str in {"AGEN", "MEM0", "MEM1"}  # determine if the operand is a memory operand
@@ -448,13 +928,11 @@ class XedPy:
                 )
             else:
                 base_reg_enum = self.lib.xed_decoded_inst_get_base_reg_py(self.xedd, mem_operand_index)
-                base_reg_c_str = self.lib.xed_reg_enum_t2str_py(base_reg_enum)
-                base_reg_str = self.cstr_to_str(base_reg_c_str)
+                base_reg_str = reg_strs[base_reg_enum]
                 base_reg_str = base_reg_str if base_reg_str != "INVALID" else None
 
                 index_reg_enum = self.lib.xed_decoded_inst_get_index_reg_py(self.xedd, mem_operand_index)
-                index_reg_c_str = self.lib.xed_reg_enum_t2str_py(index_reg_enum)
-                index_reg_str = self.cstr_to_str(index_reg_c_str)
+                index_reg_str = reg_strs[index_reg_enum]
                 # only first operand can be index operand
                 if mem_operand_index == 0 and index_reg_str != "INVALID":
                     # only have a scale if the index exists
@@ -486,6 +964,115 @@ class XedPy:
         return instr_operands
 
 
+class ParallelDecoder:
+    """
+    Linear-sweep decode large buffers on a thread pool.
+
+    XED's tables are read-only once xed_tables_init() has run, so any number of threads
+    may decode concurrently as long as each uses its own xed_decoded_inst_t. The native
+    loop of XedPy.decode_buffer() keeps its xed_decoded_inst_t on the C stack and only
+    reads the XedPy decoder state, and CFFI releases the GIL around native calls, so the
+    chunks of a buffer are decoded in parallel by a single shared XedPy instance.
+
+    Without known instruction boundaries, the buffer is split into chunk_size chunks and
+    each chunk is decoded `overlap` bytes past its end. When merging, a chunk's decode is
+    followed until it reaches an instruction offset also produced by the next chunk (the
+    streams resynchronize quickly on x86); the next chunk's records are used from there.
+    If no such offset is found in the overlap, the next chunk is re-decoded serially from
+    the correct offset. The merged result is identical to a serial XedPy.decode_buffer().
+    """
+    MIN_CHUNK_SIZE = 4096
+
+    def __init__(self, xed: XedPy, max_workers: Optional[int] = None,
+                 chunk_size: int = 1 << 20, overlap: int = 4096):
+        self.xed = xed
+        self.chunk_size = max(chunk_size, self.MIN_CHUNK_SIZE)
+        self.overlap = max(overlap, XedPy.MAX_INSTRUCTION_BYTES)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self) -> None:
+        """Shut down the worker threads."""
+        self.executor.shutdown()
+
+    def __enter__(self) -> 'ParallelDecoder':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _decode_range(self, window: 'ffi.CData', begin: int, end: int) -> XedDecodedBuffer:
+        """Decode window[begin:end]; record offsets are relative to the window."""
+        part = XedDecodedBuffer(0)
+        self.xed._decode_buffer_into(part, window + begin, end - begin, begin)
+        return part
+
+    def decode(self, buffer: BytesLike, start_ip: int = 0, offset: int = 0,
+               length: Optional[int] = None,
+               boundaries: Optional[List[int]] = None) -> XedDecodedBuffer:
+        """
+        Decode a buffer window in parallel, see XedPy.decode_buffer() for the arguments.
+
+        Args:
+            boundaries (list): Optional window offsets known to be instruction starts
+                (e.g. function symbols). When given, the window is split exactly there
+                and no overlap decoding or resynchronization is needed.
+
+        Returns:
+            XedDecodedBuffer: The merged, ordered result.
+        """
+        itext, length = self.xed.get_itext(buffer, offset, length)
+        window = itext + offset  # `itext` keeps the underlying buffer alive
+
+        if boundaries is not None:
+            starts = [0] + sorted({b for b in boundaries if 0 < b < length})
+            ends = starts[1:] + [length]
+        else:
+            starts = list(range(0, length, self.chunk_size)) or [0]
+            ends = [min(s + self.chunk_size + self.overlap, length) for s in starts]
+
+        parts = list(self.executor.map(lambda r: self._decode_range(window, *r), zip(starts, ends)))
+
+        result = XedDecodedBuffer(start_ip)
+        if boundaries is not None:
+            for part in parts:
+                result.extend(part)
+        else:
+            self._merge_overlapped(result, window, length, starts, ends, parts)
+        return result
+
+    def _merge_overlapped(self, result: XedDecodedBuffer, window: 'ffi.CData', length: int,
+                          starts: List[int], ends: List[int], parts: List[XedDecodedBuffer]) -> None:
+        """Concatenate overlapping chunk decodes, switching chunks at resynchronization points."""
+        pos = 0  # first record of parts[k] that belongs to the merged stream
+        for k, part in enumerate(parts):
+            if k == len(parts) - 1:
+                result.extend(part, pos)
+                break
+
+            nxt = parts[k + 1]
+            # Records close to a truncated window end may be bogus BUFFER_TOO_SHORT errors
+            sync_limit = ends[k] if ends[k] == length else ends[k] - XedPy.MAX_INSTRUCTION_BYTES
+            first = bisect_left(part.offsets, starts[k + 1], pos)
+            i = first
+            while i < len(part) and part.offsets[i] <= sync_limit:
+                j = bisect_left(nxt.offsets, part.offsets[i])
+                if j < len(nxt) and nxt.offsets[j] == part.offsets[i]:
+                    result.extend(part, pos, i)
+                    pos = j
+                    break
+                i += 1
+            else:
+                # No common instruction start in the overlap: decode the next chunk again
+                # from where this chunk's instruction stream crossed into it.
+                result.extend(part, pos, first)
+                if first < len(part):
+                    resume = part.offsets[first]
+                else:
+                    resume = part.offsets[-1] + part.lengths[-1] if len(part) else starts[k + 1]
+                parts[k + 1] = self._decode_range(window, resume, max(resume, ends[k + 1]))
+                pos = 0
+
+
 def parse_arguments() -> argparse.Namespace:
     """Parse command-line arguments"""
     parser = argparse.ArgumentParser(description='Python example using XED via CFFI')
@@ -532,13 +1119,11 @@ def run_decoder_example() -> None:
                                253, 59, 0, 188, 60, 232, 206, 61, 110, 206])
     bytes_len = len(instruction_bytes)
     inst_len = 0
-    instruction_view = memoryview(instruction_bytes) # Use memoryview for efficient slicing
 
     while inst_len < bytes_len:
-        inst_p = instruction_view[inst_len : inst_len + xed.MAX_INSTRUCTION_BYTES].tobytes()
-
-        # Decode the instruction
-        xed.decode_instruction(inst_p)
+        # Decode the instruction in place, at the current offset (no slicing or copying)
+        xed.decode_instruction(instruction_bytes, inst_len)
+        inst_p = instruction_bytes[inst_len : inst_len + xed.MAX_INSTRUCTION_BYTES]
 
         # Get the length of the decoded instruction
         decoded_length = xed.get_decoded_inst_length()
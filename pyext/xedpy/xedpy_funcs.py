@@ -92,6 +92,19 @@ xed_uint_t xed_attribute_max_py(void);
 xed_attribute_enum_t xed_attribute_py(xed_uint_t i);
 xed_uint32_t xed_inst_get_attribute_py(const xed_inst_t* p, xed_attribute_enum_t attr);
 const char* xed_attribute_enum_t2str_py(const xed_attribute_enum_t p);
+
+xed_iclass_enum_t xed_iclass_enum_t_last_py(void);
+xed_iform_enum_t xed_iform_enum_t_last_py(void);
+xed_category_enum_t xed_category_enum_t_last_py(void);
+xed_extension_enum_t xed_extension_enum_t_last_py(void);
+xed_isa_set_enum_t xed_isa_set_enum_t_last_py(void);
+xed_chip_enum_t xed_chip_enum_t_last_py(void);
+xed_operand_enum_t xed_operand_enum_t_last_py(void);
+xed_reg_enum_t xed_reg_enum_t_last_py(void);
+xed_operand_visibility_enum_t xed_operand_visibility_enum_t_last_py(void);
+xed_operand_action_enum_t xed_operand_action_enum_t_last_py(void);
+xed_attribute_enum_t xed_attribute_enum_t_last_py(void);
+xed_error_enum_t xed_error_enum_t_last_py(void);
 '''
 
 ################################# ENCODER APIs ##################################
@@ -105,3 +118,25 @@ xed_error_enum_t xed_encode_py(xed_encoder_request_t* r,
                                            unsigned int* olen);
 void xed_encode_request_print_py(const xed_encoder_request_t* p, char* buf, xed_uint_t buflen);
 '''
+
+################################# XEDPY HELPER APIs ##############################
+# Native helpers from src/py/xed-py-helpers.c (compiled only with --py-export)
+
+cdef_string += '''
+xed_uint_t xed_decode_buffer_py(const xed_state_t* dstate,
+                                xed_chip_enum_t chip,
+                                const xed_uint8_t* itext,
+                                xed_uint64_t nbytes,
+                                xed_uint64_t base_offset,
+                                xed_uint_t max_insts,
+                                xed_uint64_t* offsets,
+                                xed_uint8_t* lengths,
+                                xed_uint16_t* iclasses,
+                                xed_uint16_t* iforms,
+                                xed_uint16_t* categories,
+                                xed_uint8_t* errors,
+                                xed_uint64_t* consumed);
+xed_uint_t xed_decoded_inst_operands_packed_py(const xed_decoded_inst_t* xedd,
+                                               xed_uint32_t* out,
+                                               xed_uint_t max_operands);
+'''
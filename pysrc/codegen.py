@@ -31,6 +31,7 @@ import os
 import re
 import glob
 import datetime
+import hashlib
 
 from genutil import *
 
@@ -66,6 +67,30 @@ class ip_header_t(object):
       return out
 
 
+def _content_digest(content):
+   return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def _file_digest(fn):
+   """Return the digest of the text of an existing file, or None"""
+   if not os.path.exists(fn):
+      return None
+   try:
+      with open(fn,'r') as fp:
+         return _content_digest(fp.read())
+   except (IOError, UnicodeDecodeError):
+      return None
+
+def dump_changed_files(output_file_list):
+   """Write the names of the files rewritten by file emitters, for
+   xed_mbuild.py. See changed_files_list_name()."""
+   fp = base_open_file(changed_files_list_name(output_file_list), "w")
+   for fn in file_emitter_t.changed_files:
+      fp.write(fn + "\n")
+   fp.close()
+   msge("FE: %d files changed, %d unchanged" %
+        (len(file_emitter_t.changed_files),
+         len(file_emitter_t.unchanged_files)))
+
 class file_emitter_t(object):
    """Attach IP headers, standard includes, and namespace decorations
    to generated files. This replaces the file objects I was using for
@@ -76,6 +101,12 @@ class file_emitter_t(object):
     # note: in the following the '-' must be last or it will (try to) act like a range!
    header_guard_pattern = re.compile(r'[./-]')
 
+   # full names of the files rewritten by emit_file(). Files with the
+   # same content as before are not rewritten, so their mtimes do not
+   # trigger recompilation.
+   changed_files = []
+   unchanged_files = []
+
    def __init__(self,gendir, file_name, shell_file=False, namespace=None):
       """gendir is the output dir. If shell_file is True, we delimit
       the header differently."""
@@ -163,10 +194,16 @@ class file_emitter_t(object):
          msge("FE: Closing an already-closed file: " + self.full_file_name)
 
    def emit_file(self):
+      content = ''.join(self.lines)
+      if _file_digest(self.full_file_name) == _content_digest(content):
+         msge("FE:UNCHANGED " + self.full_file_name)
+         file_emitter_t.unchanged_files.append(self.full_file_name)
+         return
       msge("FE:EMIT_FILE " + self.full_file_name)
       fp = self.open_file(self.full_file_name,"w")
-      fp.writelines(self.lines)
+      fp.write(content)
       fp.close()
+      file_emitter_t.changed_files.append(self.full_file_name)
 
    # # # # # # # # # #   # # # # # # # # # #   # # # # # # # # # #
 
@@ -466,12 +503,6 @@ def emit_function_list(func_list,
    fe_header.start()
    fe_list.append(fe_header)
 
-   # remove any numbered files that we previously emitted. We won't
-   # necessarily overwrite them all each build and do not want
-   # stale files remaining from previous builds
-   for fn in glob.glob(mbuild.join(gendir, fn_prefix + '-[0-9]*.c')):
-       mbuild.remove_file(fn)
-
    for func in func_list:
       fe_header.write(func.emit_header())
       if not fe or fe.count_lines() + func.lines() >= max_lines_per_file:
@@ -492,6 +523,15 @@ def emit_function_list(func_list,
 
    fe.close()
    fe_header.close()
+
+   # remove numbered files that a previous build emitted past the last
+   # one written now. We do not want stale files remaining from previous
+   # builds. emit_file() decides whether the others are rewritten.
+   numbered_pattern = re.compile(re.escape(fn_prefix) + r'-([0-9]+)[.]c$')
+   for fn in glob.glob(mbuild.join(gendir, fn_prefix + '-[0-9]*.c')):
+       m = numbered_pattern.match(os.path.basename(fn))
+       if m and int(m.group(1)) >= file_number:
+           mbuild.remove_file(fn)
    return fe_list
 
 
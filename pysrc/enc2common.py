@@ -53,6 +53,7 @@ def warn(s):
     #genutil.warn(s)
     
 def dump_fields(x):
-    for fld in sorted(x.__dict__.keys()):
-        msge("{}: {}".format(fld,getattr(x,fld)))
+    fields = genutil.get_fields(x)
+    for fld in sorted(fields.keys()):
+        msge("{}: {}".format(fld,fields[fld]))
     msge("\n\n")
@@ -35,6 +35,9 @@ import argparse
 import itertools
 import collections
 import traceback
+import io
+import multiprocessing
+import concurrent.futures
 
 import codegen
 import read_xed_db
@@ -5582,8 +5585,9 @@ def spew(ii) -> bool:
     return is_unsupported_inst 
 
 
-def gather_stats(db):
-    global numbered_functions
+def collect_stats(db):
+    """Count the generated, skipped and unhandled forms of the current
+    configuration"""
     unhandled = 0
     forms = len(db)
     generated_fns = 0
@@ -5604,7 +5608,22 @@ def gather_stats(db):
             else:
                 handled += 1
                 generated_fns += gen_fn
-            
+    return { 'forms': forms,
+             'handled': handled,
+             'unhandled': unhandled,
+             'generated_fns': generated_fns,
+             'skipped_fns': skipped_fns,
+             'skipped_mpx': skipped_mpx,
+             'not_done': not_done }
+
+def dump_stats(stats):
+    global numbered_functions
+    forms = stats['forms']
+    handled = stats['handled']
+    unhandled = stats['unhandled']
+    skipped_fns = stats['skipped_fns']
+    skipped_mpx = stats['skipped_mpx']
+    not_done = stats['not_done']
     skipped = skipped_mpx + skipped_fns
     tot_focus = handled + unhandled + skipped # not counting various skipped
     dbg("// Forms:       {:4d}".format(forms))
@@ -5612,7 +5631,7 @@ def gather_stats(db):
     dbg("// Irrelevant:  {:4d}  ({:6.2f}%)".format(skipped, 100.0*skipped/tot_focus ))
     dbg("// Not handled: {:4d}  ({:6.2f}%)".format(unhandled, 100.0*unhandled/tot_focus))
     dbg("// Numbered functions:           {:5d}".format(numbered_functions))
-    dbg("// Generated Encoding functions: {:5d}".format(generated_fns))
+    dbg("// Generated Encoding functions: {:5d}".format(stats['generated_fns']))
     dbg("// Skipped Encoding functions:   {:5d}".format(skipped_fns))
     dbg("// Skipped MPX instr:            {:5d}".format(skipped_mpx))
     for space in not_done.keys():
@@ -5643,12 +5662,13 @@ class enc_env_t(object):
 
 
 
-def dump_output_file_names(fn, fe_list):
+def dump_output_file_names(fn, file_names):
     ofn = os.path.join(fn)
     o = open(ofn,"w")
-    for fe in fe_list:
-        o.write(fe.full_file_name + "\n")
+    for full_file_name in file_names:
+        o.write(full_file_name + "\n")
     o.close()
+    codegen.dump_changed_files(ofn)
 
 
 
@@ -5719,7 +5739,195 @@ def is_pre_determined_unsupported_inst(ii):
         return True
     return False
 
+class config_result_t(object):
+    """What gen_config() produces for one (mode, asz) configuration. It is
+    returned from worker processes, so it holds file names rather than
+    file emitters or instruction records."""
+    def __init__(self, mode, asz):
+        self.mode = mode
+        self.asz = asz
+        self.file_names = []
+        # map of ISA-SET to set of IFORMs not supported by enc2
+        self.unsupported_iforms = collections.defaultdict(set)
+        self.stats = None
+        self.dbg_text = ''
+        self.numbered_functions = 0
+        self.numbered_function_creators = collections.defaultdict(int)
+        self.changed_files = []
+        self.unchanged_files = []
+
+    def add_file_emitters(self, fel):
+        self.file_names.extend([fe.full_file_name for fe in fel])
+
+def prune_asz_list_for_mode(mode,alist):
+    '''make sure we only use addressing modes appropriate for our mode'''
+    for asz in alist:
+        if mode == 64:
+            if asz in [32,64]:
+                yield asz
+        elif asz != 64:
+            yield asz
+
+def gen_config(args, xeddb, width_info_dict, mode, asz):
+    """Generate the encoder, argument checker and test functions of one
+    (mode, asz) configuration. The per-record encoder state is reset
+    first so that the output does not depend on which other
+    configurations this process generated before."""
+    global numbered_functions
+    global numbered_function_creators
+    r = config_result_t(mode, asz)
+    numbered_functions = 0
+    numbered_function_creators = collections.defaultdict(int)
+    codegen.file_emitter_t.changed_files = []
+    codegen.file_emitter_t.unchanged_files = []
+    dbg_output = io.StringIO()
+    set_dbg_output(dbg_output)
+    for ii in xeddb.recs:
+        ii.encoder_functions = []
+        ii.encoder_skipped = False
+
+    env = enc_env_t(mode, asz, width_info_dict,
+                    short_ud0=args.short_ud0, operand_check=args.operand_check)
+    enc2test.set_test_gen_counters(env)
+    env.tests_per_form = 1
+    env.test_checked_interface = args.chk
+    
+    msge("Generating encoder functions for {}".format(env))
+    for ii in xeddb.recs:
+        # create encoder function. sets ii.encoder_functions
+        create_enc_fn(env, ii)
+        is_unsupported_inst = spew(ii)
+        if is_unsupported_inst:
+            r.unsupported_iforms[ii.isa_set].add(ii.iform) # add unsupported IFORM to this dict
+        # create test(s) sets ii.enc_test_functions
+        enc2test.create_test_fn_main(env, ii)
+        # create arg checkers.  sets ii.enc_arg_check_functions
+        enc2argcheck.create_arg_check_fn_main(env, ii) 
+
+    fel = emit_encode_functions(args,
+                                env,
+                                xeddb,
+                                function_type_name='encode',
+                                fn_list_attr='encoder_functions',
+                                config_prefix='',
+                                srcdir='src')
+    r.add_file_emitters(fel)
+    
+    fel = emit_encode_functions(args,
+                                env,
+                                xeddb,
+                                function_type_name='encoder-check',
+                                fn_list_attr='enc_arg_check_functions',
+                                config_prefix='chk-',
+                                srcdir='src-chk',
+                                extra_headers = [ 'xed/xed-enc2-m{}-a{}.h'.format(env.mode, env.asz) ])
+    r.add_file_emitters(fel)
+
+
+    msge("Writing encoder 'test' functions to .c and .h files")
+    func_list = []
+    iforms = []
+    for ii in xeddb.recs:
+        func_list.extend(ii.enc_test_functions)
+        # this is for the validation test to check  the iform after decode
+        n = len(ii.enc_test_functions)
+        if n:
+            iforms.extend(n*[ii.iform])
+        
+    config_descriptor = 'enc2-m{}-a{}'.format(mode,asz)
+    fn_prefix = 'xed-test-{}'.format(config_descriptor)
+    test_fn_hdr='{}.h'.format(fn_prefix)
+    enc2_fn_hdr='xed/xed-{}.h'.format(config_descriptor)
+    enc2_chk_fn_hdr='xed/xed-chk-{}.h'.format(config_descriptor)            
+    gen_src_dir = os.path.join(args.gendir, config_descriptor, 'test', 'src')
+    gen_hdr_dir = os.path.join(args.gendir, config_descriptor, 'test', 'hdr')
+    mbuild.cmkdir(gen_src_dir)
+    mbuild.cmkdir(gen_hdr_dir)
+                               
+    file_emitters = codegen.emit_function_list(func_list,
+                                               fn_prefix,
+                                               args.xeddir,
+                                               gen_src_dir,
+                                               gen_hdr_dir,
+                                               other_headers = [enc2_fn_hdr, enc2_chk_fn_hdr],
+                                               max_lines_per_file=15000)
+
+    r.add_file_emitters(file_emitters)
+
+
+    
+
+    # emit a C file initializing two arrays: one array with
+    # test function names, and another of the functdion names
+    # as strings so I can find them when I need to debug them.
+    fe = codegen.xed_file_emitter_t(args.xeddir,
+                                    gen_src_dir,
+                                    'testtable-m{}-a{}.c'.format(mode,asz))
+
+    fe.add_header(test_fn_hdr)
+    fe.start()
+    array_name = 'test_functions_m{}_a{}'.format(mode,asz)
+    fe.add_code_eol('typedef xed_uint32_t (*test_func_t)(xed_uint8_t* output_buffer, xed_decoded_inst_t* xedd)')
+    fe.add_code('test_func_t {}[] = {{'.format(array_name))
+    for fn in func_list:
+        fe.add_code('{},'.format(fn.get_function_name()))
+    fe.add_code('0')
+    fe.add_code('};')
+
+
+    fe.add_code('char const* {}_str[] = {{'.format(array_name))
+    for fn in func_list:
+        fe.add_code('"{}",'.format(fn.get_function_name()))
+    fe.add_code('0')
+    fe.add_code('};')
+
+    fe.add_code('const xed_iform_enum_t {}_iform[] = {{'.format(array_name))
+    for iform in iforms:
+        fe.add_code('XED_IFORM_{},'.format(iform))
+    fe.add_code('XED_IFORM_INVALID')
+    fe.add_code('};')
+    
+    fe.close()
+    r.add_file_emitters([fe])
+
+    r.stats = collect_stats(xeddb.recs)
+    r.dbg_text = dbg_output.getvalue()
+    r.numbered_functions = numbered_functions
+    r.numbered_function_creators = numbered_function_creators
+    r.changed_files = codegen.file_emitter_t.changed_files
+    r.unchanged_files = codegen.file_emitter_t.unchanged_files
+    return r
+
+# (args, xeddb, width_info_dict) inherited by the forked gen_config() workers
+_config_worker_input = None
+
+def _gen_config_worker(config):
+    (args, xeddb, width_info_dict) = _config_worker_input
+    (mode, asz) = config
+    return gen_config(args, xeddb, width_info_dict, mode, asz)
+
+def gen_all_configs(args, xeddb, width_info_dict, configs):
+    """Run gen_config() for each (mode, asz) pair in configs and return
+    the results in the same order. With --jobs > 1, the configurations
+    are generated in forked worker processes that inherit the database
+    instead of receiving a pickled copy of it."""
+    global _config_worker_input
+    if (args.jobs <= 1 or len(configs) < 2 or
+        'fork' not in multiprocessing.get_all_start_methods()):
+        return [ gen_config(args, xeddb, width_info_dict, mode, asz)
+                 for (mode, asz) in configs ]
+    _config_worker_input = (args, xeddb, width_info_dict)
+    try:
+        ctx = multiprocessing.get_context('fork')
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs,
+                                                    mp_context=ctx) as pool:
+            return list(pool.map(_gen_config_worker, configs))
+    finally:
+        _config_worker_input = None
+
 def work():
+    global numbered_functions
+    global numbered_function_creators
     
     arg_parser = argparse.ArgumentParser(description="Create XED encoder2")
     arg_parser.add_argument('-short-ud0',
@@ -5769,7 +5977,18 @@ def work():
                             dest='output_file_list',
                             help='Name of output file containing list of output files created. ' +
                             'Default: GENDIR/enc2-list-of-files.txt')
-
+    arg_parser.add_argument('--jobs', '-j',
+                            dest='jobs',
+                            type=int,
+                            default=1,
+                            help='Number of processes used to generate the ' +
+                            'mode/address-size configurations. Default: 1')
+    arg_parser.add_argument('--no-db-snapshot',
+                            dest='db_snapshot',
+                            action='store_false',
+                            default=True,
+                            help='Always read the XED db files instead of ' +
+                            'using GENDIR/enc2-db-snapshot.pickle')
 
     args = arg_parser.parse_args()
     args.prefix = os.path.join(args.gendir,'dgen')
@@ -5782,20 +6001,27 @@ def work():
     dbg_fn = os.path.join(args.gendir,'enc2out-m{}-a{}.txt'.format(_mkstr(args.modes),
                                                                    _mkstr(args.asz_list)))
     msge("Writing {}".format(dbg_fn))
-    set_dbg_output(open(dbg_fn,"w"))
+    dbg_file = open(dbg_fn,"w")
+    set_dbg_output(dbg_file)
     
     gen_setup.make_paths(args)
     # Use a dedicated enc2 generated instructions file
     args.instructions_filename  = gen_setup.check_exist(os.path.join(args.prefix, 
                                                                      'all-enc2-instructions.txt'))
     msge('Reading XED db...')
-    xeddb = read_xed_db.xed_reader_t(args.state_bits_filename,
-                                     args.instructions_filename,
-                                     args.widths_filename,
-                                     args.extra_widths_filename,
-                                     args.element_types_filename,
-                                     args.cpuid_filename,
-                                     args.map_descriptions)
+    filenames = (args.state_bits_filename,
+                 args.instructions_filename,
+                 args.widths_filename,
+                 args.extra_widths_filename,
+                 args.element_types_filename,
+                 args.cpuid_filename,
+                 args.map_descriptions)
+    if args.db_snapshot:
+        # shared by the generator runs of all the enc2 configurations
+        snapshot_fn = os.path.join(args.gendir, 'enc2-db-snapshot.pickle')
+        xeddb = read_xed_db.xed_reader_t.load_or_read(snapshot_fn, *filenames)
+    else:
+        xeddb = read_xed_db.xed_reader_t(*filenames)
 
 
     width_info_dict = xeddb.get_width_info_dict()
@@ -5827,132 +6053,40 @@ def work():
     for ii in xeddb.recs:
         prep_instruction(ii)
         
-    def prune_asz_list_for_mode(mode,alist):
-        '''make sure we only use addressing modes appropriate for our mode'''
-        for asz in alist:
-            if mode == 64:
-                if asz in [32,64]:
-                    yield asz
-            elif asz != 64:
-                yield asz
-
-
-    output_file_emitters = []
-    # store unsupported IFORMS using a mapping of ISA-SET to set of IFORMs
-    unsupported_iforms = collections.defaultdict(set)
-    
-    #extra_headers =  ['xed/xed-encode-direct.h']
+    configs = []
     for mode in args.modes:
         for asz in prune_asz_list_for_mode(mode,args.asz_list):
-            env = enc_env_t(mode, asz, width_info_dict,
-                            short_ud0=args.short_ud0, operand_check=args.operand_check)
-            enc2test.set_test_gen_counters(env)
-            env.tests_per_form = 1
-            env.test_checked_interface = args.chk
-            
-            msge("Generating encoder functions for {}".format(env))
-            for ii in xeddb.recs:
-                # create encoder function. sets ii.encoder_functions
-                create_enc_fn(env, ii)
-                is_unsupported_inst = spew(ii)
-                if is_unsupported_inst:
-                    unsupported_iforms[ii.isa_set].add(ii.iform) # add unsupported IFORM to this dict
-                # create test(s) sets ii.enc_test_functions
-                enc2test.create_test_fn_main(env, ii)
-                # create arg checkers.  sets ii.enc_arg_check_functions
-                enc2argcheck.create_arg_check_fn_main(env, ii) 
-
-            fel = emit_encode_functions(args,
-                                        env,
-                                        xeddb,
-                                        function_type_name='encode',
-                                        fn_list_attr='encoder_functions',
-                                        config_prefix='',
-                                        srcdir='src')
-            output_file_emitters.extend(fel)
-            
-            fel = emit_encode_functions(args,
-                                        env,
-                                        xeddb,
-                                        function_type_name='encoder-check',
-                                        fn_list_attr='enc_arg_check_functions',
-                                        config_prefix='chk-',
-                                        srcdir='src-chk',
-                                        extra_headers = [ 'xed/xed-enc2-m{}-a{}.h'.format(env.mode, env.asz) ])
-            output_file_emitters.extend(fel)
-
-
-            msge("Writing encoder 'test' functions to .c and .h files")
-            func_list = []
-            iforms = []
-            for ii in xeddb.recs:
-                func_list.extend(ii.enc_test_functions)
-                # this is for the validation test to check  the iform after decode
-                n = len(ii.enc_test_functions)
-                if n:
-                    iforms.extend(n*[ii.iform])
-                
-            config_descriptor = 'enc2-m{}-a{}'.format(mode,asz)
-            fn_prefix = 'xed-test-{}'.format(config_descriptor)
-            test_fn_hdr='{}.h'.format(fn_prefix)
-            enc2_fn_hdr='xed/xed-{}.h'.format(config_descriptor)
-            enc2_chk_fn_hdr='xed/xed-chk-{}.h'.format(config_descriptor)            
-            gen_src_dir = os.path.join(args.gendir, config_descriptor, 'test', 'src')
-            gen_hdr_dir = os.path.join(args.gendir, config_descriptor, 'test', 'hdr')
-            mbuild.cmkdir(gen_src_dir)
-            mbuild.cmkdir(gen_hdr_dir)
-                                       
-            file_emitters = codegen.emit_function_list(func_list,
-                                                       fn_prefix,
-                                                       args.xeddir,
-                                                       gen_src_dir,
-                                                       gen_hdr_dir,
-                                                       other_headers = [enc2_fn_hdr, enc2_chk_fn_hdr],
-                                                       max_lines_per_file=15000)
-
-            output_file_emitters.extend(file_emitters)
+            configs.append((mode, asz))
+    results = gen_all_configs(args, xeddb, width_info_dict, configs)
 
-
-            
-
-            # emit a C file initializing two arrays: one array with
-            # test function names, and another of the functdion names
-            # as strings so I can find them when I need to debug them.
-            fe = codegen.xed_file_emitter_t(args.xeddir,
-                                            gen_src_dir,
-                                            'testtable-m{}-a{}.c'.format(mode,asz))
-
-            fe.add_header(test_fn_hdr)
-            fe.start()
-            array_name = 'test_functions_m{}_a{}'.format(mode,asz)
-            fe.add_code_eol('typedef xed_uint32_t (*test_func_t)(xed_uint8_t* output_buffer, xed_decoded_inst_t* xedd)')
-            fe.add_code('test_func_t {}[] = {{'.format(array_name))
-            for fn in func_list:
-                fe.add_code('{},'.format(fn.get_function_name()))
-            fe.add_code('0')
-            fe.add_code('};')
-
-
-            fe.add_code('char const* {}_str[] = {{'.format(array_name))
-            for fn in func_list:
-                fe.add_code('"{}",'.format(fn.get_function_name()))
-            fe.add_code('0')
-            fe.add_code('};')
-
-            fe.add_code('const xed_iform_enum_t {}_iform[] = {{'.format(array_name))
-            for iform in iforms:
-                fe.add_code('XED_IFORM_{},'.format(iform))
-            fe.add_code('XED_IFORM_INVALID')
-            fe.add_code('};')
-            
-            fe.close()
-            output_file_emitters.append(fe)
+    # merge the per-configuration results in configuration order
+    output_file_names = []
+    # store unsupported IFORMS using a mapping of ISA-SET to set of IFORMs
+    unsupported_iforms = collections.defaultdict(set)
+    numbered_functions = 0
+    numbered_function_creators = collections.defaultdict(int)
+    codegen.file_emitter_t.changed_files = []
+    codegen.file_emitter_t.unchanged_files = []
+    set_dbg_output(dbg_file)
+    for r in results:
+        output_file_names.extend(r.file_names)
+        for isa_set, iforms in r.unsupported_iforms.items():
+            unsupported_iforms[isa_set].update(iforms)
+        dbg_file.write(r.dbg_text)
+        numbered_functions += r.numbered_functions
+        for k, v in r.numbered_function_creators.items():
+            numbered_function_creators[k] += v
+        codegen.file_emitter_t.changed_files.extend(r.changed_files)
+        codegen.file_emitter_t.unchanged_files.extend(r.unchanged_files)
 
     dump_unsupported_iforms(unsupported_iforms, args.modes[0], args.gendir)
-    gather_stats(xeddb.recs)
+    if results:
+        dump_stats(results[-1].stats)
+    else: # the mode and address size options left no configuration
+        dump_stats(collect_stats(xeddb.recs))
     dump_numbered_function_creators()
     dump_output_file_names( args.output_file_list,
-                            output_file_emitters )
+                            output_file_names )
     return 0
 
 if __name__ == "__main__":
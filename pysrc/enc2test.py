@@ -556,6 +556,10 @@ def _create_enc_test_functions(env, ii, encfn):
     testfn.add_code(f'if (enc2_len == 0)')
     testfn.add_code_eol(f'  return 0')
 
+    # encode only, for the benchmark mode of the tester
+    testfn.add_code(f'if (xedd == 0)')
+    testfn.add_code_eol(f'  return enc2_len')
+
     # decode the encoded string and validate it
     testfn.add_code_eol('err = xed_decode(xedd, output_buffer, enc2_len)')
     testfn.add_code(f'if (err != XED_ERROR_NONE)')
@@ -32,6 +32,7 @@ Example: python gen_dump.py ../obj/dgen
 from __future__ import print_function
 import sys
 import read_xed_db
+import genutil
 import gen_setup
 
 def die(s):
@@ -51,8 +52,9 @@ def work(args):  # main function
 
     xeddb.recs.sort(key=lambda x:x.iclass)
     for r in xeddb.recs:
-        for fld in sorted(r.__dict__.keys()):
-            print("{}: {}".format(fld,getattr(r,fld)))
+        fields = genutil.get_fields(r)
+        for fld in sorted(fields.keys()):
+            print("{}: {}".format(fld,fields[fld]))
         print("EOSZ_LIST: {}".format(r.get_eosz_list()))
         print("\n\n")
     return 0
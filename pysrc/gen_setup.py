@@ -48,6 +48,10 @@ def create(help_string=''):
     parser = argparse.ArgumentParser(description=help_string)
     parser.add_argument('prefix', 
                         help='Path to obj/dgen directory')
+    parser.add_argument('--db-snapshot',
+                        dest='db_snapshot',
+                        help='Snapshot file of the parsed XED db. ' +
+                        'Used if up to date, (re)created otherwise.')
     return parser
 
 def make_paths(args):
@@ -64,13 +68,17 @@ def make_paths(args):
     args.map_descriptions       = _check_jn(args.prefix, 'all-map-descriptions.txt')
 
 def read_db(args) -> read_xed_db.xed_reader_t:
-    xeddb = read_xed_db.xed_reader_t(args.state_bits_filename,
-                                     args.instructions_filename,
-                                     args.widths_filename,
-                                     args.extra_widths_filename,
-                                     args.element_types_filename,
-                                     args.cpuid_filename,
-                                     args.map_descriptions)
+    filenames = (args.state_bits_filename,
+                 args.instructions_filename,
+                 args.widths_filename,
+                 args.extra_widths_filename,
+                 args.element_types_filename,
+                 args.cpuid_filename,
+                 args.map_descriptions)
+    snapshot = getattr(args, 'db_snapshot', None)
+    if snapshot:
+        return read_xed_db.xed_reader_t.load_or_read(snapshot, *filenames)
+    xeddb = read_xed_db.xed_reader_t(*filenames)
     return xeddb
 
 def read_chips(args) -> tuple[list[str], dict[str,str]]:
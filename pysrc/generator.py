@@ -73,6 +73,10 @@ import glob
 import re
 import optparse
 import collections
+import hashlib
+import pickle
+import multiprocessing
+import concurrent.futures
 from typing import Optional
 
 from genutil import add_mbuild_to_path, find_dir
@@ -125,6 +129,7 @@ import ctables
 import ild
 import refine_regs
 import classifier
+import genprof
 
 #####################################################################
 ## OPTIONS
@@ -281,6 +286,38 @@ def setup_arg_parser():
                           action="store_true",
                           dest="py_export",
                           help="Export XED APIs with a '_py' suffixed func name")
+    arg_parser.add_option("--jobs", "-j",
+                          action="store",
+                          type="int",
+                          dest="jobs",
+                          default=1,
+                          help="Number of worker processes for the " +
+                               "parallelizable generator phases. Default: 1")
+    arg_parser.add_option("--no-phash-cache",
+                          action="store_false",
+                          dest="phash_cache",
+                          default=True,
+                          help="Do not use the persistent ILD hash function " +
+                               "cache (GENDIR/ild-phash-cache.json)")
+    arg_parser.add_option("--no-parse-cache",
+                          action="store_false",
+                          dest="parse_cache",
+                          default=True,
+                          help="Do not use the persistent cache of parsed " +
+                               "decoder inputs " +
+                               "(GENDIR/decgen-parse-cache.pickle)")
+    arg_parser.add_option("--profile-json",
+                          action="store",
+                          dest="profile_json",
+                          default='',
+                          help="Write the wall time, CPU time and peak RSS " +
+                               "of each generator phase to this JSON file")
+    arg_parser.add_option("--profile-dir",
+                          action="store",
+                          dest="cprofile_dir",
+                          default='',
+                          help="Run each generator phase under cProfile " +
+                               "and write the stats to this directory")
     return arg_parser
 
 #####################################################################
@@ -930,6 +967,15 @@ global_inum = 0
 
 # $$ partitionable
 class partitionable_info_t(object):
+   # There is one of these (or of instruction_info_t) per pattern line, so
+   # the common fields are in slots. Other attributes go in __dict__.
+   __slots__ = ('inum', 'name', 'input_str', 'ipattern_input', 'ipattern',
+                'prebindings', 'operands_input', 'operands',
+                'extra_ipatterns', 'extra_operands', 'extra_iforms_input',
+                'reset_for_prefix', 'encoder_func_obj', 'encoder_operands',
+                'otherwise_ok', 'all_nonterminals', 'all_operand_deciders',
+                '__dict__')
+
    def new_inum(self):
       global global_inum
       self.inum = global_inum
@@ -1073,6 +1119,13 @@ structured_input_tags = {'ICLASS':          True,
 
 # $$ instruction_info_t
 class instruction_info_t(partitionable_info_t):
+   __slots__ = ('iclass', 'uname', 'ucode', 'comment', 'exceptions',
+                'version', 'category', 'extension', 'isa_set', 'cpl',
+                'attributes', 'flags_input', 'flags_info', 'iform',
+                'iform_input', 'iform_num', 'iform_enum',
+                'iclass_string_index', 'oid_list', 'oid_sequence',
+                'oid_sequence_start')
+
    def __init__(self,
                 iclass='',
                 ipattern_input='',
@@ -5206,6 +5259,7 @@ class all_generator_info_t(object):
       for fn in self.hdr_files + self.src_files:
          f.write(fn+"\n")
       f.close()
+      dump_changed_files(output_file_list)
       
    def close_output_files(self):
       """
@@ -5448,6 +5502,211 @@ def collect_convert_decorations(agi):
 
                     
                     
+############################################################################
+# Read and parse the decoder inputs, with a persistent parse cache
+############################################################################
+
+def read_all_input(agi):
+    """Read the spine, structured input and ISA files and make a generator
+    (with a parser_t) for each nonterminal"""
+    lines = []
+    spine  = base_open_file(agi.common.options.spine,"r").readlines()
+    lines.extend(spine)
+
+    msge("Reading structured input")
+    misc  = base_open_file(
+                     agi.common.options.structured_input_fn,"r").readlines()
+    lines.extend(misc)
+
+    msge("Reading Instructions (ISA) input")
+    isa_lines  = base_open_file(
+                     agi.common.options.isa_input_file,"r").readlines()
+    lines.extend(isa_lines)
+    del isa_lines
+    
+    lines = process_continuations(lines)
+
+    # read all the input
+    while len(lines) != 0:
+       msge("=============================================")
+       msge("Creating a generator " + str(len(agi.generator_list)))
+       msge("=============================================")
+       print_resource_usage('everything.1')
+       msge("ALines (lines before reading input) = " + str(len(lines)))
+       lines = read_input(agi, lines)
+       msge("BLines (lines remaining after reading input) = " + str(len(lines)))
+
+# Bump this when the parser_t/instruction_info_t representation changes
+# in a way that the generator source digest would not catch.
+_parse_cache_version = 1
+
+# options that do not affect parsing
+_parse_cache_ignored_options = ['debug', 'jobs', 'phash_cache', 'parse_cache',
+                                'profile_json', 'cprofile_dir']
+
+# options naming generator input files. Their contents are part of the
+# parse cache key. Other options may name output files.
+_parse_cache_input_options = ['input_regs', 'input_widths',
+                              'input_extra_widths', 'input_element_types',
+                              'input_element_type_base',
+                              'input_pointer_names', 'input_fields', 'input',
+                              'input_state', 'input_errors',
+                              'structured_input_fn', 'chip_models_input_fn',
+                              'ctables_input_fn', 'isa_input_file', 'spine',
+                              'cpuid_input_fn', 'map_descriptions_input_fn']
+
+def parse_cache_key(options):
+    """Return a digest of everything the parsed input depends on: the
+    generator sources, the option values and the contents of the input
+    files named by the options in _parse_cache_input_options. The inputs
+    of read_all_input() are parsed using the operand storage, widths,
+    xtypes, etc. read earlier, so all the input files take part."""
+    h = hashlib.sha1()
+    h.update(('%d:%d:' % (_parse_cache_version,
+                          pickle.HIGHEST_PROTOCOL)).encode('utf-8'))
+    pysrc = os.path.dirname(os.path.abspath(__file__))
+    for fn in sorted(glob.glob(os.path.join(pysrc, '*.py'))):
+       with open(fn, 'rb') as f:
+          h.update(f.read())
+    for name, value in sorted(vars(options).items()):
+       if name in _parse_cache_ignored_options:
+          continue
+       h.update(('%s=%r;' % (name, value)).encode('utf-8'))
+       if (name in _parse_cache_input_options and
+           isinstance(value, str) and os.path.isfile(value)):
+          with open(value, 'rb') as f:
+             h.update(f.read())
+    return h.hexdigest()
+
+def load_parse_cache(agi, fn, key):
+    """Restore the generators made by read_all_input() from the parse
+    cache file fn, if it was made for the same key. Return True on
+    success."""
+    global global_inum
+    if not os.path.exists(fn):
+       return False
+    try:
+       with open(fn, 'rb') as f:
+          data = pickle.load(f)
+    except Exception as e:
+       warn("Ignoring unreadable parse cache %s: %s" % (fn, e))
+       return False
+    if data.get('key') != key:
+       msge("PARSE CACHE: stale " + fn)
+       return False
+    for nt_name, parser in data['parsers']:
+       gi = agi.make_generator(nt_name)
+       gi.parser_output = parser
+       agi.nonterminal_dict.record_nonterminal(nt_name,
+                                               parser.nonterminal_type)
+    global_inum = data['global_inum']
+    msge("PARSE CACHE: loaded %d parsers from %s" % (len(data['parsers']),
+                                                     fn))
+    return True
+
+def save_parse_cache(agi, fn, key):
+    """Save the generators made by read_all_input() to fn"""
+    parsers = []
+    for gi in agi.generator_list:
+       parsers.append((gi.parser_output.nonterminal_name, gi.parser_output))
+    data = { 'key': key,
+             'parsers': parsers,
+             'global_inum': global_inum }
+    tmp_fn = fn + '.tmp'
+    try:
+       with open(tmp_fn, 'wb') as f:
+          pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+       os.replace(tmp_fn, fn)
+    except (OSError, pickle.PicklingError, RecursionError) as e:
+       warn("Could not write parse cache %s: %s" % (fn, e))
+
+############################################################################
+# Build the decoder graphs, optionally on a process pool
+#
+# The graph of each nonterminal only depends on its own parser output, so
+# the graphs can be built in forked worker processes. Node ids come from
+# the global graph_node.global_node_num and renum_node_id counters. The
+# workers count from zero, and the ids are shifted to what a serial run
+# would assign when the results are merged in generator order, so the
+# output does not depend on --jobs.
+############################################################################
+
+_graph_agi = None # the all_generator_info_t seen by forked graph workers
+
+def build_one_graph(agi, gi):
+   """Build, optimize and label the decoder graph of one generator"""
+   graph = build_graph(agi.common, 
+                       gi.parser_output, 
+                       agi.operand_storage.get_operands())
+
+   if not gi.parser_output.is_lookup_function():
+      optimize_graph(agi.common.options, graph)
+
+   # For epsilon nodes, where errors are allowed, we label all
+   # nodes in the subgraph with "otherwise_ok".
+   if gi.parser_output.otherwise_ok:
+      epsilon_label_graph(agi.common.options, graph)
+   return graph
+
+def _graph_worker(i):
+   """Build the graph of generator i with node counters starting at
+   zero. The parser output is returned with the graph so that the graph
+   nodes keep referring to its instruction objects."""
+   global renum_node_id
+   gi = _graph_agi.generator_list[i]
+   graph_node.global_node_num = 0
+   renum_node_id = -1
+   graph = build_one_graph(_graph_agi, gi)
+   return (gi.parser_output, graph,
+           graph_node.global_node_num, renum_node_id + 1)
+
+def _shift_node_ids(node, offset, visited):
+   if id(node) in visited:
+      return
+   visited.add(id(node))
+   node.id += offset
+   for nxt in node.next.values():
+      _shift_node_ids(nxt, offset, visited)
+
+def build_all_graphs(agi):
+   """Set gi.graph for every generator, using --jobs worker processes
+   where fork() is available"""
+   global _graph_agi
+   global renum_node_id
+   global g_operand_storage_dict
+
+   jobs = agi.common.options.jobs
+   if (jobs <= 1 or len(agi.generator_list) < 2 or
+       'fork' not in multiprocessing.get_all_start_methods()):
+      for gi in agi.generator_list:
+         gi.graph = build_one_graph(agi, gi)
+      return
+
+   _graph_agi = agi
+   try:
+      ctx = multiprocessing.get_context('fork')
+      with concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+                                                  mp_context=ctx) as pool:
+         results = list(pool.map(_graph_worker,
+                                 range(len(agi.generator_list))))
+   finally:
+      _graph_agi = None
+
+   # build_graph() sets this global for later phases
+   g_operand_storage_dict = agi.operand_storage.get_operands()
+   for gi, r in zip(agi.generator_list, results):
+      (parser_output, graph, created, renumbered) = r
+      if parser_output.is_lookup_function():
+         # not renumbered, the ids are the creation order
+         _shift_node_ids(graph, graph_node.global_node_num, set())
+      else:
+         _shift_node_ids(graph, renum_node_id + 1, set())
+      gi.parser_output = parser_output
+      gi.graph = graph
+      graph_node.global_node_num += created
+      renum_node_id += renumbered
+   msge("Built %d graphs with %d jobs" % (len(results), jobs))
+
 ############################################################################
 # Generate the graph and most tables
 ############################################################################
@@ -5476,22 +5735,18 @@ def gen_everything_else(agi):
     #eg EOSZ: [0,1,2,3]
     agi.common.state_space = compute_state_space(agi.common.state_bits)
 
-    lines = []
-    spine  = base_open_file(agi.common.options.spine,"r").readlines()
-    lines.extend(spine)
-
-    msge("Reading structured input")
-    misc  = base_open_file(
-                     agi.common.options.structured_input_fn,"r").readlines()
-    lines.extend(misc)
-
-    msge("Reading Instructions (ISA) input")
-    isa_lines  = base_open_file(
-                     agi.common.options.isa_input_file,"r").readlines()
-    lines.extend(isa_lines)
-    del isa_lines
-    
-    lines = process_continuations(lines)
+    genprof.begin('read-input')
+    parse_cache_fn = None
+    if agi.common.options.parse_cache:
+       parse_cache_fn = os.path.join(agi.common.options.gendir,
+                                     'decgen-parse-cache.pickle')
+       parse_key = parse_cache_key(agi.common.options)
+    if not parse_cache_fn or not load_parse_cache(agi, parse_cache_fn,
+                                                  parse_key):
+       read_all_input(agi)
+       if parse_cache_fn:
+          save_parse_cache(agi, parse_cache_fn, parse_key)
+    genprof.end()
 
     # Open structured output file
     if agi.common.options.structured_output_fn.startswith(os.path.sep):
@@ -5504,22 +5759,12 @@ def gen_everything_else(agi):
        sout = open(fn,"w")
        print_resource_usage('everything.0')
 
-    # read all the input
-    while len(lines) != 0:
-       msge("=============================================")
-       msge("Creating a generator " + str(len(agi.generator_list)))
-       msge("=============================================")
-       print_resource_usage('everything.1')
-       msge("ALines (lines before reading input) = " + str(len(lines)))
-       lines = read_input(agi, lines)
-       msge("BLines (lines remaining after reading input) = " + str(len(lines)))
-
     #after this we will have all deleted and udeleted instructions 
     #removed for all parsers, that have instructions.
     #Also all instructions with old versions will be dropped. 
     remove_instructions(agi)
     
-    # first pass on the input, build the graph, collect information
+    # first pass on the input
     for gi in agi.generator_list:
        # if anything has flags, then add a flags register
        add_flags_register_operand_all(agi,gi.parser_output)
@@ -5534,24 +5779,19 @@ def gen_everything_else(agi):
        mark_operands_internal(agi, gi.parser_output)
        if print_structured_output:
           gi.parser_output.print_structured_output(sout)
-       ###############################################
-       # BUILD THE GRAPH BY RECURSIVE PARTITIONING
-       ###############################################
-       gi.graph = build_graph(agi.common, 
-                              gi.parser_output, 
-                              agi.operand_storage.get_operands())
 
-       if not gi.parser_output.is_lookup_function():
-          optimize_graph(agi.common.options, gi.graph)
+    ###############################################
+    # BUILD THE GRAPHS BY RECURSIVE PARTITIONING
+    ###############################################
+    with genprof.phase('build-graphs'):
+       build_all_graphs(agi)
+
+    # collect information from the graphs
+    for gi in agi.generator_list:
        nt_name  = gi.graph.token
        #msge("GRAPHROOT: " + nt_name)
        agi.nonterminal_dict.add_graph_node(nt_name, gi.graph.id)
 
-       # For epsilon nodes, where errors are allowed, we label all
-       # nodes in the subgraph with "otherwise_ok".
-       if gi.parser_output.otherwise_ok:
-          epsilon_label_graph(agi.common.options, gi.graph)
-
        # do not collect operands from nonterminals that are lookup functions:
        if not gi.parser_output.is_lookup_function():
           #msge("Collecting graph enum info")
@@ -5568,6 +5808,7 @@ def gen_everything_else(agi):
        del sout
     
     print_resource_usage('everything.3')
+    genprof.begin('iforms')
     # Renumber the itable nodes so that they are sequential, skipping
     # over the lookup function itable entries.
     relabel_itable(agi)
@@ -5601,12 +5842,17 @@ def gen_everything_else(agi):
     write_instruction_data(agi, agi.iform_info)
     write_quick_iform_map(agi,agi.common.options.gendir,agi.iform_info)
     
+    genprof.end()
     print_resource_usage('everything.4b')
+    genprof.begin('decorate-operands')
     # mark bit positions in each "instruction"
     decorate_operands(agi.common.options,agi)
     print_resource_usage('everything.4c')
 
     decorate_instructions_with_exception_types(agi)
+    genprof.end()
+
+    genprof.begin('itable')
 
     agi.inst_fp = agi.open_file('xed-init-inst-table-data.c', start=False)
     agi.inst_fp.add_header('xed-inst-defs.h')
@@ -5670,8 +5916,10 @@ def gen_everything_else(agi):
                              agi.common.inst_file,
                              'xed_init_inst_table',
                              agi.itable_init_functions)
+    genprof.end()
     
     print_resource_usage('everything.12')          
+    genprof.begin('enums-and-tables')
     # some states are not assigned to in the graph and we must reserve
     # storage for them anyway. MODE is one example.
     agi.extend_operand_names_with_input_states()
@@ -5687,11 +5935,13 @@ def gen_everything_else(agi):
     # defines for emitted tables
     agi.code_gen_table_sizes()
     agi.close_flags_files()
+    genprof.end()
     print_resource_usage('everything.16')          
 
-    call_chipmodel(agi)
-    call_ctables(agi) 
-    emit_operand_storage(agi)
+    with genprof.phase('chipmodel-ctables-operand-storage'):
+       call_chipmodel(agi)
+       call_ctables(agi) 
+       emit_operand_storage(agi)
 
 ################################################
 def emit_operand_storage(agi):
@@ -6385,6 +6635,8 @@ def main():
        activate_debugger() # genutil
        
    set_verbosity_options(options.verbosity)
+   if options.profile_json or options.cprofile_dir:
+      genprof.enable(options.cprofile_dir)
    if options.xeddir == '':
       path_to_generator = sys.argv[0]
       (path_to_src, configure) = os.path.split(path_to_generator)
@@ -6396,45 +6648,64 @@ def main():
    if not os.path.exists(agi.common.options.gendir):
       die("Need a subdirectory called " + agi.common.options.gendir)
 
-   agi.map_info = map_info_rdr.read_file(options.map_descriptions_input_fn)
-   gen_operand_storage_fields(options,agi)
+   with genprof.phase('map-info'):
+      agi.map_info = map_info_rdr.read_file(options.map_descriptions_input_fn)
+   with genprof.phase('operand-storage'):
+      gen_operand_storage_fields(options,agi)
    
-   gen_regs(options,agi)
-
-   gen_widths(options,agi) # writes agi.widths_list and agi.widths_dict
-   gen_extra_widths(agi) # writes agi.extra_widths_nt and agi.exta_widths_reg
-   gen_element_types_base(agi) 
-   gen_element_types(agi) # write agi.xtypes dict, agi.xtypes
-   gen_pointer_names(options,agi)
-   gen_errors_enum(agi) 
+   with genprof.phase('regs'):
+      gen_regs(options,agi)
+
+   with genprof.phase('widths'):
+      gen_widths(options,agi) # writes agi.widths_list and agi.widths_dict
+      gen_extra_widths(agi) # writes agi.extra_widths_nt and agi.exta_widths_reg
+   with genprof.phase('xtypes'):
+      gen_element_types_base(agi) 
+      gen_element_types(agi) # write agi.xtypes dict, agi.xtypes
+      gen_pointer_names(options,agi)
+      gen_errors_enum(agi) 
    
    
    # this reads the pattern input, builds a graph, emits the decoder
    # graph and the itable, emits the extractor functions, computes the
    # iforms, writes map using iforms, computes capture
    # functions, gathers and emits enums. (That part should move out).
-   gen_everything_else(agi)
+   with genprof.phase('everything-else'):
+      gen_everything_else(agi)
    
    # emit functions to identify AVX and AVX512 instruction groups
-   classifier.work(agi) 
-   ild.work(agi)
-   map_info_rdr.emit_enums(agi)
+   with genprof.phase('classifier'):
+      classifier.work(agi) 
+   with genprof.phase('ild'):
+      ild.work(agi)
+   with genprof.phase('map-info-enums'):
+      map_info_rdr.emit_enums(agi)
    
-   gen_cpuid_map(agi)
-   agi.close_output_files()
+   with genprof.phase('cpuid-map'):
+      gen_cpuid_map(agi)
+   with genprof.phase('close-files'):
+      agi.close_output_files()
    # This should be executed only after the file generation phase is complete:
-   gen_python_wrappers(options,agi)
+   with genprof.phase('python-wrappers'):
+      gen_python_wrappers(options,agi)
    agi.dump_generated_files()
+   if options.profile_json:
+      genprof.write_report(options.profile_json,
+                           { 'xed_version': read_xed_version(options.xeddir),
+                             'jobs': options.jobs })
+
+def read_xed_version(xeddir):
+   """Return the contents of the XED VERSION file, or None"""
+   fn = os.path.join(xeddir, 'VERSION')
+   if not os.path.exists(fn):
+      return None
+   with open(fn,'r') as f:
+      return f.read().strip()
 
 ################################################
 
 if __name__ == '__main__':
-   _profile = False
-   if _profile:
-      # profiling takes A REAL LONG TIME
-      import profile
-      profile.run('main()','profile.out')
-   else:
-      main()
-      sys.exit(0)
+   # see --profile-json and --profile-dir for profiling
+   main()
+   sys.exit(0)
 #eof
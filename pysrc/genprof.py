@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- python -*-
+#BEGIN_LEGAL
+#
+#Copyright (c) 2026 Intel Corporation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#END_LEGAL
+"""
+Per-phase profiling for the XED generators.
+
+Phases are delimited with begin()/end() or the phase() context manager and
+can nest. For each phase we record the wall time, the CPU time (including
+finished worker processes) and the peak RSS of the generator process. If
+enabled, each outermost phase is also run under cProfile. The measurements
+are written as a JSON report by write_report() so that generator
+performance can be compared across XED versions.
+
+Nothing is recorded until enable() is called.
+"""
+import os
+import sys
+import time
+import json
+import contextlib
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+_report_version = 1
+
+_enabled = False
+_cprofile_dir = None
+_stack = []   # open phase_t objects
+_phases = []  # finished phase_t objects, in the order they were begun
+_start = None
+
+class phase_t(object):
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.wall = time.perf_counter()
+        self.cpu = _cpu_time()
+        self.peak_rss_kb_start = _peak_rss_kb()
+        self.profiler = None
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = _cpu_time() - self.cpu
+        self.peak_rss_kb = _peak_rss_kb()
+
+    def as_dict(self):
+        return { 'name': self.name,
+                 'depth': self.depth,
+                 'wall_sec': round(self.wall, 6),
+                 'cpu_sec': round(self.cpu, 6),
+                 'peak_rss_kb': self.peak_rss_kb,
+                 'peak_rss_growth_kb': _sub(self.peak_rss_kb,
+                                            self.peak_rss_kb_start) }
+
+def _sub(a, b):
+    if a is None or b is None:
+        return None
+    return a - b
+
+def _cpu_time():
+    """User+system time of this process and its waited-for children"""
+    t = os.times()
+    return t[0] + t[1] + t[2] + t[3]
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak = peak // 1024 # bytes on macOS
+    return peak
+
+def enable(cprofile_dir=None):
+    """Start recording phases. If cprofile_dir is given, each outermost
+    phase is profiled and its stats written to cprofile_dir/NAME.prof"""
+    global _enabled, _cprofile_dir, _start
+    _enabled = True
+    _cprofile_dir = cprofile_dir
+    _start = phase_t('total', 0)
+    if _cprofile_dir and not os.path.exists(_cprofile_dir):
+        os.makedirs(_cprofile_dir)
+
+def enabled():
+    return _enabled
+
+def begin(name):
+    """Start a phase. Nested phases are named parent/name."""
+    if not _enabled:
+        return
+    if _stack:
+        name = _stack[-1].name + '/' + name
+    p = phase_t(name, len(_stack))
+    _phases.append(p)
+    _stack.append(p)
+    if _cprofile_dir and p.depth == 0:
+        import cProfile
+        p.profiler = cProfile.Profile()
+        p.profiler.enable()
+
+def end():
+    """Finish the innermost phase"""
+    if not _enabled:
+        return
+    p = _stack.pop()
+    if p.profiler:
+        p.profiler.disable()
+        fn = os.path.join(_cprofile_dir, p.name.replace('/', '.') + '.prof')
+        p.profiler.dump_stats(fn)
+        p.profiler = None
+    p.finish()
+
+@contextlib.contextmanager
+def phase(name):
+    begin(name)
+    try:
+        yield
+    finally:
+        end()
+
+def report(info=None):
+    """Return the measurements as a JSON-able dict. info is a dict of
+    extra top level entries (versions, options, ...)"""
+    while _stack: # phases left open by an error
+        end()
+    total = phase_t('total', 0)
+    total.wall = total.wall - _start.wall
+    total.cpu = total.cpu - _start.cpu
+    total.peak_rss_kb = total.peak_rss_kb_start
+    total.peak_rss_kb_start = _start.peak_rss_kb_start
+    r = { 'version': _report_version,
+          'argv': sys.argv,
+          'python': sys.version.split()[0],
+          'total': total.as_dict(),
+          'phases': [ p.as_dict() for p in _phases ] }
+    if info:
+        r.update(info)
+    return r
+
+def write_report(fn, info=None):
+    """Write the JSON report to fn"""
+    if not _enabled:
+        return
+    with open(fn, 'w') as f:
+        json.dump(report(info), f, indent=2)
+        f.write('\n')
@@ -165,6 +165,13 @@ def base_open_file(file_name: str, rw: str, errorname: str = ''):
         make_readable_by_all_writeable_by_owner(file_name, errorname)
     return fp
 
+def changed_files_list_name(output_file_list: str) -> str:
+    """Name of the file listing the generated files that were rewritten,
+    given the name of the file listing all the output files of a
+    generator. Written by codegen.dump_changed_files() and read by
+    xed_mbuild.py."""
+    return os.path.splitext(output_file_list)[0] + '-CHANGED.txt'
+
 def resource_usage():
     if on_windows:
         x = (0, 0, 0, 0, 0, 0)
@@ -467,6 +474,25 @@ def field_check(obj: Any, field: str) -> bool:
     return retval
 
 
+def get_fields(obj: Any) -> dict:
+    """Return a dict of the attributes set on obj, like vars(obj), but
+    also including the attributes stored in __slots__"""
+    d = {}
+    for cls in reversed(type(obj).__mro__):
+        slots = getattr(cls, '__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__dict__', '__weakref__'):
+                continue
+            try:
+                d[name] = getattr(obj, name)
+            except AttributeError:
+                pass # unset slot
+    d.update(getattr(obj, '__dict__', {}))
+    return d
+
+
 def generate_lookup_function_basis(gi, state_space):
     """Return a dictionary whose values are dictionaries of all the values
       that the operand decider might have"""
@@ -52,6 +52,15 @@ class hash_fun_fks_t(xedhash.hash_fun_interface_t):
     def apply(self, x):
         return ((self.k*x) % self.p) % self.m
 
+    @classmethod
+    def apply_np(cls, params, keys):
+        """Vectorized apply() for (k,p,m) rows of params. See xedhash."""
+        np = xedhash.numpy
+        k = params[:, 0:1]
+        p = params[:, 1:2]
+        m = np.minimum(p, params[:, 2:3])
+        return ((k * keys.astype(np.int64)) % p) % m
+
     def emit_cexpr(self, key_str='key'):
         if self.m == 1:
             return '(0)'
@@ -123,33 +132,32 @@ def _get_l1_mlist(n):
         mlist = [n, 2*n] #just to try
     return mlist
 
+def _fks_params(n):
+    """Return the (k,p,m) parameters to try for n keys, in search order.
+    With NumPy, this is a 2D array."""
+    mlist = _get_l1_mlist(n) # of buckets
+    np = xedhash.numpy
+    if np is None:
+        return ((k, p, m) for m in mlist
+                          for p in _primes
+                          for k in range(3, _max_k))
+    m, p, k = np.meshgrid(np.array(mlist, dtype=np.int64),
+                          np.array(_primes, dtype=np.int64),
+                          np.arange(3, _max_k, dtype=np.int64),
+                          indexing='ij')
+    return np.stack([k.ravel(), p.ravel(), m.ravel()], axis=1)
+
 def find_fks_perfect(keylist):
     """Return a perfect hash function for a given key list. Or None if no
        perfect hash function could be found."""
-    global _max_k
-    mlist = _get_l1_mlist(len(keylist))
-    for m in mlist: # of buckets
-        for p in _primes:
-            for k in range(3, _max_k):
-                hash_f = hash_fun_fks_t(k,p,m)
-                if xedhash.is_perfect(keylist, hash_f):
-                    return hash_f
-                del hash_f
-    return None
+    return xedhash.find_first_perfect(keylist, hash_fun_fks_t,
+                                      _fks_params(len(keylist)))
 
 
 
 def find_fks_well_distributed(keylist):
     """Return a hash well-distributed function (not necessarily perfect!)
        for a given key list"""
-    global _max_k
-    global _l1_bucket_max
-    mlist = _get_l1_mlist(len(keylist)) # number of buckets
-    for m in mlist:
-        for p in _primes:
-            for k in range(3, _max_k):
-                hash_f = hash_fun_fks_t(k,p,m)
-                if xedhash.is_well_distributed(keylist, hash_f, _l1_bucket_max):
-                    return hash_f
-                del hash_f
-    return None
+    return xedhash.find_first_well_distributed(keylist, hash_fun_fks_t,
+                                               _fks_params(len(keylist)),
+                                               _l1_bucket_max)
@@ -72,6 +72,16 @@ class hashmul_t(xedhash.hash_fun_interface_t):
         #sys.stderr.write(" {}\n".format(v))
         return v
 
+    @classmethod
+    def apply_np(cls, params, keys):
+        """Vectorized apply() for (table_size,) rows of params. See xedhash.
+        The uint64 multiply wraps but keeps the low 32 bits right."""
+        np = xedhash.numpy
+        golden = np.uint64(2654435769)
+        fraction = (keys * golden) & np.uint64((1<<32)-1)
+        table_size = params[:, 0:1].astype(np.uint64)
+        return ((fraction * table_size) >> np.uint64(32)).astype(np.int64)
+
     def apply_pow2(self, k):
         """Apply the hash function to the key k, for power of 2 table sizes"""
         q = self.golden_ratio_recip2to32 * k
@@ -42,6 +42,7 @@ import ild_modrm
 import codegen
 import ild_codegen
 import ild_cdict
+import ild_phash
 import dec_dyn
 import actions
 import verbosity
@@ -160,6 +161,9 @@ def gen_xed3(agi, ild_info, ild_patterns,
 def work(agi):
     ild_gendir = agi.common.options.gendir
     init_debug(agi)
+    if agi.common.options.phash_cache:
+        ild_phash.init_hash_cache(mbuild.join(ild_gendir,
+                                              'ild-phash-cache.json'))
 
     debug.write("state_space:\n %s" % agi.common.state_space)
 
@@ -248,6 +252,7 @@ def work(agi):
         # now handle the actual instructions
         gen_xed3(agi, ild_info, ild_patterns, 
                  all_state_space, ild_gendir, all_ops_widths)
+    ild_phash.save_hash_cache()
 
 
 def get_patterns(agi, eosz_nts, easz_nts,
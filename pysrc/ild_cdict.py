@@ -899,6 +899,17 @@ def gen_ph_fos(agi,
     lu_fo_list = []  
     op_lu_map = {} # fn name -> fn obj
     phash_lu = {}  # map, opcode -> fn name
+
+    # search the hash functions of all the map-opcodes in parallel. The
+    # loop below then finds them in the ild_phash cache.
+    keysets = []
+    for insn_map in maps:
+        for opcode in range(0, 256):
+            cdict = cdict_by_map_opcode[insn_map][hex(opcode)]
+            if cdict:
+                keysets.append(list(cdict.tuple2int.values()))
+    ild_phash.prefetch_hashes(keysets, agi.common.options.jobs)
+
     for insn_map in maps:
         phash_lu[insn_map] = {}
         zeros = 0
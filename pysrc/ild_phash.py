@@ -24,6 +24,11 @@ properties, optimizing ILD table size and lookup performance.
 """
 import math
 import collections
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
 
 import genutil
 import ildutil
@@ -352,9 +357,7 @@ class l2_phash_t(phash_t):
             if _is_linear(list(new_cdict.int2tuple.keys())):
                 phash = _get_linear_hash_function(new_cdict)
             if not phash:
-                phash = _find_l1_phash_mul(new_cdict)
-            if not phash:
-                phash = _find_l1_phash_fks(new_cdict)
+                phash = _find_l1_phash(new_cdict)
                 
             if phash:
                 self.hx2phash[hx] = phash
@@ -528,13 +531,6 @@ def _get_linear_hash_function(cdict):
     
 
 
-def _find_l1_phash_fks(cdict):
-    hashfn =  hashfks.find_fks_perfect(list(cdict.tuple2int.values()))
-    if hashfn:
-        return l1_phash_t(cdict, hashfn)
-    return None
-
-
 def _find_candidate_lengths_mul(lst):
     """Return integer lengths n, n*1.1, n*1.2, ... n*1.9, n*2"""
     n = len(lst)
@@ -549,27 +545,186 @@ def _find_candidate_lengths_mul(lst):
             s.add(a)
     return sorted(list(s))
 
-def _find_l1_phash_mul(cdict):
-    candidate_lengths = _find_candidate_lengths_mul(cdict.tuple2int)
-    for p in candidate_lengths:
-        hash_f = hashmul.hashmul_t(p)
-        if hash_f.is_perfect(iter(cdict.tuple2int.values())):
-            return l1_phash_t(cdict, hash_f)
-        del hash_f
-    return None
-    
-
 
-def _find_l2_hash_mul(cdict):
-    """Similar to the _find_l1_phash_mul, but not looking for perfection, just
-    well distributed stuff"""
-    global _l1_bucket_max
-    candidate_lengths = _find_candidate_lengths_mul(cdict.tuple2int)
-    for p in candidate_lengths:
-        hash_f = hashmul.hashmul_t(p)
-        if xedhash.is_well_distributed(cdict.tuple2int, hash_f, _l1_bucket_max):
-            return hash_f
-        del hash_f
+############################################################################
+# Hash function search and caching.
+#
+# The search for a hash function only depends on the set of integer keys,
+# so results are memoized in _hash_cache, keyed by a digest of the key set
+# (and of the search parameters). The cache can be loaded from and saved to
+# a file so that regenerating XED skips searches done by an earlier run, and
+# searches for many independent key sets can be done up front on a process
+# pool (prefetch_hashes()). The file is tied to a digest of the sources of
+# the search, and only the entries used by the last run are saved.
+############################################################################
+
+_hash_cache_version = 2
+_hash_cache = {}           # digest -> hash function descriptor (or None)
+_hash_cache_fn = None      # file backing _hash_cache, see init_hash_cache()
+_hash_cache_dirty = False
+_hash_cache_used = set()   # digests looked up by this run
+
+# modules implementing the hash function search. A change to any of them
+# invalidates the cache file.
+_hash_modules = ['ild_phash', 'hashmul', 'hashfks', 'xedhash', 'tup2int']
+
+def _sources_digest():
+    """Return a digest of the sources of the hash function search"""
+    h = hashlib.sha1()
+    for name in _hash_modules:
+        with open(sys.modules[name].__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _keys_digest(kind, keys):
+    """Return the cache key of a search of a given kind over a key set"""
+    s = '%d:%s:%d:%d:%s' % (_hash_cache_version, kind, hashfks._max_k,
+                           _l1_bucket_max,
+                           ','.join(str(x) for x in sorted(keys)))
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def _hash_f_to_desc(hash_f):
+    """Return a JSON-able descriptor of a hashmul_t or hash_fun_fks_t object"""
+    if hash_f is None:
+        return None
+    if hash_f.kind() == 'mult':
+        return ['mult', hash_f.get_table_size()]
+    return ['fks', hash_f.k, hash_f.p, hash_f.m]
+
+def _desc_to_hash_f(desc):
+    """Inverse of _hash_f_to_desc()"""
+    if desc is None:
+        return None
+    if desc[0] == 'mult':
+        return hashmul.hashmul_t(desc[1])
+    return hashfks.hash_fun_fks_t(desc[1], desc[2], desc[3])
+
+def _search_l1_hash_f(keys):
+    """Search for a perfect hash function: try hashmul then FKS"""
+    lengths = [(p,) for p in _find_candidate_lengths_mul(keys)]
+    hash_f = xedhash.find_first_perfect(keys, hashmul.hashmul_t, lengths)
+    if hash_f:
+        return hash_f
+    return hashfks.find_fks_perfect(keys)
+
+def _search_l2_hash_f(keys):
+    """Search for a well distributed first level hash function for a 2
+    level hash: try hashmul then FKS"""
+    keydict = dict(enumerate(keys))
+    lengths = [(p,) for p in _find_candidate_lengths_mul(keys)]
+    hash_f = xedhash.find_first_well_distributed(keydict, hashmul.hashmul_t,
+                                                 lengths, _l1_bucket_max)
+    if hash_f:
+        return hash_f
+    return hashfks.find_fks_well_distributed(keydict)
+
+_searches = { 'l1': _search_l1_hash_f,
+              'l2': _search_l2_hash_f }
+
+def _find_hash_f(kind, keys):
+    """Memoized hash function search of the given kind ('l1' or 'l2')"""
+    global _hash_cache_dirty
+    digest = _keys_digest(kind, keys)
+    _hash_cache_used.add(digest)
+    if digest in _hash_cache:
+        return _desc_to_hash_f(_hash_cache[digest])
+    hash_f = _searches[kind](keys)
+    _hash_cache[digest] = _hash_f_to_desc(hash_f)
+    _hash_cache_dirty = True
+    return hash_f
+
+def _l2_buckets(hash_f, keys):
+    """Split the keys into the buckets of a first level hash function"""
+    buckets = collections.defaultdict(list)
+    for x in keys:
+        buckets[hash_f.apply(x)].append(x)
+    return list(buckets.values())
+
+def _search_all(keys):
+    """Run every search gen_hash() may do for a key set. Returns a list
+    of (digest, descriptor) cache entries. Process pool worker."""
+    entries = []
+    hash_f = _search_l1_hash_f(keys)
+    entries.append((_keys_digest('l1', keys), _hash_f_to_desc(hash_f)))
+    if hash_f:
+        return entries
+    hash_f = _search_l2_hash_f(keys)
+    entries.append((_keys_digest('l2', keys), _hash_f_to_desc(hash_f)))
+    if hash_f:
+        for bucket in _l2_buckets(hash_f, keys):
+            if not _is_linear(bucket):
+                l1_f = _search_l1_hash_f(bucket)
+                entries.append((_keys_digest('l1', bucket),
+                                _hash_f_to_desc(l1_f)))
+    return entries
+
+def prefetch_hashes(keysets, jobs):
+    """Search the hash functions of the key sets that are not cached yet
+    on a pool of jobs worker processes, and store them in the cache.
+    Linear key sets do not need a search and are skipped."""
+    global _hash_cache_dirty
+    if jobs <= 1:
+        return
+    todo = {}
+    for keys in keysets:
+        if not keys or _is_linear(keys):
+            continue
+        keys = tuple(sorted(keys))
+        digest = _keys_digest('l1', keys)
+        if digest not in _hash_cache:
+            todo[digest] = keys
+    if len(todo) < 2:
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        for entries in pool.map(_search_all, list(todo.values()),
+                                chunksize=4):
+            for digest, desc in entries:
+                _hash_cache[digest] = desc
+    _hash_cache_dirty = True
+
+def init_hash_cache(fn):
+    """Load the persistent hash function cache from fn (if present) and
+    remember fn for save_hash_cache()"""
+    global _hash_cache_fn
+    _hash_cache_fn = fn
+    if not os.path.exists(fn):
+        return
+    try:
+        with open(fn, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        ildutil.ild_warn("Ignoring unreadable phash cache %s: %s" % (fn, e))
+        return
+    if (data.get('version') == _hash_cache_version and
+        data.get('sources') == _sources_digest()):
+        _hash_cache.update(data['hashes'])
+
+def save_hash_cache():
+    """Write the entries of the hash function cache used by this run
+    back to the file it was loaded from. Entries of key sets that no
+    longer occur and unused prefetched searches are dropped."""
+    global _hash_cache_dirty
+    if not _hash_cache_fn:
+        return
+    hashes = { d: _hash_cache[d] for d in _hash_cache_used
+               if d in _hash_cache }
+    if not _hash_cache_dirty and len(hashes) == len(_hash_cache):
+        return
+    tmp_fn = _hash_cache_fn + '.tmp'
+    with open(tmp_fn, 'w') as f:
+        json.dump({'version': _hash_cache_version,
+                   'sources': _sources_digest(),
+                   'hashes': hashes},
+                  f, sort_keys=True)
+    os.replace(tmp_fn, _hash_cache_fn)
+    _hash_cache_dirty = False
+
+
+def _find_l1_phash(cdict):
+    """Find a perfect 1 level hash function for the cdict, or None"""
+    hash_f = _find_hash_f('l1', list(cdict.tuple2int.values()))
+    if hash_f:
+        return l1_phash_t(cdict, hash_f)
     return None
     
 
@@ -577,14 +732,9 @@ def _find_l2_phash(cdict):
     """Find a 2 level hash table for more complex cases"""
 
     # try hashmul first for the first level of the 2 level
-    # hash function.
-    hash_f = _find_l2_hash_mul(cdict)
-    if hash_f:
-        return l2_phash_t(cdict, hash_f)
-
-    # otherwise try a FKS for the first level of the 2 level hash
-    # function.
-    hash_f = hashfks.find_fks_well_distributed(cdict.tuple2int)
+    # hash function. otherwise try a FKS for the first level of the 2
+    # level hash function.
+    hash_f = _find_hash_f('l2', list(cdict.tuple2int.values()))
     if hash_f:
         return l2_phash_t(cdict, hash_f)
 
@@ -602,15 +752,8 @@ def _gen_hash_one_level(cdict):
     if _is_linear(list(cdict.int2tuple.keys())):
         return _get_linear_hash_function(cdict)
 
-    phash = _find_l1_phash_mul(cdict)
-    if phash:
-        return phash
-
-    phash = _find_l1_phash_fks(cdict)
-    if phash:
-        return phash
-
-    return None
+    # try hashmul then fks
+    return _find_l1_phash(cdict)
 
 def gen_hash(cdict):
     """ Main entry point for generating hash functions."""
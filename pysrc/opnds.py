@@ -73,6 +73,14 @@ class operand_info_t(object):
     decoding.
     """
 
+    # Each instruction record has several operands, so the fields are
+    # stored in slots. Fields added by other modules go in __dict__.
+    __slots__ = ('name', 'type', 'xtype', 'op_widths', 'element_type',
+                 'element_width', 'internal', 'multireg', 'inline', 'bits',
+                 'lookupfn_name', 'lookupfn_name_base', 'rw', 'cvt',
+                 'visibility', 'oc2', 'invert', 'bit_positions',
+                 'rightmost_bitpos', 'cvt_index', '__dict__')
+
     decimal_number_pattern = re.compile(r'[0-9]+')
 
     operand_types = ['reg', 'imm', 'imm_const', 'error',
@@ -281,9 +289,10 @@ class operand_info_t(object):
         result = dict()
         keys_filter: set = {'width_info_dict', 'internal', 'invert', 'inline',
                             'rightmost_bitpos', 'bit_positions'}
-        keys = set(self.__dict__.keys()) - keys_filter
+        fields = genutil.get_fields(self)
+        keys = set(fields.keys()) - keys_filter
         for key in sorted(keys):
-            value = getattr(self, key)
+            value = fields[key]
             # FIXME: consider using dataclasses.is_dataclass()/asdict() instead,
             # but that won't work if nested types stop being dataclasses.
             if hasattr(value, 'to_serializable'):
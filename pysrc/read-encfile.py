@@ -1655,6 +1655,7 @@ class encoder_configuration_t(object):
         for fe in output_file_emitters:
             o.write(fe.full_file_name + "\n")
         o.close()
+        dump_changed_files(ofn)
 
     def parse_decode_rule(self, conds,actions ,line, nt_name):
         # conds   -- rhs, from an encode perspective (decode operands)
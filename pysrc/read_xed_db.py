@@ -26,8 +26,11 @@ metadata. It builds the in-memory representation of all x86 instructions that
 XED can encode and decode. This is the primary input to the XED generator.
 """
 import sys
+import os
 import re
 import collections
+import hashlib
+import pickle
 import patterns
 import slash_expand
 import genutil
@@ -52,12 +55,37 @@ class Restriction(Enum):
 
 
 class inst_t(object):
+    # Tens of thousands of records are kept alive, so the fields that
+    # xed_reader_t sets are stored in slots. Other fields (from new data
+    # file keys, or added by the generators) go in the instance __dict__,
+    # which is only allocated when one is set. Use genutil.get_fields()
+    # instead of vars() to get all the fields.
+    __slots__ = ( 'amd_3dnow_opcode', 'attributes', 'avx512_tuple',
+                  'avx512_vsib', 'avx_vsib', 'broadcast_allowed', 'category',
+                  'comment', 'cpl', 'cpuid_groups', 'default_64b', 'disasm',
+                  'disasm_attsv', 'disasm_intel', 'easz', 'element_size',
+                  'eosz', 'exceptions', 'explicit_operands', 'extension',
+                  'f2_required', 'f3_required', 'flags', 'has_imm16',
+                  'has_imm32', 'has_imm8', 'has_imm8_2', 'has_immz',
+                  'has_modrm', 'iclass', 'iform', 'imm_sz',
+                  'implicit_operands', 'is_apx_scc', 'isa_set',
+                  'lower_nibble', 'map', 'memop_rw', 'memop_width',
+                  'memop_width_code', 'mod_required', 'mode_restriction',
+                  'nd', 'nf', 'no_prefixes_allowed', 'ntname', 'opcode',
+                  'opcode_base10', 'operand_list', 'operands',
+                  'osz_required', 'parsed_operands', 'partial_opcode',
+                  'pattern', 'real_opcode', 'reg_required',
+                  'rex2_restriction', 'rexw_prefix', 'rm_required',
+                  'scalar', 'sibmem', 'space', 'u_bit', 'uname', 'udelete',
+                  'undocumented', 'upper_nibble', 'version', 'vl',
+                  '__dict__' )
     def __init__(self):
         pass
     def __str__(self):
         s = []
-        for fld in sorted(self.__dict__.keys()):
-            s.append("{}: {}".format(fld,getattr(self,fld)))
+        fields = genutil.get_fields(self)
+        for fld in sorted(fields.keys()):
+            s.append("{}: {}".format(fld,fields[fld]))
         return "\n".join(s) + '\n'
 
 
@@ -208,12 +236,46 @@ def is_positive_integer(s):
     if re.match(r'^[0-9]+$',s):
         return True
     return False
+
+def _opcode_keys(v):
+    """The opcode byte values of a record. Partial opcodes cover 8 values."""
+    if getattr(v, 'partial_opcode', False):
+        return range(v.opcode_base10, v.opcode_base10 + 8)
+    return [v.opcode_base10]
+
+# Bump this when the xed_reader_t representation changes in a way that
+# the source digest in _snapshot_key() would not catch.
+_snapshot_version = 2
+
+# modules defining the objects held by a xed_reader_t or the passes that
+# compute them. A change to any of them invalidates existing snapshots.
+_snapshot_modules = ['read_xed_db', 'patterns', 'slash_expand', 'genutil',
+                     'opnd_types', 'opnds', 'cpuid_rdr', 'map_info_rdr']
+
+def _snapshot_key(input_filenames):
+    """Return a digest of the reader sources and of the names and
+    contents of the input files"""
+    h = hashlib.sha1()
+    h.update('{}:{}:'.format(_snapshot_version,
+                             pickle.HIGHEST_PROTOCOL).encode('utf-8'))
+    for name in _snapshot_modules:
+        with open(sys.modules[name].__file__, 'rb') as f:
+            h.update(f.read())
+    for fn in input_filenames:
+        h.update('{};'.format(fn).encode('utf-8'))
+        with open(fn, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
     
 class xed_reader_t(object):
     """This class is designed to be used on the partial build materials
     collected up in early part of the build and dumped in to the
     BUILDDIR/dgen directory. Once initialized, the recs attribute 
     is what you'll iterate over to access the instruction records.
+
+    Reading the files is slow. save() writes a snapshot of the reader that
+    load() restores, as long as the input files and the reader sources
+    have not changed since.
     """
     def __init__(self,
                  state_bits_filename,
@@ -224,6 +286,14 @@ class xed_reader_t(object):
                  cpuid_filename='',
                  map_descriptions_filename=''):
 
+        self.input_filenames = [ x for x in [ state_bits_filename,
+                                              instructions_filename,
+                                              widths_filename,
+                                              extra_widths_filename,
+                                              element_types_filename,
+                                              cpuid_filename,
+                                              map_descriptions_filename ]
+                                 if x ]
         self.xtypes = self._gen_xtypes(element_types_filename) 
         self._gen_widths(widths_filename, extra_widths_filename)
 
@@ -259,6 +329,137 @@ class xed_reader_t(object):
 
     def get_width_info_dict(self):
         return self.width_info_dict
+
+    def save(self, path):
+        """Write a snapshot of this reader to path"""
+        data = { 'version': _snapshot_version,
+                 'key': _snapshot_key(self.input_filenames),
+                 'input_filenames': self.input_filenames,
+                 'reader': self }
+        # unique temporary name: concurrent generators may share a snapshot
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, RecursionError) as e:
+            genutil.warn("Could not write XED db snapshot {}: {}".format(path, e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def load(path, input_filenames=None):
+        """Return the xed_reader_t saved in the snapshot at path, or None
+        if there is no usable snapshot. A snapshot is stale if any of the
+        input files it was made from or the reader sources changed. If
+        input_filenames is given, the snapshot must also have been made
+        from those files."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+            if data['version'] != _snapshot_version:
+                return None
+            if (input_filenames is not None and
+                data['input_filenames'] != [x for x in input_filenames if x]):
+                return None
+            if data['key'] != _snapshot_key(data['input_filenames']):
+                return None
+        except Exception as e:
+            genutil.warn("Ignoring unusable XED db snapshot {}: {}".format(path, e))
+            return None
+        return data['reader']
+
+    @classmethod
+    def load_or_read(cls, snapshot_path, *filenames):
+        """Return the reader from the snapshot if it is up to date.
+        Otherwise read the files as xed_reader_t(*filenames) does and
+        save a new snapshot."""
+        xeddb = cls.load(snapshot_path, filenames)
+        if xeddb:
+            genutil.msge("Loaded XED db snapshot {}".format(snapshot_path))
+            return xeddb
+        xeddb = cls(*filenames)
+        xeddb.save(snapshot_path)
+        return xeddb
+
+    # Indexed lookups. The indexes are built on first use. Call
+    # reset_indexes() after changing an indexed field of the records.
+
+    # query() keyword -> function returning the index keys of a record
+    _index_key_fns = {
+        'iclass':    lambda v: [v.iclass],
+        'iform':     lambda v: [v.iform],
+        'isa_set':   lambda v: [v.isa_set],
+        'extension': lambda v: [v.extension],
+        'category':  lambda v: [v.category],
+        'space':     lambda v: [v.space],
+        'map':       lambda v: [v.map],
+        'opcode':    lambda v: _opcode_keys(v),
+        'attribute': lambda v: v.attributes.split(),
+    }
+
+    def reset_indexes(self):
+        self._indexes = {}
+
+    def get_index(self, key):
+        """Return a dict mapping each value of the query() keyword key to
+        the list of records with that value, in self.recs order"""
+        if not hasattr(self, '_indexes'):
+            self._indexes = {}
+        if key not in self._indexes:
+            if key not in self._index_key_fns:
+                genutil.die("Unknown xed_reader_t index: {}".format(key))
+            key_fn = self._index_key_fns[key]
+            index = collections.defaultdict(list)
+            for v in self.recs:
+                for k in key_fn(v):
+                    index[k].append(v)
+            self._indexes[key] = dict(index)
+        return self._indexes[key]
+
+    def get_opcode_map(self, space, map_num):
+        """Return a dict mapping the opcode byte values of opcode map
+        map_num in encoding space space ('legacy', 'vex', 'evex' or
+        'xop') to lists of records"""
+        key = ('opcode-map', space, map_num)
+        if not hasattr(self, '_indexes'):
+            self._indexes = {}
+        if key not in self._indexes:
+            table = collections.defaultdict(list)
+            for v in self.get_index('space').get(space, []):
+                if v.map == map_num:
+                    for opcode in _opcode_keys(v):
+                        table[opcode].append(v)
+            self._indexes[key] = dict(table)
+        return self._indexes[key]
+
+    def query(self, **kwargs):
+        """Return the records, in self.recs order, matching all the given
+        keywords. The keywords are: iclass, iform, isa_set, extension,
+        category, space, map, opcode (an opcode byte value) and attribute
+        (one attribute name). For example:
+        query(space='legacy', map=0, opcode=0x90)."""
+        for k in kwargs:
+            if k not in self._index_key_fns:
+                genutil.die("Unknown xed_reader_t query keyword: {}".format(k))
+        if not kwargs:
+            return list(self.recs)
+        if 'opcode' in kwargs and 'space' in kwargs and 'map' in kwargs:
+            table = self.get_opcode_map(kwargs.pop('space'), kwargs.pop('map'))
+            candidates = table.get(kwargs.pop('opcode'), [])
+        else:
+            # start from the smallest matching list
+            lists = [ self.get_index(k).get(val, [])
+                      for k, val in kwargs.items() ]
+            candidates = min(lists, key=len)
+        if not kwargs:
+            return list(candidates)
+        key_fns = [ (self._index_key_fns[k], val)
+                    for k, val in kwargs.items() ]
+        return [ v for v in candidates
+                 if all(val in key_fn(v) for key_fn, val in key_fns) ]
         
     def _refine_widths_input(self,lines):
        """Return  a dict of width_info_t. Skip comments and blank lines"""
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- python -*-
+#BEGIN_LEGAL
+#
+#Copyright (c) 2026 Intel Corporation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#END_LEGAL
+"""
+Compact columnar file format for the xed_to_db.py instruction database.
+
+Records are added one at a time to a columnar_writer_t and stored column
+by column. Loaders can mmap the file and read single columns or records
+without parsing the whole database. columnar_db_t is such a loader.
+
+File layout (all integers little-endian, all sections 8-byte aligned):
+
+    magic       8 bytes  b'XEDCOLDB'
+    header_ofs  uint64   offset of the JSON header
+    header_len  uint64   length of the JSON header
+    sections             string table and column arrays
+    header               UTF-8 JSON
+
+The header holds the format version, the number of rows, the XED version,
+the location of the string table and the name, kind and offset of each
+column. The string table is an array of count+1 uint64 offsets into a
+blob of UTF-8 strings. Column kinds:
+
+    str   uint32 string index per row, 0xFFFFFFFF for null
+    int   int64 per row, -2**63 for null
+    bool  int8 per row: 0, 1 or -1 for null
+    json  like str, but the string is the JSON text of the value (lists,
+          dicts, and columns with mixed value types)
+"""
+import sys
+import json
+import mmap
+import array
+
+_magic = b'XEDCOLDB'
+_format_version = 1
+_prefix_len = len(_magic) + 16
+
+_null_str = 0xFFFFFFFF
+_null_int = -2**63
+_null_bool = -1
+
+# column kind -> array typecode
+_typecodes = { 'str': 'I', 'json': 'I', 'int': 'q', 'bool': 'b' }
+_null_values = { 'str': _null_str, 'json': _null_str,
+                 'int': _null_int, 'bool': _null_bool }
+
+def _kind_of(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int) and _null_int < value < 2**63:
+        return 'int'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+class _column_t(object):
+    def __init__(self, name, kind, nrows):
+        self.name = name
+        self.kind = kind
+        self.values = array.array(_typecodes[kind],
+                                  [_null_values[kind]]) * nrows
+
+class columnar_writer_t(object):
+    """Collects records (dicts of JSON-able values) column by column and
+    writes them to a columnar file"""
+    def __init__(self):
+        self.nrows = 0
+        self.columns = {} # name -> _column_t, in first seen order
+        self.strings = []
+        self.string_index = {}
+
+    def _intern(self, s):
+        i = self.string_index.get(s)
+        if i is None:
+            i = len(self.strings)
+            self.strings.append(s)
+            self.string_index[s] = i
+        return i
+
+    def _encode(self, kind, value):
+        if value is None:
+            return _null_values[kind]
+        if kind == 'str':
+            return self._intern(value)
+        if kind == 'json':
+            return self._intern(json.dumps(value, separators=(',', ':')))
+        return int(value)
+
+    def _decode(self, kind, v):
+        """Inverse of _encode() for values already written"""
+        if v == _null_values[kind]:
+            return None
+        if kind == 'str':
+            return self.strings[v]
+        if kind == 'json':
+            return json.loads(self.strings[v])
+        if kind == 'bool':
+            return bool(v)
+        return v
+
+    def _convert_to_json(self, col):
+        """Re-encode a column whose values turned out to have mixed
+        types as a json column"""
+        old = col.values
+        col.values = array.array('I', [ self._encode('json',
+                                                     self._decode(col.kind, v))
+                                        for v in old ])
+        col.kind = 'json'
+
+    def add(self, record):
+        for name, value in record.items():
+            col = self.columns.get(name)
+            if col is None:
+                kind = 'str' if value is None else _kind_of(value)
+                col = _column_t(name, kind, self.nrows)
+                self.columns[name] = col
+            elif value is not None and col.kind != 'json':
+                kind = _kind_of(value)
+                if kind != col.kind:
+                    if all(v == _null_values[col.kind] for v in col.values):
+                        col.kind = kind # only nulls so far
+                        col.values = array.array(_typecodes[kind],
+                                                 [_null_values[kind]]) * self.nrows
+                    else:
+                        self._convert_to_json(col)
+            col.values.append(self._encode(col.kind, value))
+        self.nrows += 1
+        # columns missing from this record
+        for col in self.columns.values():
+            if len(col.values) < self.nrows:
+                col.values.append(_null_values[col.kind])
+
+    def write(self, fn, column_order=None, xed_version=None):
+        """Write the file. column_order is an optional function that
+        orders the list of column names"""
+        names = list(self.columns.keys())
+        if column_order:
+            names = column_order(names)
+        with open(fn, 'wb') as f:
+            f.write(bytes(_prefix_len))
+
+            blob = [ s.encode('utf-8') for s in self.strings ]
+            offsets = array.array('Q', [0])
+            for b in blob:
+                offsets.append(offsets[-1] + len(b))
+            strings = { 'count': len(blob),
+                        'offsets': _write_array(f, offsets) }
+            strings['data'] = _write_bytes(f, b''.join(blob))
+
+            columns = []
+            for name in names:
+                col = self.columns[name]
+                columns.append({ 'name': name,
+                                 'kind': col.kind,
+                                 'offset': _write_array(f, col.values) })
+
+            header = { 'format': 'xed-db-columnar',
+                       'version': _format_version,
+                       'xed_version': xed_version,
+                       'rows': self.nrows,
+                       'strings': strings,
+                       'columns': columns }
+            header_bytes = json.dumps(header).encode('utf-8')
+            header_ofs = _write_bytes(f, header_bytes)
+            f.seek(0)
+            f.write(_magic)
+            f.write(_array_bytes('Q', [header_ofs, len(header_bytes)]))
+
+def _array_bytes(typecode, values):
+    a = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a.tobytes()
+
+def _align(f):
+    pad = -f.tell() % 8
+    if pad:
+        f.write(bytes(pad))
+
+def _write_bytes(f, b):
+    _align(f)
+    ofs = f.tell()
+    f.write(b)
+    return ofs
+
+def _write_array(f, a):
+    return _write_bytes(f, _array_bytes(a.typecode, a))
+
+class columnar_db_t(object):
+    """Read-only access to a columnar file through mmap. Columns are
+    decoded on demand."""
+    def __init__(self, fn):
+        self.f = open(fn, 'rb')
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(_magic)] != _magic:
+            raise ValueError("Not a XED columnar database: {}".format(fn))
+        (header_ofs, header_len) = self._array('Q', len(_magic), 2)
+        self.header = json.loads(
+            bytes(self.mm[header_ofs:header_ofs + header_len]).decode('utf-8'))
+        if self.header['version'] != _format_version:
+            raise ValueError("Unsupported XED columnar database version: " +
+                             str(self.header['version']))
+        self.nrows = self.header['rows']
+        self.columns = { c['name']: c for c in self.header['columns'] }
+        strings = self.header['strings']
+        self.string_offsets = self._array('Q', strings['offsets'],
+                                          strings['count'] + 1)
+        self.string_data = strings['data']
+
+    def _array(self, typecode, ofs, n):
+        size = array.array(typecode).itemsize
+        view = memoryview(self.mm)[ofs:ofs + n * size]
+        if sys.byteorder == 'little':
+            return view.cast(typecode)
+        a = array.array(typecode, view.tobytes())
+        a.byteswap()
+        return a
+
+    def __len__(self):
+        return self.nrows
+
+    def column_names(self):
+        return [ c['name'] for c in self.header['columns'] ]
+
+    def get_string(self, i):
+        start = self.string_data + self.string_offsets[i]
+        end = self.string_data + self.string_offsets[i + 1]
+        return bytes(self.mm[start:end]).decode('utf-8')
+
+    def raw_column(self, name):
+        """The encoded values of a column (string indexes for str and json
+        columns). Useful for scanning a column without decoding it."""
+        col = self.columns[name]
+        return self._array(_typecodes[col['kind']], col['offset'], self.nrows)
+
+    def _decode(self, kind, v):
+        if v == _null_values[kind]:
+            return None
+        if kind == 'str':
+            return self.get_string(v)
+        if kind == 'json':
+            return json.loads(self.get_string(v))
+        if kind == 'bool':
+            return bool(v)
+        return v
+
+    def column(self, name):
+        """The decoded values of a column"""
+        kind = self.columns[name]['kind']
+        return [ self._decode(kind, v) for v in self.raw_column(name) ]
+
+    def get(self, name, row):
+        kind = self.columns[name]['kind']
+        return self._decode(kind, self.raw_column(name)[row])
+
+    def record(self, row):
+        """A dict of the non-null fields of one row"""
+        r = {}
+        for name in self.column_names():
+            v = self.get(name, row)
+            if v is not None:
+                r[name] = v
+        return r
+
+    def close(self):
+        """Close the file. Views returned by raw_column() must be
+        released first."""
+        if isinstance(self.string_offsets, memoryview):
+            self.string_offsets.release()
+        self.mm.close()
+        self.f.close()
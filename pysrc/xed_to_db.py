@@ -29,6 +29,7 @@ from collections import OrderedDict
 sys.path.append(str(Path(__file__).resolve().parent))
 import gen_setup
 import genutil
+import xed_db_columnar
 # XED specific type imports (for type hints)
 from read_xed_db import inst_t, xed_reader_t, Restriction
 from opnds import operand_info_t
@@ -311,46 +312,79 @@ def gen_xed_inst_db(args, xed_db: xed_reader_t = None) -> list[xed_instruction_r
         xed_inst_db.append(inst_rec)
     return xed_inst_db
 
+def _is_serializable(o) -> bool:
+    try:
+        json.dumps(o)
+        return True
+    except (TypeError, OverflowError):
+        return False
+
+def _serialize_list(value: list) -> list:
+    return [serialize_value(v) for v in value]
+
+def _serialize_dict(value: dict) -> dict:
+    # JSON requires string keys, so convert keys to strings after serialization
+    return {str(serialize_value(k)): serialize_value(v) for k, v in value.items()}
+
+def _serialize_str(value: str):
+    if value.isdigit():
+        return int(value)  # Numeric string -> int
+    return value
+
+def _serialize_primitive(value):
+    return value
+
+def _serialize_other(value):
+    """Values of types without a fixed conversion (tuples, ...). Only these
+    are probed with json.dumps()."""
+    if _is_serializable(value):
+        return value
+    return str(value)  # Fallback: convert everything else to string
+
+# Serialization function per value type, filled in by _get_serializer()
+_serializers: dict = {
+    list:       _serialize_list,
+    dict:       _serialize_dict,
+    str:        _serialize_str,
+    int:        _serialize_primitive,
+    float:      _serialize_primitive,
+    bool:       _serialize_primitive,
+    type(None): _serialize_primitive,
+}
+
+def _get_serializer(value):
+    """Pick and remember the serialization function for the type of value.
+    The checks are done in the order that decides how a value is serialized."""
+    if isinstance(value, list):
+        fn = _serialize_list
+    elif isinstance(value, dict):
+        fn = _serialize_dict
+    elif callable(value):
+        fn = lambda v: v()  # Execute callable and return result
+    elif isinstance(value, Enum):
+        fn = str  # Enum -> string representation
+    elif isinstance(value, str):
+        fn = _serialize_str
+    elif hasattr(value, 'to_serializable'):
+        # Delegate to the object's own method: xed_width_t,
+        # operand_info_t, cpuid_record_t, group_record_t, ...
+        fn = type(value).to_serializable
+    else:
+        fn = _serialize_other
+    _serializers[type(value)] = fn
+    return fn
+
+def serialize_value(value):
+    """Recursively serialize a single value."""
+    fn = _serializers.get(type(value))
+    if fn is None:
+        fn = _get_serializer(value)
+    return fn(value)
+
 def convert_to_serializable(obj) -> dict:
     """Convert the object into a serializable dict for json.dump()."""
-    def is_serializable(o) -> bool:
-        try:
-            json.dumps(o)
-            return True
-        except (TypeError, OverflowError):
-            return False
-    
-    def serialize_value(value):
-        """Recursively serialize a single value."""
-        # Recursive cases - handle nested structures first
-        if isinstance(value, list):
-            return [serialize_value(v) for v in value]
-        elif isinstance(value, dict):
-            # JSON requires string keys, so convert keys to strings after serialization
-            return {str(serialize_value(k)): serialize_value(v) for k, v in value.items()}
-        
-        # Special type conversions
-        elif callable(value):
-            return value()  # Execute callable and return result
-        elif isinstance(value, Enum):
-            return str(value)  # Enum -> string representation
-        elif isinstance(value, str) and value.isdigit():
-            return int(value)  # Numeric string -> int
-        
-        # Custom serialization support
-        elif hasattr(value, 'to_serializable'):
-            return value.to_serializable()  # Delegate to object's own method
-        
-        # Already JSON-serializable primitives (str, int, float, bool, None)
-        elif is_serializable(value):
-            return value
-        
-        # Fallback: convert everything else to string
-        else:
-            return str(value)
-    
     result = {}
-    for key, value in obj.__dict__.items():
+    for key, value in genutil.get_fields(obj).items():
         result[key] = serialize_value(value)
     
     return result
@@ -372,43 +406,83 @@ def fix_attr(rec: inst_t) -> None:
     rec.operands = single_space(rec.operands)
     rec.pattern = single_space(rec.pattern)
 
-def output_json(args, xed_json_db: list) -> None:
-    if args.compact:
-        indent = None
-        separators = (',', ':')
-    else:
-        indent = 2
-        separators = None
-    
-    ### Sort fields in desired order ###
-    # Define priority fields in desired order
-    priority_fields = [
-        'iclass', 'disasm_intel', 'isa_set', 'extension', 'category', 'iform', 
-        'encoding_space', 'attributes', 'flags', 'operand_list', 'explicit_operands', 
-        'implicit_operands', 'parsed_operands',
-    ]
-    
-    sorted_instructions = []
-    for inst in xed_json_db:
-        ordered_inst = OrderedDict()
-        
-        # Add priority fields first
-        for field in priority_fields:
-            if field in inst:
-                ordered_inst[field] = inst[field]
-        
-        # Add remaining fields in alphabetical order
-        remaining = sorted(set(inst.keys()) - set(priority_fields))
-        for field in remaining:
-            ordered_inst[field] = inst[field]
-        
-        sorted_instructions.append(ordered_inst)
-    #################################
-    out_data: dict = OrderedDict()
-    out_data['Version'] = genutil.get_git_version(verbose=2)  # Always show git errors
-    out_data['Instructions'] = sorted_instructions
+# Output records list these fields first, in this order, then the
+# remaining fields in alphabetical order.
+PRIORITY_FIELDS: list[str] = [
+    'iclass', 'disasm_intel', 'isa_set', 'extension', 'category', 'iform', 
+    'encoding_space', 'attributes', 'flags', 'operand_list', 'explicit_operands', 
+    'implicit_operands', 'parsed_operands',
+]
+
+def order_field_names(names) -> list[str]:
+    """Return the field names in output order"""
+    first = [f for f in PRIORITY_FIELDS if f in names]
+    return first + sorted(set(names) - set(PRIORITY_FIELDS))
+
+def order_fields(inst: dict) -> OrderedDict:
+    ordered_inst = OrderedDict()
+    for field in order_field_names(inst.keys()):
+        ordered_inst[field] = inst[field]
+    return ordered_inst
+
+def gen_output_records(args, xed_input_db: xed_reader_t, keep_recs: list = None):
+    """Yield the serialized output records one at a time, with their fields
+    in output order. If keep_recs is a list, the generated
+    xed_instruction_record_t objects are appended to it."""
+    for rec in xed_input_db.recs:
+        if args.raw:
+            fix_attr(rec)
+        else:
+            rec = xed_instruction_record_t.from_inst_t(rec, xed_input_db)
+            if keep_recs is not None:
+                keep_recs.append(rec)
+        yield order_fields(convert_to_serializable(rec))
+
+def output_json(args, records) -> None:
+    """Write the records to args.out as one JSON document, one record at a
+    time. The output is what json.dump() writes for
+    {'Version': ..., 'Instructions': [records]}."""
+    version = json.dumps(genutil.get_git_version(verbose=2))  # Always show git errors
+    with open(args.out, 'w') as json_fp:
+        if args.compact:
+            json_fp.write('{"Version":%s,"Instructions":[' % version)
+            sep = ''
+            for inst in records:
+                json_fp.write(sep)
+                json_fp.write(json.dumps(inst, separators=(',', ':')))
+                sep = ','
+            json_fp.write(']}')
+        else:
+            json_fp.write('{\n  "Version": %s,\n  "Instructions": [' % version)
+            sep = '\n'
+            for inst in records:
+                json_fp.write(sep)
+                # records are nested 2 levels deep in the document
+                text = json.dumps(inst, indent=2)
+                json_fp.write('    ' + text.replace('\n', '\n    '))
+                sep = ',\n'
+            if sep == '\n': # no records
+                json_fp.write(']\n}')
+            else:
+                json_fp.write('\n  ]\n}')
+
+def output_ndjson(args, records) -> None:
+    """Write newline delimited JSON to args.out: a header line with the XED
+    version followed by one line per record."""
     with open(args.out, 'w') as json_fp:
-        json.dump(out_data, json_fp, sort_keys=False, indent=indent, separators=separators)
+        header = {'Version': genutil.get_git_version(verbose=2)}
+        json_fp.write(json.dumps(header) + '\n')
+        for inst in records:
+            json_fp.write(json.dumps(inst, separators=(',', ':')) + '\n')
+
+def output_columnar(args, records) -> None:
+    """Write the records to args.out in the xed_db_columnar format"""
+    writer = xed_db_columnar.columnar_writer_t()
+    for inst in records:
+        writer.add(inst)
+    writer.write(args.out,
+                 column_order=order_field_names,
+                 xed_version=genutil.get_git_version(verbose=2))
 
 def validate_inst_members_set(xed_input_db: xed_reader_t, xed_gen_inst_rec_db: list[xed_instruction_record_t]):
     """Validate that the xed_instruction_record_t members and the inst_t members match expectations."""
@@ -420,7 +494,7 @@ def validate_inst_members_set(xed_input_db: xed_reader_t, xed_gen_inst_rec_db: l
     # We must scan all records to discover the complete set of possible fields.
     inst_t_fields: set[str] = set()
     for rec in xed_input_db.recs:
-        inst_t_fields.update(vars(rec).keys())
+        inst_t_fields.update(genutil.get_fields(rec).keys())
     
     only_in_xed_inst_rec = xed_inst_rec_fields - inst_t_fields
     only_in_inst_t = inst_t_fields - xed_inst_rec_fields
@@ -573,10 +647,14 @@ def validate_xed_inst_db(xed_input_db: xed_reader_t, xed_gen_inst_rec_db: list[x
 def main():
     parser = argparse.ArgumentParser(description='Parse XED datafiles and export instruction metadata as JSON')
     parser.add_argument('--xed-dgen', type=str, required=True, help='XED build obj/dgen directory')
-    parser.add_argument('--out', type=str, default='xed_db.json', help='Output JSON file')
-    parser.add_argument('--compact', action='store_true', help='Dump compact JSON format')
+    parser.add_argument('--out', type=str, default='xed_db.json', help='Output file')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'columnar'], default='json',
+                        help='Output format: one JSON document (default), newline delimited JSON with one record per line, ' +
+                        'or the compact binary xed_db_columnar format')
+    parser.add_argument('--compact', action='store_true', help='Dump compact JSON format (--format=json)')
     parser.add_argument('--raw', action='store_true', help='Dump raw XED inst_t records')
     parser.add_argument('--validate', action='store_true', help='Dump development statistics and validate correctness')
+    parser.add_argument('--db-snapshot', type=str, default=None, help='Snapshot file of the parsed XED db. Used if up to date, (re)created otherwise')
     args = parser.parse_args()
 
 
@@ -586,17 +664,17 @@ def main():
     if args.validate:   # look for xedext extension if validation is enabled, to enhance validation checks
         _discover_xedext_extension()
 
-    # Generate the JSON output first — this is the primary deliverable.
-    xed_json_db = []
-    if args.raw:
-        for rec in xed_input_db.recs:
-            fix_attr(rec)
-            xed_json_db.append(convert_to_serializable(rec))
+    # Generate the output first — this is the primary deliverable. The
+    # records are converted and written one at a time.
+    if args.validate and not args.raw:
+        xed_gen_inst_rec_db = []  # keep the records for validation
+    records = gen_output_records(args, xed_input_db, xed_gen_inst_rec_db)
+    if args.format == 'ndjson':
+        output_ndjson(args, records)
+    elif args.format == 'columnar':
+        output_columnar(args, records)
     else:
-        xed_gen_inst_rec_db = gen_xed_inst_db(args, xed_input_db)
-        for rec in xed_gen_inst_rec_db:
-            xed_json_db.append(convert_to_serializable(rec))
-    output_json(args, xed_json_db)
+        output_json(args, records)
 
     # Validation is non-destructive: warnings or errors never prevent JSON generation.
     if args.validate:
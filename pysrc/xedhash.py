@@ -25,9 +25,20 @@ XED. Different hash algorithms (FKS, multiplicative, linear) implement this
 interface to provide pluggable hashing strategies for lookup table generation.
 """
 import collections
+import itertools
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 #The idea is to have different algorithms for finding hash
 #functions. So far we use only FKS and it seems to work well enough.
+#
+#Hash function classes can also define a classmethod apply_np(params, keys)
+#that applies many candidate functions at once: params is an (ncand,
+#nparams) int64 NumPy array of constructor arguments and keys is a uint64
+#NumPy array. It returns an (ncand, nkeys) array of hash values. It is used
+#by find_first_perfect() and find_first_well_distributed().
 class hash_fun_interface_t(object):
     def _raise_error(self):
         raise NotImplementedError("Hash function not implemented.")
@@ -75,3 +86,121 @@ def is_well_distributed(keylist, hash_f, maxbin):
 
     okay = _measure_bucket_max(table, maxbin)
     return okay
+
+
+############################################################################
+# Batched candidate search.
+#
+# The hash function searches try thousands of parameter tuples against the
+# same key list. When NumPy is available and the hash function class
+# defines apply_np(), candidates are applied to the whole key array in
+# batches, and tested with array operations. Otherwise each candidate is
+# tested with is_perfect() or is_well_distributed(). Both ways return the
+# same (first) candidate.
+############################################################################
+
+_batch_min_rows = 64        # size of the first batch of candidates
+_batch_max_elements = 1<<20 # limit on candidates*keys in a batch
+_first_stage_keys = 16      # see _np_find_first()
+_max_np_key = 1<<32         # larger keys could overflow the NumPy math
+
+def _use_numpy(hash_class, keys):
+    if numpy is None or not hasattr(hash_class, 'apply_np') or not keys:
+        return False
+    for x in keys:
+        if x < 0 or x >= _max_np_key:
+            return False
+    return True
+
+def _py_params(param_list):
+    """Return param_list as an iterable of Python int tuples or lists"""
+    if numpy is not None and isinstance(param_list, numpy.ndarray):
+        return param_list.tolist()
+    return param_list
+
+def _np_param_batches(param_list, rows, max_rows):
+    """Yield 2D int64 arrays of candidate parameters. param_list is an
+    iterable of tuples or a 2D NumPy array. Batches start small and grow,
+    since the search often succeeds on the first few candidates."""
+    if isinstance(param_list, numpy.ndarray):
+        start = 0
+        while start < len(param_list):
+            yield param_list[start:start+rows]
+            start += rows
+            rows = min(2*rows, max_rows)
+        return
+    params_iter = iter(param_list)
+    while True:
+        chunk = list(itertools.islice(params_iter, rows))
+        if not chunk:
+            return
+        yield numpy.array(chunk, dtype=numpy.int64)
+        rows = min(2*rows, max_rows)
+
+def _np_max_bucket_sizes(values):
+    """Return the size of the largest bucket of each row of hash values"""
+    # count the keys per (candidate, bucket) with a single bincount
+    nrows = values.shape[0]
+    nbuckets = int(values.max()) + 1
+    rows = numpy.arange(nrows, dtype=numpy.int64)[:, None]
+    counts = numpy.bincount((values + rows * nbuckets).ravel(),
+                            minlength=nrows * nbuckets)
+    return counts.reshape(nrows, nbuckets).max(axis=1)
+
+def _np_find_first(keys, hash_class, param_list, maxbin):
+    """Return the first candidate with less than maxbin keys in every
+    bucket, or None. Buckets only grow as keys are added, so each batch of
+    candidates is first tested on a short prefix of the keys, and only the
+    surviving candidates are tested on longer prefixes. This is what makes
+    rejecting most candidates cheap, like the early exit of is_perfect()."""
+    np_keys = numpy.array(keys, dtype=numpy.uint64)
+    stops = []
+    stop = _first_stage_keys
+    while stop < len(keys):
+        stops.append(stop)
+        stop *= 4
+    stops.append(len(keys))
+
+    max_rows = max(1, _batch_max_elements // len(keys))
+    for params in _np_param_batches(param_list,
+                                    min(_batch_min_rows, max_rows),
+                                    max_rows):
+        for stop in stops:
+            values = hash_class.apply_np(params, np_keys[:stop])
+            params = params[_np_max_bucket_sizes(values) < maxbin]
+            if len(params) == 0:
+                break
+        if len(params):
+            return hash_class(*params[0].tolist())
+    return None
+
+def find_first_perfect(keylist, hash_class, param_list):
+    """Return hash_class(*params) for the first tuple params in param_list
+    that makes a perfect hash function for keylist, or None."""
+    keys = list(keylist)
+    if _use_numpy(hash_class, keys):
+        # perfect means at most one key per bucket
+        return _np_find_first(keys, hash_class, param_list, 2)
+    for params in _py_params(param_list):
+        hash_f = hash_class(*params)
+        if is_perfect(keys, hash_f):
+            return hash_f
+    return None
+
+def find_first_well_distributed(keylist, hash_class, param_list, maxbin):
+    """Return hash_class(*params) for the first tuple params in param_list
+    that makes a hash function with less than maxbin keylist keys in every
+    bucket, or None. keylist is a list or a dict of keys, like for
+    is_well_distributed()."""
+    if isinstance(keylist, dict):
+        keydict = keylist
+    else:
+        keydict = dict(enumerate(keylist))
+    keys = list(keydict.values())
+    if _use_numpy(hash_class, keys):
+        return _np_find_first(keys, hash_class, param_list, maxbin)
+    for params in _py_params(param_list):
+        hash_f = hash_class(*params)
+        if is_well_distributed(keydict, hash_f, maxbin):
+            return hash_f
+    return None
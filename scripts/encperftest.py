@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+#-*- python -*-
+#BEGIN_LEGAL
+#
+#Copyright (c) 2026 Intel Corporation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#END_LEGAL
+"""
+XED encode benchmark.
+
+Measures both encoder paths and reports cycles, ns per instruction and
+bytes per second for each ISA family:
+
+  * xed_encode: the xed command line tool decodes and re-encodes the
+    synthetic corpora of perftest.py (xed -irde). xed times each
+    xed_encode call.
+  * enc2: the enc2 tester programs (enc2tester-enc2-m64-a64 etc, built
+    with --enc2-test or --test-perf) encode every enc2 test function
+    --reps times without the decode check (--bench) and report totals
+    per ISA extension.
+
+ns and bytes/second are derived from the TSC frequency, like the
+instructions/second of perftest.py. Results and baselines use the format
+of perfutil.py.
+"""
+from __future__ import print_function
+import os
+import re
+import sys
+import argparse
+import find_dir
+import perfutil
+import perftest
+
+try:
+    import mbuild
+except:
+    sys.path.append(find_dir.find_dir('mbuild'))
+    import mbuild
+
+_enc_cycles_re = re.compile(r'^#Total ENCODE cycles:\s+(\d+)', re.M)
+_enc_insts_re = re.compile(r'^#Total instructions ENCODE:\s+(\d+)', re.M)
+_bench_re = re.compile(r'^//Bench: (\S+) tests (\d+) encodes (\d+) ' +
+                       r'cycles (\d+) bytes (\d+)', re.M)
+
+def _run(cmd):
+    (status, stdout, stderr) = mbuild.run_command(cmd)
+    output = ''.join(stdout or [])
+    if status:
+        print("Error running {} (status {})".format(cmd, status))
+        for line in stdout or []:
+            print("   ", line, end=' ')
+        return None
+    return output
+
+def xed_encode_sample(args, corpus):
+    """Decode and re-encode a corpus once. Returns {name: (cycles,
+    encodes, bytes)} or None. The bytes are estimated from the size of
+    the corpus since re-encoding mostly reproduces the input."""
+    output = _run(' '.join([args.xed, '-v', '0', corpus.mode,
+                            '-irde', corpus.fn]))
+    if output is None:
+        return None
+    cycles = _enc_cycles_re.search(output)
+    insts = _enc_insts_re.search(output)
+    if not cycles or not insts or int(insts.group(1)) == 0:
+        print("No encode statistics for {}".format(corpus.fn))
+        return None
+    encodes = int(insts.group(1))
+    return { 'xed_encode-' + corpus.name: (int(cycles.group(1)), encodes,
+                                           os.path.getsize(corpus.fn)) }
+
+def enc2_sample(args, tester):
+    """Run an enc2 tester in bench mode once. Returns {name: (cycles,
+    encodes, bytes)} or None."""
+    output = _run('{} --bench --reps {}'.format(tester, args.reps))
+    if output is None:
+        return None
+    config = re.sub(r'(\.exe)?$', '', os.path.basename(tester))
+    config = config.replace('enc2tester-', '')
+    r = {}
+    for m in _bench_re.finditer(output):
+        name = '{}-{}'.format(config, m.group(1).lower())
+        r[name] = (int(m.group(4)), int(m.group(3)), int(m.group(5)))
+    if not r:
+        print("No enc2 bench output from {}".format(tester))
+        return None
+    return r
+
+class _corpus_t(object):
+    def __init__(self, c):
+        self.name = c.name
+        self.family = c.family
+        (self.mode, _, self.fn) = c.args
+
+def work(args):
+    print("Testing encoder performance...")
+
+    if not os.path.exists(args.xed):
+        mbuild.warn("Performance test executable binary not found: {}".format(args.xed))
+        return 2
+
+    (cpu, ghz) = perfutil.setup_machine(args)
+
+    # each runner returns a dict of benchmark name -> (cycles, encodes, bytes)
+    runners = []
+    families = {}
+    for c in perftest.build_corpora(args):
+        c = _corpus_t(c)
+        runners.append((xed_encode_sample, c))
+        families['xed_encode-' + c.name] = c.family
+    for tester in args.enc2_tester:
+        runners.append((enc2_sample, tester))
+
+    print("Skipping {} samples...".format(args.skip))
+    for sample in range(0, args.skip):
+        for (fn, x) in runners:
+            fn(args, x)
+
+    print("Running  {} samples of {} programs...".format(args.samples,
+                                                        len(runners)))
+    benchmarks = {}
+    for sample in range(0, args.samples):
+        for (fn, x) in runners:
+            r = fn(args, x)
+            if not r:
+                print("MISSING SAMPLES")
+                return 2
+            for name, (cycles, encodes, nbytes) in r.items():
+                if args.filter and not re.search(args.filter, name):
+                    continue
+                if name not in benchmarks:
+                    # enc2 names end with the XED extension
+                    family = families.get(name, name.split('-')[-1])
+                    benchmarks[name] = { 'family': family,
+                                         'metrics': { 'cycles_per_inst': [] } }
+                    if ghz:
+                        benchmarks[name]['metrics']['ns_per_inst'] = []
+                        benchmarks[name]['metrics']['bytes_per_sec'] = []
+                cpi = float(cycles) / encodes
+                metrics = benchmarks[name]['metrics']
+                metrics['cycles_per_inst'].append(cpi)
+                if ghz:
+                    metrics['ns_per_inst'].append(cpi / ghz)
+                    metrics['bytes_per_sec'].append(
+                        float(nbytes) / encodes * ghz * 1e9 / cpi)
+    if not benchmarks:
+        mbuild.warn("No encoder benchmarks")
+        return 2
+
+    results = perfutil.make_results('encode', benchmarks,
+                                    { 'cpu_pinned': cpu,
+                                      'tsc_ghz': ghz,
+                                      'samples': args.samples,
+                                      'enc2_reps': args.reps })
+    print("{:<40} {:>10} {:>10} {:>10} {:>10} {:>12}".format(
+        'benchmark', 'p10', 'median', 'p90', 'ns/inst', 'MB/sec'))
+    for name in sorted(results['benchmarks']):
+        m = results['benchmarks'][name]['metrics']
+        s = m['cycles_per_inst']
+        ns = m['ns_per_inst']['median'] if ghz else float('nan')
+        mbs = m['bytes_per_sec']['median'] / 1e6 if ghz else float('nan')
+        print("{:<40} {:10.2f} {:10.2f} {:10.2f} {:10.2f} {:12.2f}".format(
+            name, s['p10'], s['median'], s['p90'], ns, mbs))
+    return perfutil.report(args, results)
+
+def setup(defaults):
+    parser = argparse.ArgumentParser(description='XED encoder performance testing.')
+    parser.add_argument("--xed", help='input XED executable',
+                        default=defaults.xed)
+    parser.add_argument("--enc2-tester", help='enc2 tester program. ' +
+                        'Repeatable. Default: obj/*/enc2tester-*',
+                        action="append", default=[])
+    parser.add_argument("--reps", help='encodes per enc2 test function per sample',
+                        type=int, default=defaults.reps)
+    parser.add_argument("--bulk-tests", help='bulk test file with decode ' +
+                        'tests for the xed_encode corpora. Repeatable. ' +
+                        'Default: tests/bulk-tests/*.txt',
+                        action="append", default=[])
+    parser.add_argument("--corpus-dir", help='directory for the corpora',
+                        default=defaults.corpus_dir)
+    parser.add_argument("--corpus-kb", help='size of each corpus',
+                        type=int, default=defaults.corpus_kb)
+    parser.add_argument("--min-unique", help='minimum number of distinct ' +
+                        'instructions in a corpus',
+                        type=int, default=defaults.min_unique)
+    parser.add_argument("--filter", help='only report benchmarks matching this regex',
+                        default=defaults.filter)
+    parser.add_argument("--samples", help='number of samples',
+                        type=int, default=defaults.samples)
+    parser.add_argument("--skip", help='number of samples to skip',
+                        type=int, default=defaults.skip)
+    parser.add_argument("--no-pin", help='do not pin to one CPU',
+                        action="store_false", dest='pin',
+                        default=defaults.pin)
+    parser.add_argument("--cpu", help='CPU to pin to. Default: the last allowed CPU',
+                        type=int, default=defaults.cpu)
+    parser.add_argument("--tsc-ghz", help='time stamp counter frequency ' +
+                        'for ns and bytes/second. Default: from /proc/cpuinfo',
+                        type=float, default=defaults.tsc_ghz)
+    parser.add_argument("--output", help='write the results to this JSON file',
+                        default=defaults.output)
+    parser.add_argument("--baseline", help='compare to this JSON baseline',
+                        default=defaults.baseline)
+    parser.add_argument("--save-baseline", help='write a baseline made ' +
+                        'from the results to this JSON file',
+                        default=defaults.save_baseline)
+    parser.add_argument("--tolerance", help='tolerance percent for --save-baseline',
+                        type=float, default=defaults.tolerance)
+    args = parser.parse_args()
+    if not args.enc2_tester:
+        args.enc2_tester = defaults.enc2_tester
+    if not args.bulk_tests:
+        args.bulk_tests = defaults.bulk_tests
+    return args
+
+def mkargs():
+    args = perftest.mkargs()
+    args.enc2_tester = [ t for t in mbuild.glob('obj', '*', 'enc2tester-*')
+                         if re.search(r'enc2tester-[^.]+(\.exe)?$', t) ]
+    args.reps = 100
+    return args
+
+if __name__ == "__main__":
+    defaults = mkargs()
+    args = setup(defaults)
+    r = work(args)
+    sys.exit(r)
@@ -15,23 +15,49 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
-#  
+#
 #END_LEGAL
+"""
+XED decode benchmark.
+
+Runs the xed command line tool over several corpora and reports the decode
+cycles per instruction measured by xed (and the implied instructions per
+second) for each one:
+
+  * one synthetic corpus per ISA family and machine mode, built from the
+    decode tests in tests/bulk-tests. Each instruction is checked with
+    xed -d and the valid ones are repeated to fill a raw binary file.
+  * the text sections of ELF files (--elf, by default the xed binary).
+
+Samples of the corpora are interleaved so that slow drifts of the machine
+affect all corpora alike. The process is pinned to one CPU. Medians and
+percentiles are compared to a JSON baseline with a tolerance band per
+corpus (see perfutil.py), so regressions are reported per ISA family.
+"""
 from __future__ import print_function
 import os
 import re
 import sys
 import argparse
-import textwrap
 import find_dir
-import math
+import perfutil
 
 try:
     import mbuild
-except:    
+except:
     sys.path.append(find_dir.find_dir('mbuild'))
     import mbuild
 
+_mode_flags = ['-16', '-32', '-64']
+_cycles_re = re.compile(r'^#Total DECODE cycles:\s+(\d+)', re.M)
+_insts_re = re.compile(r'^#Total instructions DECODE:\s+(\d+)', re.M)
+
+class corpus_t(object):
+    def __init__(self, name, family, args):
+        self.name = name
+        self.family = family
+        self.args = args # xed arguments that decode the corpus
+
 def graph_it(lst):
     import numpy as np
     import matplotlib.pyplot as plt
@@ -39,90 +65,174 @@ def graph_it(lst):
     plt.plot(lst)
     plt.show()
 
-def variance(cpd):
-    cpd_avg = sum(cpd)/len(cpd)
-    s = 0.0
-    for x in cpd:
-        d =  (x-cpd_avg)
-        s += d*d
-    return s/(len(cpd)-1)
-def standard_deviation(cpd):
-    return math.sqrt(variance(cpd))
+def read_bulk_tests(fn):
+    """Returns a list of (family, mode flag, hex bytes) for the xed -d and
+    xed -de tests in a bulk test file. Tests with other knobs are skipped
+    since the knobs can change what decodes."""
+    tests = []
+    for line in open(fn):
+        line = re.sub(r'#.*', '', line).strip()
+        if ';' not in line:
+            continue
+        (codes, cmd) = line.split(';', 1)
+        tokens = cmd.split()
+        if not tokens or os.path.basename(tokens[0]) != 'xed':
+            continue
+        mode = '-32'
+        i = 1
+        while i < len(tokens) and tokens[i] in _mode_flags:
+            mode = tokens[i]
+            i += 1
+        if i >= len(tokens) or tokens[i] not in ['-d', '-de']:
+            continue
+        hex_bytes = ''.join(tokens[i+1:])
+        if not hex_bytes or not re.match(r'^[0-9a-fA-F]+$', hex_bytes) \
+           or len(hex_bytes) % 2:
+            continue
+        family = [ c for c in codes.split() if c not in ['DEC', 'ENC'] ]
+        family = '-'.join(sorted(family)).lower() or 'base'
+        tests.append((family, mode, hex_bytes.lower()))
+    return tests
+
+def decodes(xed, mode, hex_bytes):
+    (retcode, stdout, stderr) = mbuild.run_command(
+        '{} {} -d {}'.format(xed, mode, hex_bytes))
+    return retcode == 0
+
+def build_corpora(args):
+    """Write the synthetic corpora to args.corpus_dir. Returns a list of
+    corpus_t."""
+    groups = {} # (family, mode) -> list of hex bytes
+    for fn in args.bulk_tests:
+        for (family, mode, hex_bytes) in read_bulk_tests(fn):
+            group = groups.setdefault((family, mode), [])
+            if hex_bytes not in group:
+                group.append(hex_bytes)
+
+    mbuild.cmkdir(args.corpus_dir)
+    corpora = []
+    for (family, mode) in sorted(groups):
+        valid = [ h for h in groups[(family, mode)]
+                  if decodes(args.xed, mode, h) ]
+        if len(valid) < args.min_unique:
+            continue
+        unit = bytes.fromhex(''.join(valid))
+        reps = max(1, args.corpus_kb * 1024 // len(unit))
+        name = '{}-{}'.format(family, mode[1:])
+        fn = os.path.join(args.corpus_dir, name + '.bin')
+        with open(fn, 'wb') as f:
+            f.write(unit * reps)
+        print("Corpus {}: {} instructions x {}".format(name, len(valid), reps))
+        corpora.append(corpus_t(name, family, [mode, '-ir', fn]))
+    return corpora
 
+def elf_corpora(args):
+    elf = args.elf
+    if not elf and sys.platform.startswith('linux'):
+        elf = [ args.xed ]
+    corpora = []
+    for fn in elf:
+        if not os.path.exists(fn):
+            mbuild.warn("ELF input not found: {}".format(fn))
+            continue
+        name = 'elf-' + os.path.basename(fn)
+        corpora.append(corpus_t(name, 'elf', ['-i', fn]))
+    return corpora
+
+def run_sample(args, corpus):
+    """Decode the corpus once. Returns (cycles, instructions) or None."""
+    cmd = ' '.join([args.xed, '-v', '0'] + corpus.args)
+    (status, stdout, stderr) = mbuild.run_command(cmd)
+    output = ''.join(stdout or [])
+    cycles = _cycles_re.search(output)
+    insts = _insts_re.search(output)
+    if status or not cycles or not insts or int(insts.group(1)) == 0:
+        print("Error running {} (status {})".format(cmd, status))
+        for line in stdout or []:
+            print("   ", line, end=' ')
+        return None
+    return (int(cycles.group(1)), int(insts.group(1)))
 
 def work(args):
     print("Testing performance...")
 
-    if not os.path.exists(args.input):
-        mbuild.warn("Performance test input binary not found: {}".format(args.input))
-        return 2
     if not os.path.exists(args.xed):
         mbuild.warn("Performance test executable binary not found: {}".format(args.xed))
         return 2
 
-    s = args.xed + ' -v 0 -i ' + args.input
-    print(s)
-    cpd = []
-    
+    (cpu, ghz) = perfutil.setup_machine(args)
+
+    corpora = build_corpora(args) + elf_corpora(args)
+    if args.filter:
+        corpora = [ c for c in corpora if re.search(args.filter, c.name) ]
+    if not corpora:
+        mbuild.warn("No performance test corpora")
+        return 2
+
     print("Skipping {} samples...".format(args.skip))
-    for sample in range(0,args.skip):
-        (status, stdout, stderr) =  mbuild.run_command(s)
-
-    print("Running  {} tests...".format(args.samples))
-    for sample in range(0,args.samples):
-        (status, stdout, stderr) =  mbuild.run_command(s)
-        found=False
-        if status == 0 and stdout:
-            for line in stdout:
-                if '#Total cycles/instruction DECODE' in line:
-                    chunks = line.strip().split()
-                    cpd_one = float(chunks[-1])
-                    found = True
-        if status and stdout:
-            print("Error messages from sample {0:d}:".format(sample))
-            for line in stdout:
-                print("   ",line, end=' ')
-        if found:
-            cpd.append(cpd_one)
-    
-    if len(cpd) == args.samples:
-
-        expected = 450.0  # cycles / decode 
-
-        cpd_min = min(cpd)
-        cpd_max = max(cpd)
-        cpd_avg = sum(cpd)/len(cpd)
-        print(textwrap.fill("Samples: " +  
-                            ", ".join(["{0:6.2f}".format(x) for x in cpd]),
-                            subsequent_indent = "         "))
-
-        print("Minimum: {0:6.2f}".format(cpd_min))
-        print("Average: {0:6.2f}".format(cpd_avg))
-        print("Maximum: {0:6.2f}".format(cpd_max))
-        print("Range  : {0:6.2f}".format(cpd_max-cpd_min))
-        print("Stddev : {0:6.2f}".format(standard_deviation(cpd)))
-
-
-        if cpd_avg > expected:
-            s =  ["PERFORMANCE DEGREDATION: "]
-            s.append("Observed {0:.2f} vs Expected {1:.2f}".format(
-                    cpd_avg, expected))
-            print("".join(s))
-            return 1 # error
-        print("Success. Average less than {0:.2f}".format(expected))
-        
-        if args.graph:
-            graph_it(cpd)
-        return 0 # success
-    print("MISSING SAMPLES")
-    return 2
+    for sample in range(0, args.skip):
+        for c in corpora:
+            run_sample(args, c)
+
+    print("Running  {} samples of {} corpora...".format(args.samples,
+                                                       len(corpora)))
+    benchmarks = {}
+    for c in corpora:
+        benchmarks[c.name] = { 'family': c.family,
+                               'metrics': { 'cycles_per_inst': [] } }
+        if ghz:
+            benchmarks[c.name]['metrics']['insts_per_sec'] = []
+    for sample in range(0, args.samples):
+        for c in corpora:
+            r = run_sample(args, c)
+            if not r:
+                print("MISSING SAMPLES")
+                return 2
+            (cycles, insts) = r
+            cpi = float(cycles) / insts
+            metrics = benchmarks[c.name]['metrics']
+            metrics['cycles_per_inst'].append(cpi)
+            if ghz:
+                metrics['insts_per_sec'].append(ghz * 1e9 / cpi)
+
+    results = perfutil.make_results('decode', benchmarks,
+                                    { 'cpu_pinned': cpu,
+                                      'tsc_ghz': ghz,
+                                      'samples': args.samples })
+    print("{:<32} {:>10} {:>10} {:>10} {:>10} {:>12}".format(
+        'corpus', 'p10', 'median', 'p90', 'mad', 'Minst/sec'))
+    for name in sorted(results['benchmarks']):
+        m = results['benchmarks'][name]['metrics']
+        s = m['cycles_per_inst']
+        ips = m['insts_per_sec']['median'] / 1e6 if ghz else float('nan')
+        print("{:<32} {:10.2f} {:10.2f} {:10.2f} {:10.2f} {:12.2f}".format(
+            name, s['p10'], s['median'], s['p90'], s['mad'], ips))
+
+    if args.graph:
+        for c in corpora:
+            graph_it(benchmarks[c.name]['metrics']['cycles_per_inst'])
+    return perfutil.report(args, results)
 
 def setup(defaults):
     parser = argparse.ArgumentParser(description='XED Performance testing.')
     parser.add_argument("--xed", help='input XED executable',
                         default=defaults.xed)
-    parser.add_argument("--input", help='input test file name',
-                        default=defaults.input)
+    parser.add_argument("--elf", help='ELF file to decode. Repeatable. ' +
+                        'Default: the XED executable on linux',
+                        action="append", default=defaults.elf)
+    parser.add_argument("--bulk-tests", help='bulk test file with decode ' +
+                        'tests for the synthetic corpora. Repeatable. ' +
+                        'Default: tests/bulk-tests/*.txt',
+                        action="append", default=[])
+    parser.add_argument("--corpus-dir", help='directory for the synthetic corpora',
+                        default=defaults.corpus_dir)
+    parser.add_argument("--corpus-kb", help='size of each synthetic corpus',
+                        type=int, default=defaults.corpus_kb)
+    parser.add_argument("--min-unique", help='minimum number of distinct ' +
+                        'instructions in a synthetic corpus',
+                        type=int, default=defaults.min_unique)
+    parser.add_argument("--filter", help='only run corpora matching this regex',
+                        default=defaults.filter)
     parser.add_argument("--graph", help='graph the samples',
                         action="store_true",
                         default=defaults.graph)
@@ -130,7 +240,26 @@ def setup(defaults):
                         type=int, default=defaults.samples)
     parser.add_argument("--skip", help='number of samples to skip',
                         type=int, default=defaults.skip)
+    parser.add_argument("--no-pin", help='do not pin to one CPU',
+                        action="store_false", dest='pin',
+                        default=defaults.pin)
+    parser.add_argument("--cpu", help='CPU to pin to. Default: the last allowed CPU',
+                        type=int, default=defaults.cpu)
+    parser.add_argument("--tsc-ghz", help='time stamp counter frequency ' +
+                        'for instructions/second. Default: from /proc/cpuinfo',
+                        type=float, default=defaults.tsc_ghz)
+    parser.add_argument("--output", help='write the results to this JSON file',
+                        default=defaults.output)
+    parser.add_argument("--baseline", help='compare to this JSON baseline',
+                        default=defaults.baseline)
+    parser.add_argument("--save-baseline", help='write a baseline made ' +
+                        'from the results to this JSON file',
+                        default=defaults.save_baseline)
+    parser.add_argument("--tolerance", help='tolerance percent for --save-baseline',
+                        type=float, default=defaults.tolerance)
     args = parser.parse_args()
+    if not args.bulk_tests:
+        args.bulk_tests = defaults.bulk_tests
     return args
 
 class args_t:
@@ -144,10 +273,24 @@ def mkargs():
         if re.match(r'xed(\.exe)?$', os.path.basename(exe)):
             args.xed = exe
 
-    args.input = '/usr/bin/emacs24-x'
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    args.elf = []
+    args.bulk_tests = mbuild.glob(os.path.join(src_dir, 'tests', 'bulk-tests'),
+                                  '*.txt')
+    args.corpus_dir = os.path.join('obj', 'perf-corpus')
+    args.corpus_kb = 256
+    args.min_unique = 4
+    args.filter = None
     args.graph = False
-    args.samples=10
-    args.skip=12
+    args.samples = 10
+    args.skip = 2
+    args.pin = True
+    args.cpu = None
+    args.tsc_ghz = None
+    args.output = None
+    args.baseline = None
+    args.save_baseline = None
+    args.tolerance = perfutil.default_tolerance_pct
     return args
 
 if __name__ == "__main__":
@@ -155,4 +298,4 @@ if __name__ == "__main__":
     args = setup(defaults)
     r = work(args)
     sys.exit(r)
-    
+
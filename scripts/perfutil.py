@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+#-*- python -*-
+#BEGIN_LEGAL
+#
+#Copyright (c) 2026 Intel Corporation
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#END_LEGAL
+"""
+Shared support for the XED benchmark scripts: CPU pinning, sample
+statistics and the JSON result and regression-baseline files.
+
+A results file holds one entry per benchmark (corpus) with the summary
+statistics of each metric:
+
+    { "version": 1,
+      "kind": "decode",
+      "machine": {...},
+      "benchmarks": { NAME: { "family": FAMILY,
+                              "metrics": { METRIC: {"median": ...,
+                                                    "p10": ..., ...} } } } }
+
+A baseline file has the same layout with a tolerance band per metric:
+
+      "benchmarks": { NAME: { "family": FAMILY,
+                              "metrics": { METRIC: {"median": X,
+                                                    "tolerance_pct": T} } } }
+
+A benchmark regresses when the median of a metric is more than T percent
+worse than the baseline median. Which direction is worse comes from
+_higher_is_better. A baseline metric without a result is MISSING and
+fails the comparison like a regression.
+"""
+from __future__ import print_function
+import os
+import sys
+import json
+import math
+import platform
+import re
+
+_file_version = 1
+
+# metric -> True if larger values are better
+_higher_is_better = { 'cycles_per_inst': False,
+                      'ns_per_inst': False,
+                      'insts_per_sec': True,
+                      'bytes_per_sec': True }
+
+default_tolerance_pct = 5.0
+
+def pin_cpu(cpu=None):
+    """Pin this process (and the processes it starts) to one CPU. Uses the
+    last allowed CPU if cpu is None, since CPU 0 usually services more
+    interrupts. Returns the CPU or None if pinning is not supported."""
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    allowed = sorted(os.sched_getaffinity(0))
+    if cpu is None:
+        cpu = allowed[-1]
+    os.sched_setaffinity(0, [cpu])
+    return cpu
+
+def tsc_ghz():
+    """Estimate the time stamp counter frequency from the nominal frequency
+    in the CPU model name. On CPUs with an invariant TSC, it runs at that
+    frequency. Returns None if it is unknown."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name') and '@' in line:
+                    s = line.split('@')[-1].strip()
+                    if s.endswith('GHz'):
+                        return float(s[:-3])
+    except (IOError, ValueError):
+        pass
+    return None
+
+def machine_info():
+    info = { 'platform': platform.platform(),
+             'machine': platform.machine(),
+             'python': platform.python_version() }
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    info['cpu'] = line.split(':', 1)[1].strip()
+                    break
+    except IOError:
+        pass
+    return info
+
+def percentile(sorted_values, pct):
+    """Linear interpolation between the closest ranks"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(math.floor(k))
+    hi = int(math.ceil(k))
+    if lo == hi:
+        return sorted_values[lo]
+    return (sorted_values[lo] * (hi - k) +
+            sorted_values[hi] * (k - lo))
+
+def summarize(samples):
+    """Summary statistics of a list of samples"""
+    v = sorted(samples)
+    n = len(v)
+    mean = sum(v) / n
+    if n > 1:
+        stddev = math.sqrt(sum((x - mean)**2 for x in v) / (n - 1))
+    else:
+        stddev = 0.0
+    median = percentile(v, 50)
+    mad = percentile(sorted(abs(x - median) for x in v), 50)
+    return { 'samples': n,
+             'min': v[0],
+             'p10': percentile(v, 10),
+             'median': median,
+             'p90': percentile(v, 90),
+             'max': v[-1],
+             'mean': mean,
+             'stddev': stddev,
+             'mad': mad }
+
+def make_results(kind, benchmarks, info=None):
+    """benchmarks is a dict: name -> {'family': ..., 'metrics': {metric:
+    list of samples}}. Returns the results as a JSON-able dict."""
+    r = { 'version': _file_version,
+          'kind': kind,
+          'machine': machine_info(),
+          'benchmarks': {} }
+    if info:
+        r.update(info)
+    for name, b in benchmarks.items():
+        r['benchmarks'][name] = { 'family': b['family'],
+                                  'metrics': { m: summarize(s)
+                                               for m, s in b['metrics'].items() } }
+    return r
+
+def make_baseline(results, tolerance_pct=default_tolerance_pct):
+    """A baseline from results, with one tolerance for all metrics. Edit
+    the file to widen the band of noisy benchmarks."""
+    b = { 'version': _file_version,
+          'kind': results['kind'],
+          'machine': results['machine'],
+          'benchmarks': {} }
+    for name, r in results['benchmarks'].items():
+        b['benchmarks'][name] = {
+            'family': r['family'],
+            'metrics': { m: { 'median': s['median'],
+                              'tolerance_pct': tolerance_pct }
+                         for m, s in r['metrics'].items() } }
+    return b
+
+def read_json(fn):
+    with open(fn) as f:
+        d = json.load(f)
+    if d.get('version') != _file_version:
+        raise ValueError("Unsupported benchmark file version in {}".format(fn))
+    return d
+
+def write_json(fn, d):
+    with open(fn, 'w') as f:
+        json.dump(d, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def compare(results, baseline, name_filter=None):
+    """Compare the medians of results to the baseline. Returns a list of
+    (name, family, metric, median, baseline median, delta percent, status)
+    where delta is positive when the result is worse and status is one of
+    OK, REGRESSION, IMPROVED, NEW or MISSING. MISSING rows are baseline
+    metrics without a result and have no median. Baseline benchmarks not
+    matching the regex name_filter are not expected in the results."""
+    rows = []
+    if results['kind'] != baseline['kind']:
+        raise ValueError("Cannot compare {} results to a {} baseline".format(
+            results['kind'], baseline['kind']))
+    for name in sorted(results['benchmarks']):
+        r = results['benchmarks'][name]
+        b = baseline['benchmarks'].get(name)
+        for metric in sorted(r['metrics']):
+            median = r['metrics'][metric]['median']
+            if b is None or metric not in b['metrics']:
+                rows.append((name, r['family'], metric, median, None, None, 'NEW'))
+                continue
+            bm = b['metrics'][metric]
+            delta = 100.0 * (median - bm['median']) / bm['median']
+            if _higher_is_better.get(metric):
+                delta = -delta
+            tol = bm.get('tolerance_pct', default_tolerance_pct)
+            if delta > tol:
+                status = 'REGRESSION'
+            elif delta < -tol:
+                status = 'IMPROVED'
+            else:
+                status = 'OK'
+            rows.append((name, r['family'], metric, median, bm['median'],
+                         delta, status))
+    for name in sorted(baseline['benchmarks']):
+        if name_filter and not re.search(name_filter, name):
+            continue
+        b = baseline['benchmarks'][name]
+        r = results['benchmarks'].get(name, { 'metrics': {} })
+        for metric in sorted(b['metrics']):
+            if metric not in r['metrics']:
+                rows.append((name, b['family'], metric, None,
+                             b['metrics'][metric]['median'], None, 'MISSING'))
+    return rows
+
+def print_comparison(rows):
+    """Print the rows from compare(). Returns the number of regressions
+    and missing results."""
+    regressions = 0
+    for (name, family, metric, median, base, delta, status) in rows:
+        if median is None:
+            print("{:<7} {:<32} {:<16} {:>14} baseline {:<14.4g}".format(
+                status, name, metric, '-', base))
+            regressions += 1
+            continue
+        if base is None:
+            print("{:<7} {:<32} {:<16} {:14.4g}".format(status, name, metric,
+                                                       median))
+            continue
+        print("{:<7} {:<32} {:<16} {:14.4g} baseline {:<14.4g} {:+7.2f}%".format(
+            'REGRESS' if status == 'REGRESSION' else status,
+            name, metric, median, base, delta))
+        if status == 'REGRESSION':
+            regressions += 1
+    return regressions
+
+def family_summary(rows):
+    """Worst delta per (family, metric), so that a regression is reported
+    against an ISA family. Returns a sorted list of (family, metric, worst
+    delta, status)."""
+    worst = {}
+    for (name, family, metric, median, base, delta, status) in rows:
+        if delta is None:
+            continue
+        k = (family, metric)
+        if k not in worst or delta > worst[k][0]:
+            worst[k] = (delta, status)
+    return [ (f, m, d, s) for ((f, m), (d, s)) in sorted(worst.items()) ]
+
+def setup_machine(args):
+    """Pin to args.cpu if args.pin and find the TSC frequency (args.tsc_ghz
+    or from /proc/cpuinfo). Returns (cpu or None, GHz or None)."""
+    cpu = None
+    if args.pin:
+        cpu = pin_cpu(args.cpu)
+        print("Pinned to CPU {}".format(cpu) if cpu is not None
+              else "CPU pinning not supported")
+    return (cpu, args.tsc_ghz or tsc_ghz())
+
+def report(args, results):
+    """Write the results to args.output, a baseline made from them to
+    args.save_baseline and compare them to args.baseline. Returns 0, or
+    1 if there are regressions or missing results."""
+    if args.output:
+        write_json(args.output, results)
+    if args.save_baseline:
+        write_json(args.save_baseline, make_baseline(results, args.tolerance))
+        print("Wrote baseline {}".format(args.save_baseline))
+    if not args.baseline:
+        return 0
+    rows = compare(results, read_json(args.baseline), args.filter)
+    regressions = print_comparison(rows)
+    for (family, metric, delta, status) in family_summary(rows):
+        print("Family {:<24} {:<16} worst {:+7.2f}% {}".format(
+            family, metric, delta, status))
+    if regressions:
+        print("PERFORMANCE DEGRADATION: {} regressions or missing "
+              "results".format(regressions))
+        return 1
+    print("Success. No regressions against {}".format(args.baseline))
+    return 0
@@ -52,6 +52,7 @@ static int enable_emit_test_name=0;
 
 static int enable_emit_json=0;
 static int ignore_errors=0;
+static int enable_bench=0;
 static int non_empty_json_list=0;
 
 static void dump_comment(xed_uint8_t* buf, xed_uint32_t len) {
@@ -236,6 +237,52 @@ int test_all(test_func_t* base, const char** str_table, const xed_iform_enum_t*
 }
 
 
+// Time reps encodes of each test (without the decode check) and report
+// the totals per ISA extension.
+int bench_all(test_func_t* base, const xed_iform_enum_t* iform_table) {
+    assert(base != NULL && iform_table != NULL);
+    xed_uint64_t cycles[XED_EXTENSION_LAST];
+    xed_uint64_t encodes[XED_EXTENSION_LAST];
+    xed_uint64_t bytes[XED_EXTENSION_LAST];
+    xed_uint32_t tests[XED_EXTENSION_LAST];
+    xed_uint8_t output_buffer[2*XED_MAX_INSTRUCTION_BYTES];
+    xed_uint32_t test_id, skipped=0;
+    xed_uint64_t t1, t2;
+    xed_uint_t i;
+    xed_uint_t e;
+
+    memset(cycles, 0, sizeof(cycles));
+    memset(encodes, 0, sizeof(encodes));
+    memset(bytes, 0, sizeof(bytes));
+    memset(tests, 0, sizeof(tests));
+    for(test_id=0; base[test_id]; test_id++) {
+        xed_extension_enum_t ext = xed_iform_to_extension(iform_table[test_id]);
+        xed_uint32_t enclen = (*base[test_id])(output_buffer, 0);
+        if (enclen == 0 || enclen > XED_MAX_INSTRUCTION_BYTES) {
+            skipped++;
+            continue;
+        }
+        t1 = xed_get_time();
+        for(i=0;i<reps;i++)
+            (*base[test_id])(output_buffer, 0);
+        t2 = xed_get_time();
+        if (t2>t1)
+            cycles[ext] += t2-t1;
+        encodes[ext] += reps;
+        bytes[ext] += (xed_uint64_t)reps * enclen;
+        tests[ext]++;
+    }
+    for(e=0;e<XED_EXTENSION_LAST;e++) {
+        if (tests[e])
+            printf("//Bench: %s tests %u encodes " XED_FMT_LU " cycles "
+                   XED_FMT_LU " bytes " XED_FMT_LU "\n",
+                   xed_extension_enum_t2str((xed_extension_enum_t)e),
+                   tests[e], encodes[e], cycles[e], bytes[e]);
+    }
+    printf("//Bench skipped: %u\n", skipped);
+    return 0;
+}
+
 int main(int argc, char** argv) {
     int i=0, m=0, test_id=0, errors=0,specific_tests=0, enable_histogram=0;
 #if defined(XED_ENC2_CONFIG_M64_A64)
@@ -302,9 +349,12 @@ int main(int argc, char** argv) {
         else if (strcmp(argv[i],"--ignore_errors")==0) {
             ignore_errors = 1;
         }
+        else if (strcmp(argv[i],"--bench")==0) {
+            enable_bench = 1;
+        }
         else if ( strcmp(argv[i],"-h")==0 ||
                   strcmp(argv[i],"--help")==0 )  {
-            fprintf(stderr,"%s [-h|--help] [--histo] [--info] [--byte|--emit] [--main] [--gnuasm] [--reps N] [test_id ...]\n",
+            fprintf(stderr,"%s [-h|--help] [--histo] [--info] [--byte|--emit] [--main] [--gnuasm] [--bench] [--reps N] [test_id ...]\n",
                     argv[0]);
             exit(0);
         }
@@ -345,7 +395,10 @@ int main(int argc, char** argv) {
     if(enable_emit_json) {
         printf("[\n");
     }
-    if (specific_tests==0) {
+    if (specific_tests==0 && enable_bench) {
+        errors = bench_all(base, iform_table);
+    }
+    else if (specific_tests==0) {
         if(enable_emit_json == 0){
            printf("//Testing all...\n");
         }
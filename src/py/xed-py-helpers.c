@@ -0,0 +1,132 @@
+/* BEGIN_LEGAL
+
+Copyright (c) 2026 Intel Corporation
+
+  Licensed under the Apache License, Version 2.0 (the "License");
+  you may not use this file except in compliance with the License.
+  You may obtain a copy of the License at
+
+      http://www.apache.org/licenses/LICENSE-2.0
+
+  Unless required by applicable law or agreed to in writing, software
+  distributed under the License is distributed on an "AS IS" BASIS,
+  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+  See the License for the specific language governing permissions and
+  limitations under the License.
+
+END_LEGAL */
+/// @file xed-py-helpers.c
+
+////////////////////////////////////////////////////////////////////////////
+// Helper APIs that are compiled only for --py-export builds. Unlike the
+// generated xed-export-functions.c wrappers, these functions batch work
+// natively so that XedPy crosses the Python<->C boundary once per buffer
+// (or instruction) instead of once per instruction (or field). They are
+// declared for CFFI in
+// pyext/xedpy/xedpy_funcs.py and have no public C header.
+////////////////////////////////////////////////////////////////////////////
+#include "xed/xed-interface.h"
+
+/// Number of values per operand written by xed_decoded_inst_operands_packed_py()
+#define XED_PY_OPERAND_FIELDS 5
+
+#if defined(XED_DECODER)
+/// Linear-sweep decode of up to max_insts instructions from itext.
+///
+/// The results are written in columnar form: entry i of every output array
+/// describes the i-th decoded instruction. Offsets are relative to itext
+/// plus base_offset. When decoding fails, the error is recorded, the
+/// length is set to 1 and the sweep resynchronizes on the next byte.
+///
+/// @return the number of records written. The number of bytes consumed is
+///         returned via *consumed.
+XED_DLL_EXPORT xed_uint_t
+xed_decode_buffer_py(const xed_state_t* dstate,
+                     xed_chip_enum_t chip,
+                     const xed_uint8_t* itext,
+                     xed_uint64_t nbytes,
+                     xed_uint64_t base_offset,
+                     xed_uint_t max_insts,
+                     xed_uint64_t* offsets,
+                     xed_uint8_t* lengths,
+                     xed_uint16_t* iclasses,
+                     xed_uint16_t* iforms,
+                     xed_uint16_t* categories,
+                     xed_uint8_t* errors,
+                     xed_uint64_t* consumed)
+{
+    xed_decoded_inst_t xedd;
+    xed_uint64_t pos = 0;
+    xed_uint_t n = 0;
+
+    while (pos < nbytes && n < max_insts)
+    {
+        xed_uint64_t remaining = nbytes - pos;
+        unsigned int ilen = XED_MAX_INSTRUCTION_BYTES;
+        xed_error_enum_t xed_error;
+        xed_uint_t len;
+
+        if (remaining < ilen)
+            ilen = XED_STATIC_CAST(unsigned int, remaining);
+
+        xed_decoded_inst_zero_set_mode(&xedd, dstate);
+        xed_decoded_inst_set_input_chip(&xedd, chip);
+        xed_error = xed_decode(&xedd, itext + pos, ilen);
+
+        offsets[n] = base_offset + pos;
+        errors[n] = XED_STATIC_CAST(xed_uint8_t, xed_error);
+        if (xed_error == XED_ERROR_NONE)
+        {
+            len = xed_decoded_inst_get_length(&xedd);
+            iclasses[n] = XED_STATIC_CAST(xed_uint16_t,
+                                          xed_decoded_inst_get_iclass(&xedd));
+            iforms[n] = XED_STATIC_CAST(xed_uint16_t,
+                                        xed_decoded_inst_get_iform_enum(&xedd));
+            categories[n] = XED_STATIC_CAST(xed_uint16_t,
+                                            xed_decoded_inst_get_category(&xedd));
+        }
+        else
+        {
+            len = 1;
+            iclasses[n] = XED_ICLASS_INVALID;
+            iforms[n] = XED_IFORM_INVALID;
+            categories[n] = XED_CATEGORY_INVALID;
+        }
+        lengths[n] = XED_STATIC_CAST(xed_uint8_t, len);
+        pos += len;
+        n++;
+    }
+    *consumed = pos;
+    return n;
+}
+
+/// Write the operand name, register, action, visibility and length in bits
+/// (XED_PY_OPERAND_FIELDS values) of each operand of a decoded instruction
+/// to out, for at most max_operands operands.
+///
+/// @return the number of operands of the instruction, which may exceed
+///         max_operands.
+XED_DLL_EXPORT xed_uint_t
+xed_decoded_inst_operands_packed_py(const xed_decoded_inst_t* xedd,
+                                    xed_uint32_t* out,
+                                    xed_uint_t max_operands)
+{
+    const xed_inst_t* xi = xed_decoded_inst_inst(xedd);
+    xed_uint_t noperands = xed_inst_noperands(xi);
+    xed_uint_t i;
+
+    for (i = 0; i < noperands && i < max_operands; i++)
+    {
+        const xed_operand_t* op = xed_inst_operand(xi, i);
+        xed_operand_enum_t name = xed_operand_name(op);
+        xed_uint32_t* rec = out + i * XED_PY_OPERAND_FIELDS;
+
+        rec[0] = name;
+        rec[1] = xed_decoded_inst_get_reg(xedd, name);
+        rec[2] = xed_decoded_inst_operand_action(xedd, i);
+        rec[3] = xed_operand_operand_visibility(op);
+        rec[4] = xed_decoded_inst_operand_length_bits(xedd, i);
+    }
+    return noperands;
+}
+#endif
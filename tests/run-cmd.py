@@ -31,8 +31,13 @@ from __future__ import print_function
 import sys
 import os
 import re
+import io
 import time
+import json
 import difflib
+import subprocess
+import xml.etree.ElementTree as ET
+import concurrent.futures
 
 def find_dir(d):
     dir = os.getcwd()
@@ -58,6 +63,10 @@ def _filter_test_stdout(lines):
     """Remove ghost attribute tokens (trailing underscore) from output lines."""
     return [_GHOST_ATTR_RE.sub('', line) for line in lines]
 
+def _msgb(out, s, t=''):
+    """Like mbuild.msgb() but writes to the stream out"""
+    out.write('[{}] {}\n'.format(s, t))
+
 def write_file(fn,lines):
     print("[EMIT] %s" % (fn))
     f = open(fn, 'w')
@@ -112,17 +121,22 @@ def make_bulk_tests(env):
                 create_reference(env, si, test, make_new=True)
                 i = i + 1
 
-def compare_file(reference, this_test):
-    ref_lines = open(reference,'r').readlines()
+def compare_file(reference, this_test, out):
+    with open(reference,'r') as f:
+        ref_lines = f.readlines()
+    # Fast path for the usual case of identical output. The filtering and
+    # the exemptions below cannot make identical lines differ.
+    if [ x.rstrip() for x in ref_lines ] == [ x.rstrip() for x in this_test ]:
+        return True
     ref_lines = [ x.rstrip() for x in _filter_test_stdout(ref_lines)]
     this_test = [ x.rstrip() for x in _filter_test_stdout(this_test)]
     for line in difflib.unified_diff(ref_lines, this_test,
                                      fromfile=reference, tofile="current"):
-        sys.stdout.write(line.rstrip()+'\n')
+        out.write(line.rstrip()+'\n')
     if len(ref_lines) != len(this_test):
-        mbuild.msgb("DIFFERENT NUMBER OF LINES", "ref %d test %d" % (len(ref_lines),len(this_test)))
+        _msgb(out, "DIFFERENT NUMBER OF LINES", "ref %d test %d" % (len(ref_lines),len(this_test)))
         for ref in ref_lines:
-            mbuild.msgb("EXPECTED",'%s' % (ref.strip()))
+            _msgb(out, "EXPECTED",'%s' % (ref.strip()))
         return False
     for (ref,test) in zip(ref_lines,this_test):
         if ref.strip() != test.strip():
@@ -138,16 +152,16 @@ def compare_file(reference, this_test):
                 test_filtered = _filter_api_check_line(test)
                 if ref.strip() == test_filtered.strip():
                     continue
-            mbuild.msgb("DIFFERENT", "\n\tref  [%s]\n\ttest [%s]" % (ref, test))
+            _msgb(out, "DIFFERENT", "\n\tref  [%s]\n\ttest [%s]" % (ref, test))
             return False
     return True
 
-def all_codes_present(specified_codes, test_codes):
+def all_codes_present(specified_codes, test_codes, out):
     """The test codes must be a subset of the specified codes. 
     If no codes are specified, we do everything.
     """
     if specified_codes:
-        print("comparing restriction: {} and  test: {}".format(str(specified_codes), str(test_codes)))
+        print("comparing restriction: {} and  test: {}".format(str(specified_codes), str(test_codes)), file=out)
         s = set(specified_codes)
         t = set(test_codes)
         u = s.union(t)
@@ -156,7 +170,7 @@ def all_codes_present(specified_codes, test_codes):
             return False
     return True 
 
-def _prep_stream(strm,name):
+def _prep_stream(strm,name,out):
     if len(strm) == 1:
         strm= strm[0].split("\n")
     if len(strm) == 1 and strm[0] == '':
@@ -164,7 +178,7 @@ def _prep_stream(strm,name):
     if len(strm) > 0 and len(strm[-1]) == 0:
         strm.pop()
     for line in strm:
-        print("[{}] {} {}".format(name,len(line),line))
+        print("[{}] {} {}".format(name,len(line),line), file=out)
     return strm
 
 def _filter_api_check_line(line):
@@ -181,8 +195,7 @@ def _filter_api_check_stderr(stderr):
     """Remove absolute path and line number from api_check messages, keep just filename."""
     return [_filter_api_check_line(line) for line in stderr]
 
-def one_test(env,test_dir):
-
+def test_command(env,test_dir):
     cmd_fn = os.path.join(test_dir,"cmd")
     cmd = open(cmd_fn,'r').readlines()[0]
 
@@ -190,31 +203,32 @@ def one_test(env,test_dir):
     build_dir = mbuild.posix_slashes(os.path.abspath(env['build_dir']))
     cmd2 = re.sub('BUILDDIR',build_dir,cmd)
     cmd2 = re.sub('TESTDIR', test_dir ,cmd2)
-    cmd2 = cmd2.strip()
-    print(cmd2)
+    return cmd2.strip()
 
-    (retcode, stdout,stderr) = mbuild.run_command(cmd2,separate_stderr=True)
-    print("Retcode %s" % (str(retcode)))
+def check_test(test_dir, cmd2, retcode, stdout, stderr, out):
+    """Compare the results of running cmd2 to the test references"""
+    print(cmd2, file=out)
+    print("Retcode %s" % (str(retcode)), file=out)
     if stdout:
-        stdout = _prep_stream(stdout,"STDOUT")
+        stdout = _prep_stream(stdout,"STDOUT",out)
     if stderr:
-        stderr = _prep_stream(stderr,"STDERR")
+        stderr = _prep_stream(stderr,"STDERR",out)
 
-    ret_match = compare_file(os.path.join(test_dir,"retcode.reference"), [ str(retcode) ])
-    stdout_match = compare_file(os.path.join(test_dir,"stdout.reference"), stdout)
-    stderr_match = compare_file(os.path.join(test_dir,"stderr.reference"), stderr)
+    ret_match = compare_file(os.path.join(test_dir,"retcode.reference"), [ str(retcode) ], out)
+    stdout_match = compare_file(os.path.join(test_dir,"stdout.reference"), stdout, out)
+    stderr_match = compare_file(os.path.join(test_dir,"stderr.reference"), stderr, out)
     
     okay = True
     if not ret_match:
-        mbuild.msgb("RETCODE MISMATCH")
+        _msgb(out, "RETCODE MISMATCH")
         okay = False
     if not stdout_match:
-        mbuild.msgb("STDOUT MISMATCH")
+        _msgb(out, "STDOUT MISMATCH")
         okay = False
     if not stderr_match:
-        mbuild.msgb("STDERR MISMATCH")
+        _msgb(out, "STDERR MISMATCH")
         okay = False
-    print("-"*40 + "\n\n\n")
+    print("-"*40 + "\n\n\n", file=out)
     return okay
 
 def find_tests(env):
@@ -235,29 +249,214 @@ def rebase_tests(env):
         test_cmd = open(cmd_fn,'r').readlines()[0]
         create_reference(env, test_dir, test_cmd, make_new=False)
     
-def run_tests(env):
-    failing_tests = []
-    test_dirs = find_tests(env)
-    errors = 0
-    skipped = 0
+############################################################################
+# Batch mode. The xed command line tools below accept -batch-tests (see
+# xed_example_batch_tests() in examples/xed-examples-util.c) and then run
+# one command per stdin line in a child forked after the tables are
+# initialized. That saves the process start and table initialization of
+# each test.
+
+_batch_tools = ['xed', 'xed-dec', 'xed-enc', 'xed-enc-asmparse']
+_batch_end = '#XED-BATCH-TESTS-END'
+_batch_max_tests = 64
+# commands with these need a shell
+_shell_chars_re = re.compile(r'''[<>|&;$`'"\\*?~(){}\[\]]''')
+
+def batch_tool(cmd):
+    """The tool that runs cmd if cmd can run in a batch, else None"""
+    if _shell_chars_re.search(cmd):
+        return None
+    tool = cmd.split()[0]
+    if os.path.basename(tool) not in _batch_tools:
+        return None
+    return tool
+
+def _split_batch_output(text):
+    """Split the output of a batch at the end markers. Returns a list of
+    (retcode, output) pairs."""
+    parts = text.split('\n' + _batch_end + ' ')
+    results = []
+    output = parts[0]
+    for part in parts[1:]:
+        (retcode, _, rest) = part.partition('\n')
+        results.append((int(retcode), output))
+        output = rest
+    return results
+
+def run_batch(tool, cmds):
+    """Run the commands with one tool process. Returns a list of (retcode,
+    stdout, stderr) like mbuild.run_command() returns, or None if the tool
+    could not run the batch."""
+    batch = ''.join('\t'.join(cmd.split()[1:]) + '\n' for cmd in cmds)
+    try:
+        sub = subprocess.Popen([tool, '-batch-tests'],
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               universal_newlines=True)
+        (stdout, stderr) = sub.communicate(batch)
+    except OSError:
+        return None
+    stdout = _split_batch_output(stdout)
+    stderr = _split_batch_output(stderr)
+    if sub.returncode != 0 or len(stdout) != len(cmds) or len(stderr) != len(cmds):
+        return None
+    return [ (retcode, [output], [error])
+             for ((retcode, output), (_, error)) in zip(stdout, stderr) ]
+
+def make_test_chunks(env, test_dirs, njobs):
+    """Split the tests in to lists that are run together. Tests that can
+    run in a batch are grouped by tool and split so that all the workers
+    get some. Returns a list of (tool, test_dirs) where the tool is None
+    for tests that run one at a time."""
+    groups = {} # tool -> test_dirs
+    chunks = []
     for tdir in test_dirs:
-        #if env.on_windows():
-        #    time.sleep(1) # try to avoid a bug on windows running commands to quickly
-        print('-'*40) 
-        mbuild.msgb("TESTING" , tdir)
+        tool = None
+        if env['batch']:
+            tool = batch_tool(test_command(env,tdir))
+        if tool:
+            groups.setdefault(tool,[]).append(tdir)
+        else:
+            chunks.append((None, [tdir]))
+    for tool, tdirs in groups.items():
+        n = min(_batch_max_tests, max(1, (len(tdirs) + njobs - 1) // njobs))
+        for i in range(0, len(tdirs), n):
+            chunks.append((tool, tdirs[i:i+n]))
+    return chunks
+
+############################################################################
+
+def run_test_chunk(env, tool, tdirs):
+    """Run the tests in tdirs, with one tool process in batch mode if tool
+    is not None. The output of each test is buffered so that tests can run
+    concurrently. Returns a list of (status, output, seconds) where status
+    is PASS, FAIL or SKIPPED. In batch mode, each test is charged an equal
+    share of the time of the batch."""
+    outs = []
+    statuses = []
+    run = [] # indexes of the tests that are not skipped
+    for tdir in tdirs:
+        out = io.StringIO()
+        print('-'*40, file=out)
+        _msgb(out, "TESTING" , tdir)
 
         codes_fn = os.path.join(tdir,"codes")
         codes = open(codes_fn,'r').readlines()[0].strip().split()
 
-        if all_codes_present(env['codes'],codes):
-            okay = one_test(env,tdir)
-            if not okay:
+        if all_codes_present(env['codes'],codes,out):
+            run.append(len(outs))
+            statuses.append(None)
+        else:
+            _msgb(out, "SKIPPING DUE TO TEST SUBSET RESTRICTION")
+            print('-'*40 + "\n\n\n", file=out)
+            statuses.append('SKIPPED')
+        outs.append(out)
+
+    cmds = [ test_command(env,tdirs[i]) for i in run ]
+    seconds = [ 0.0 ] * len(tdirs)
+    results = None
+    if tool and len(cmds) > 1:
+        start = time.perf_counter()
+        results = run_batch(tool, cmds)
+        if results:
+            share = (time.perf_counter() - start) / len(cmds)
+            for i in run:
+                seconds[i] = share
+    if results is None:
+        results = []
+        for i, cmd in zip(run, cmds):
+            start = time.perf_counter()
+            results.append(mbuild.run_command(cmd,separate_stderr=True))
+            seconds[i] = time.perf_counter() - start
+    for i, cmd, (retcode, stdout, stderr) in zip(run, cmds, results):
+        start = time.perf_counter()
+        okay = check_test(tdirs[i], cmd, retcode, stdout, stderr, outs[i])
+        seconds[i] += time.perf_counter() - start
+        statuses[i] = 'PASS' if okay else 'FAIL'
+    return [ (status, out.getvalue(), t)
+             for (status, out, t) in zip(statuses, outs, seconds) ]
+
+def write_json_results(fn, results, summary):
+    """Write the per-test results (dicts made by run_tests()) and the
+    summary counts as JSON"""
+    with open(fn, 'w') as f:
+        json.dump({ 'version': 1,
+                    'summary': summary,
+                    'tests': [ { k: v for (k, v) in r.items() if k != 'output' }
+                               for r in results ] },
+                  f, indent=1)
+        f.write('\n')
+
+def write_junit_results(fn, results, summary):
+    """Write the per-test results as JUnit XML. Each test directory is a
+    testsuite so that CI tools group the tests the same way."""
+    suites = {} # test directory -> list of results
+    for r in results:
+        suites.setdefault(os.path.dirname(r['name']), []).append(r)
+    root = ET.Element('testsuites',
+                      tests=str(summary['tests']),
+                      failures=str(summary['errors']),
+                      skipped=str(summary['skipped']),
+                      time='%.3f' % summary['seconds'])
+    for (suite_dir, suite_results) in suites.items():
+        suite = ET.SubElement(root, 'testsuite',
+                              name=suite_dir,
+                              tests=str(len(suite_results)),
+                              failures=str(sum(r['status'] == 'FAIL'
+                                               for r in suite_results)),
+                              skipped=str(sum(r['status'] == 'SKIPPED'
+                                              for r in suite_results)),
+                              time='%.3f' % sum(r['seconds']
+                                                for r in suite_results))
+        for r in suite_results:
+            case = ET.SubElement(suite, 'testcase',
+                                 classname=suite_dir,
+                                 name=os.path.basename(r['name']),
+                                 time='%.3f' % r['seconds'])
+            if r['status'] == 'FAIL':
+                failure = ET.SubElement(case, 'failure',
+                                        message='output mismatch')
+                failure.text = r['output']
+            elif r['status'] == 'SKIPPED':
+                ET.SubElement(case, 'skipped',
+                              message='test subset restriction')
+    ET.ElementTree(root).write(fn, encoding='utf-8', xml_declaration=True)
+
+def run_tests(env):
+    failing_tests = []
+    test_dirs = find_tests(env)
+    errors = 0
+    skipped = 0
+    results = []
+    start = time.perf_counter()
+
+    # The tests only read their inputs, so they can run concurrently. The
+    # work is done by the child processes, so threads are enough. The
+    # output is printed in test order.
+    njobs = max(1, int(env['jobs']))
+    if njobs > 1:
+        mbuild.msgb("TEST JOBS", str(njobs))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=njobs) as pool:
+        futures = {} # tdir -> (future, index in the chunk)
+        for (tool, tdirs) in make_test_chunks(env, test_dirs, njobs):
+            f = pool.submit(run_test_chunk, env, tool, tdirs)
+            for i, tdir in enumerate(tdirs):
+                futures[tdir] = (f, i)
+        for tdir in test_dirs:
+            (f, i) = futures[tdir]
+            (status, output, seconds) = f.result()[i]
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            results.append({ 'name': tdir,
+                             'status': status,
+                             'seconds': round(seconds, 6),
+                             'output': output })
+            if status == 'FAIL':
                 failing_tests.append(tdir)
                 errors += 1
-        else:
-            mbuild.msgb("SKIPPING DUE TO TEST SUBSET RESTRICTION")
-            print('-'*40 + "\n\n\n")
-            skipped += 1
+            elif status == 'SKIPPED':
+                skipped += 1
 
     ntests = len(test_dirs)
     tested = ntests-skipped
@@ -272,6 +471,18 @@ def run_tests(env):
     failing_tests.sort()
     for t in failing_tests:
         mbuild.msgb("FAIL", t)
+
+    summary = { 'tests': ntests,
+                'skipped': skipped,
+                'tested': tested,
+                'errors': errors,
+                'jobs': njobs,
+                'batch': env['batch'],
+                'seconds': round(time.perf_counter() - start, 6) }
+    if env['json_results']:
+        write_json_results(env['json_results'], results, summary)
+    if env['junit_results']:
+        write_junit_results(env['junit_results'], results, summary)
     return errors
 
 #############################################3
@@ -298,6 +509,22 @@ def work():
                           action="store",
                           default='tests-base', 
                           help="Directory where tests live.")
+    env.parser.add_option("--batch",
+                          dest="batch",
+                          action="store_true",
+                          default=False,
+                          help="Run the tests that use the xed command line tools "
+                          + "in batches, one tool process per batch. Not on windows.")
+    env.parser.add_option("--json-results",
+                          dest="json_results",
+                          action="store",
+                          default=None,
+                          help="Write the per-test status and time to this JSON file.")
+    env.parser.add_option("--junit-results",
+                          dest="junit_results",
+                          action="store",
+                          default=None,
+                          help="Write the per-test status and time to this JUnit XML file.")
     env.parser.add_option("-c", "--code", 
                           dest="codes", 
                           action="append",
@@ -306,6 +533,8 @@ def work():
                           + "AVX512X, AVX512PF, AMX, MPX, APX, IPREFETCH, HSW, AMD, XOP, VIA, SPR, AVX10, AVX10_2, etc)."
                              + " Only used for running tests, not creating them.")
     env.parse_args()
+    if env.on_windows():
+        env['batch'] = False
 
     if not env['tests']:
         env['tests'] = ['tests-base']
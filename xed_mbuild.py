@@ -35,6 +35,7 @@ import time
 import collections
 import stat
 import importlib.util
+import hashlib
 
 def _fatal(m):
     sys.stderr.write("\n\nXED ERROR: %s\n\n" % (m) )
@@ -350,6 +351,120 @@ def read_file_list(fn):
         a.append(f.rstrip())
     return a
 
+# output file list -> set of generated files rewritten by the run of its
+# generator in this build, or None if that run did not list them
+_changed_generated_files = {}
+
+def remove_changed_files(output_file_list):
+    """Remove the changed file list of an earlier run. Called before
+    running a generator."""
+    mbuild.remove_file(genutil.changed_files_list_name(output_file_list))
+
+def report_changed_files(phase, output_file_list):
+    """The generators do not rewrite output files whose content did not
+    change. They list the changed files next to the list of all output
+    files (see genutil.changed_files_list_name()). Called after a
+    successful generator run, for compile_generated()."""
+    fn = genutil.changed_files_list_name(output_file_list)
+    key = os.path.abspath(output_file_list)
+    if not os.path.exists(fn):
+        _changed_generated_files[key] = None
+        return []
+    changed = read_file_list(fn)
+    _changed_generated_files[key] = set(os.path.abspath(f) for f in changed)
+    mbuild.vmsgb(1, phase, "%d of %d generated files changed" %
+                 (len(changed), len(read_file_list(output_file_list))))
+    for f in changed:
+        mbuild.vmsgb(3, phase, "changed: " + f)
+    return changed
+
+def _read_changed_files(output_file_lists):
+    """Return the set of generated files rewritten by the generators in
+    this build, or None if a generator did not list them. A generator
+    that did not run in this build rewrote nothing; files it rewrote in
+    an earlier build are newer than their objects."""
+    changed = set()
+    for output_file_list in output_file_lists:
+        files = _changed_generated_files.get(
+            os.path.abspath(output_file_list), set())
+        if files is None:
+            return None
+        changed.update(files)
+    return changed
+
+def _newest_header_mtime(header_paths):
+    """Newest mtime of the header files and of the headers in the
+    directory trees in header_paths"""
+    newest = 0
+    for d in header_paths:
+        if os.path.isfile(d):
+            newest = max(newest, os.path.getmtime(d))
+            continue
+        for root, dirs, files in os.walk(d):
+            for f in files:
+                if f.endswith(('.h', '.H')):
+                    newest = max(newest,
+                                 os.path.getmtime(os.path.join(root, f)))
+    return newest
+
+def _compile_signature(env):
+    """Digest of the compiler, flags, defines and include dirs"""
+    s = env.expand('%(CC)s %(CCFLAGS)s')
+    s += repr(sorted(env['DEFINES'].items())) + repr(env['CPPPATH'])
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()
+
+def _compile_signature_file(env, name):
+    return env.build_dir_join('.mbuild.compile-sig.{}'.format(name))
+
+def save_compile_signature(env, name):
+    """Record the flags used by a successful build of the dag name, for
+    compile_generated()"""
+    xbc.write_file(_compile_signature_file(env, name),
+                   [_compile_signature(env) + '\n'])
+
+def remove_compile_signature(env, name):
+    """Called before building the dag name. The objects of a failed or
+    interrupted build may have been compiled with other flags."""
+    mbuild.remove_file(_compile_signature_file(env, name))
+
+def compile_generated(env, dag, name, sources, output_file_lists, header_paths):
+    """Add compile commands for the generated sources to the dag and
+    return their objects. The generators only rewrite the files whose
+    content changed and list them (see report_changed_files()). Sources
+    that were not rewritten and whose object is newer than the source and
+    every header in header_paths are linked as is, without a compile
+    command, when the flags match the last successful build of the dag
+    name. Call remove_compile_signature() before building the dag and
+    save_compile_signature() after a successful build."""
+    changed = _read_changed_files(output_file_lists)
+    sig_fn = _compile_signature_file(env, name)
+    same_flags = (os.path.exists(sig_fn) and
+                  read_file_list(sig_fn) == [_compile_signature(env)])
+    if (not same_flags or changed is None or env['ext'] or
+        any(f.endswith(('.h', '.H')) for f in changed)):
+        return env.compile(dag, sources)
+
+    newest_header = _newest_header_mtime(header_paths)
+    objs = [] # object file, or None if it must be compiled
+    for src in sources:
+        obj = env.build_dir_join(env.make_obj(os.path.basename(src)))
+        if (os.path.abspath(src) not in changed and os.path.exists(obj) and
+            os.path.getmtime(obj) >= max(os.path.getmtime(src), newest_header)):
+            objs.append(obj)
+        else:
+            objs.append(None)
+    to_compile = [ src for (src, obj) in zip(sources, objs) if obj is None ]
+    mbuild.vmsgb(1, name, "compiling %d of %d generated files" %
+                 (len(to_compile), len(sources)))
+    compiled = iter(env.compile(dag, to_compile))
+    return [ obj if obj else next(compiled) for obj in objs ]
+
+def _generator_output_file_lists(env, gc):
+    lists = [gc.dec_output_file]
+    if env['encoder']:
+        lists.append(gc.enc_output_file)
+    return lists
+
 def run_decode_generator(gc, env):
     """Run the decode table generator. This function is executed as
      required by the work_queue."""
@@ -368,11 +483,13 @@ def run_decode_generator(gc, env):
         gen_extra_args += " --compress-operands" 
     if env['add_orphan_inst_to_future_chip']:
         gen_extra_args += " --add-orphan-inst-to-future-chip"
+    gen_extra_args += " --jobs %d" % env['jobs']
         
     cmd = env.expand(gc.decode_command(xedsrc, gen_extra_args))
 
 
     mbuild.vmsgb(3, "DEC-GEN", cmd)
+    remove_changed_files(gc.dec_output_file)
     (retval, output, error_output) = mbuild.run_command(cmd,
                                                         separate_stderr=True)
     oo = env.build_dir_join('DEC-OUT.txt')
@@ -383,6 +500,7 @@ def run_decode_generator(gc, env):
     if retval == 0:
         list_of_files = read_file_list(gc.dec_output_file)
         mbuild.hash_files(list_of_files, gc.dec_hash_file)
+        report_changed_files("DEC-GEN", gc.dec_output_file)
 
     mbuild.vmsgb(1, "DEC-GEN", "Return code: " + str(retval))
     return (retval, error_output )
@@ -399,6 +517,7 @@ def run_encode_generator(gc, env):
     gen_extra_args = "--gendir %s --xeddir %s" % (build_dir, xedsrc)
     cmd = gc.encode_command(env, xedsrc, gen_extra_args)
     mbuild.vmsgb(3, "ENC-GEN", cmd)
+    remove_changed_files(gc.enc_output_file)
     (retval, output, error_output) = mbuild.run_command(cmd,
                                                         separate_stderr=True)
     oo = env.build_dir_join('ENC-OUT.txt')
@@ -409,6 +528,7 @@ def run_encode_generator(gc, env):
     if retval == 0:
         list_of_files = read_file_list(gc.enc_output_file)
         mbuild.hash_files(list_of_files, gc.enc_hash_file)
+        report_changed_files("ENC-GEN", gc.enc_output_file)
 
     mbuild.vmsgb(1, "ENC-GEN", "Return code: " + str(retval))
     return (retval, [] )
@@ -441,6 +561,7 @@ def run_encode_generator2(args, env):
     cmd = env.expand( _encode_command2(args) )
 
     mbuild.vmsgb(3, "ENC2-GEN", cmd)
+    remove_changed_files(args.enc2_output_file)
     (retval, output, error_output) = mbuild.run_command(cmd,
                                                         separate_stderr=True)
     oo = env.build_dir_join('ENC2-OUT.txt')
@@ -451,6 +572,7 @@ def run_encode_generator2(args, env):
     if retval == 0:
         list_of_files = read_file_list(args.enc2_output_file)
         mbuild.hash_files(list_of_files, args.enc2_hash_file)
+        report_changed_files("ENC2-GEN", args.enc2_output_file)
 
     mbuild.vmsgb(1, "ENC2-GEN", "Return code: " + str(retval))
     return (retval, [] )
@@ -682,6 +804,8 @@ def mkenv():
                                  compress_operands=False,
                                  add_orphan_inst_to_future_chip=False,
                                  test_perf=False,
+                                 test_perf_baseline=None,
+                                 test_perf_enc_baseline=None,
                                  example_linkflags='',
                                  example_flags='',
                                  example_rpaths=[],
@@ -920,7 +1044,20 @@ def xed_args(env):
                           action="store_true",
                           dest="test_perf",
                           help="Do performance test (on linux). Requires" + 
-                          " specific external test binary.")
+                          " specific external test binary. With the" +
+                          " encoder, also builds the enc2 testers" +
+                          " (--enc2-test).")
+    env.parser.add_option("--test-perf-baseline",
+                          action="store",
+                          dest="test_perf_baseline",
+                          help="JSON baseline for the performance test." +
+                          " Required by --test-perf. See scripts/perftest.py.")
+    env.parser.add_option("--test-perf-enc-baseline",
+                          action="store",
+                          dest="test_perf_enc_baseline",
+                          help="JSON baseline for the encoder performance" +
+                          " test. Required by --test-perf with the encoder." +
+                          " See scripts/encperftest.py.")
     env.parser.add_option("--static-stripped", 
                           action="store_true",
                           dest="static_stripped",
@@ -1540,7 +1677,8 @@ def add_decoder_command(env, gc, gen_dag, prep):
              'pysrc/slash_expand.py',
              'pysrc/chipmodel.py', 'pysrc/flag_gen.py', 'pysrc/opnd_types.py',
              'pysrc/hlist.py', 'pysrc/ctables.py', 'pysrc/ild.py',
-             'pysrc/refine_regs.py', 'pysrc/metaenum.py', 'pysrc/classifier.py']
+             'pysrc/refine_regs.py', 'pysrc/metaenum.py', 'pysrc/classifier.py',
+             'pysrc/genprof.py']
           
     dec_py = env.src_dir_join(dec_py)
     dec_py += mbuild.glob(env['src_dir'], 'datafiles/*enum.txt')
@@ -1676,6 +1814,9 @@ def build_libxed(env,work_queue):
              nongen_lib_sources.extend(_get_src(env,d))
     if env['encoder'] and env['decoder']:
          nongen_lib_sources.extend(_get_src(env,'encdec'))
+    if env['py_export']:
+         # native helpers used by XedPy (batch decode etc.)
+         nongen_lib_sources.extend(_get_src(env,'py'))
 
     nongen_lib_sources = _remove_src_list(nongen_lib_sources, sources_to_remove)
     nongen_lib_sources.extend(sources_to_add)
@@ -1690,7 +1831,13 @@ def build_libxed(env,work_queue):
     # custom C runtimes.
     if env['first_lib']:
         lib_objs.append(env['first_lib'])
-    lib_objs += lib_env.compile( lib_dag, generated_library_sources)
+    lib_objs += compile_generated(lib_env, lib_dag, 'xedlib',
+                                  generated_library_sources,
+                                  _generator_output_file_lists(env, gc),
+                                  [mbuild.join(env['src_dir'], 'include'),
+                                   mbuild.join(env['src_dir'], 'src'),
+                                   env['private_generated_header_dir']] +
+                                  mbuild.glob(env['build_dir'], '*.h'))
     lib_objs += lib_env.compile( lib_dag, nongen_lib_sources)
     if env['last_lib']:
         lib_objs.append(env['last_lib'])
@@ -1720,7 +1867,10 @@ def build_libxed(env,work_queue):
     if 'skip-lib' in env['targets']:
         mbuild.vmsgb(1, "SKIPPING LIBRARY BUILD")
     else:
+        remove_compile_signature(lib_env, 'xedlib')
         okay = wq_build(env, work_queue, lib_dag)
+        if okay:
+            save_compile_signature(lib_env, 'xedlib')
         if okay and env['shared'] and not env['debug']:
             xbc.strip_file(env,     env['shd_libxed'], '-x')
             if os.path.exists(env['shd_libild']):
@@ -1769,9 +1919,16 @@ def build_libxedenc2(arg_env, work_queue, input_files, config):
     hdr_dir    = mbuild.join(env['build_dir'],'hdr')
     nongen_src = _get_src(env,'enc2')
     
+    output_file_lists = [env.build_dir_join('ENCGEN2-OUTPUT-FILES-{}.txt'.format(config))]
+    header_paths = [mbuild.join(env['src_dir'], 'include'),
+                    mbuild.join(env['src_dir'], 'src'),
+                    hdr_dir]
+
     dag = mbuild.dag_t('xedenc2lib-{}'.format(config), env=env)
     env.add_include_dir(hdr_dir)
-    objs = env.compile( dag, gen_src + nongen_src)
+    objs = compile_generated(env, dag, 'xedenc2lib-{}'.format(config),
+                             gen_src, output_file_lists, header_paths)
+    objs += env.compile( dag, nongen_src)
     if env['shared']:
         u = env.dynamic_lib(objs, env['shd_enc2_lib'])
     else:
@@ -1790,7 +1947,9 @@ def build_libxedenc2(arg_env, work_queue, input_files, config):
     gen_src    = mbuild.glob(env['build_dir'],'src-chk','*.c')
     nongen_src = _get_src(env,'enc2chk')
 
-    objs = env.compile( dag, gen_src + nongen_src)
+    objs = compile_generated(env, dag, 'xedenc2chk-{}'.format(config),
+                             gen_src, output_file_lists, header_paths)
+    objs += env.compile( dag, nongen_src)
     if env['shared']:
         u = env.dynamic_lib(objs, env['shd_chk_lib'])
     else:
@@ -1798,9 +1957,13 @@ def build_libxedenc2(arg_env, work_queue, input_files, config):
     dag.add(env,u)
 
     
+    remove_compile_signature(env, 'xedenc2lib-{}'.format(config))
+    remove_compile_signature(env, 'xedenc2chk-{}'.format(config))
     okay = wq_build(env, work_queue, dag)
     if not okay:
         xbc.cdie("XED ENC2Library build failed")
+    save_compile_signature(env, 'xedenc2lib-{}'.format(config))
+    save_compile_signature(env, 'xedenc2chk-{}'.format(config))
     mbuild.vmsgb(3, "LIBRARY", "XED ENC2 build succeeded")
 
     if env['enc2_test']:
@@ -1870,9 +2033,18 @@ def _modify_search_path_mac(env, fn, tgt=None):
 
 def _test_perf(env):
     """Performance test. Should compile with -O3 or higher. Linux
-    only. Requires a specific test binary."""
+    only. Requires a specific test binary and a baseline made on the
+    test machine."""
     if not env['test_perf']:
         return
+    # baselines are machine specific, so none is shipped. Without one
+    # the test could not detect regressions.
+    if not env['test_perf_baseline']:
+        xbc.cdie("--test-perf requires --test-perf-baseline. Make one " +
+                 "on this machine with scripts/perftest.py --save-baseline FILE")
+    if env['encoder'] and not env['test_perf_enc_baseline']:
+        xbc.cdie("--test-perf requires --test-perf-enc-baseline. Make one " +
+                 "on this machine with scripts/encperftest.py --save-baseline FILE")
 
     # find the XED command line tool binary
     xed = None
@@ -1883,15 +2055,35 @@ def _test_perf(env):
     if not xed:
         xbc.cdie(f"Could not find the xed command line tool for perf test in:\n {mbuild.glob(wkit.bin, '*')}")
 
+    sys.path.insert(0, mbuild.join(env['src_dir'], 'scripts'))
     import perftest
     args = perftest.mkargs()
     args.xed = xed
+    args.corpus_dir = env.build_dir_join('perf-corpus')
+    args.baseline = env['test_perf_baseline']
     r = perftest.work(args) # 2016-04-22 FIXME: need to update interface
     if r != 0:
         # perf test failed. Although calling xbc.cexit() avoids saving
         # mbuild hash state and causes rebuilds.
         xbc.cdie( "perf test failed") 
 
+    if not env['encoder']:
+        return
+    import encperftest
+    args = encperftest.mkargs()
+    args.xed = xed
+    args.corpus_dir = env.build_dir_join('perf-corpus')
+    # the enc2 testers are built in the per-config build directories
+    args.enc2_tester = [ t for t in mbuild.glob(env['build_dir'], '*', 'enc2tester-*')
+                         if re.search(r'enc2tester-[^.]+(\.exe)?$', t) ]
+    if not args.enc2_tester:
+        xbc.cdie("Could not find the enc2 testers for the encoder perf test in: " +
+                 env['build_dir'])
+    args.baseline = env['test_perf_enc_baseline']
+    r = encperftest.work(args)
+    if r != 0:
+        xbc.cdie( "encoder perf test failed") 
+
 def _get_xed_dec_min_size(env):
     """
     Determine the size of the 'xed-dec-min' executable and analyze the ELF sections of the executable if available
@@ -2473,7 +2665,10 @@ def _run_canned_tests(env,osenv):
     retval = 0 # success
     env['test_dir'] = aq(mbuild.join(env['src_dir'],'tests'))
     wkit = env['wkit']
-    cmd = "%(python)s %(test_dir)s/run-cmd.py --build-dir {} ".format(wkit.bin)
+    cmd = "%(python)s %(test_dir)s/run-cmd.py --build-dir {} --jobs {} ".format(
+        wkit.bin, env['jobs'])
+    if not env.on_windows():
+        cmd += " --batch "
 
     dirs = ['tests-base', 'tests-avx512', 'tests-xop', 'tests-syntax', 'tests-amx', 'tests-prefetch',
             'tests-apx', 'tests-api-check']
@@ -2648,6 +2843,9 @@ def macro_args(env):
         env['enc2_test_checked']=True
     if env['enc2_test_checked']:
         env['enc2_test']=True
+    if env['test_perf'] and env['encoder']:
+        # the encoder perf test runs the enc2 testers
+        env['enc2_test']=True
     if env['enc2_test']:
         env['enc2']=True
         env['enc']=True